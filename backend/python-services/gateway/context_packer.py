@@ -0,0 +1,136 @@
+"""
+Token-budgeted context for the rag_search tool.
+
+rag_search can return up to 20 chunks, and every token of the tool output is
+re-read by the realtime model on each turn. ContextPacker fits the chunks
+into RAG_CONTEXT_TOKENS instead. Chunks are taken best score first, each cut
+to at most RAG_CONTEXT_CHUNK_TOKENS at a sentence boundary, and the last one
+that only partly fits is cut the same way. They are then grouped under one
+short citation per source file:
+
+    [1] notes/trip.md
+    - (Trip > Flights) Outbound on the 14th, 9:40 from Gate B ...
+    - (Hotels) Check-in after 3pm ...
+    [2] inbox/receipt.pdf
+    - (page 2) Total 412.50 EUR ...
+
+Each pack reports how many tokens the plain "From <path>: <text>" listing
+would have taken and how many were saved; stats() keeps the running totals.
+"""
+
+import os
+import re
+import sys
+from typing import Any, Dict, List, Optional
+
+# Repo root, for the db/ package: budgets are counted with the tokenizer that sizes the chunks
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from db.chunking import SENTENCE_END
+from db.embed_client import count_tokens
+
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "800"))
+RAG_CONTEXT_CHUNK_TOKENS = int(os.getenv("RAG_CONTEXT_CHUNK_TOKENS", "250"))
+MIN_SNIPPET_TOKENS = 24   # a smaller remainder of the budget is left unused
+
+_WS = re.compile(r"\s+")
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Longest run of whole leading sentences within max_tokens. If even the first
+    sentence is too long, it is cut at a word boundary and ends with "…".
+    """
+    text = _WS.sub(" ", text or "").strip()
+    if max_tokens <= 0 or not text:
+        return ""
+    if count_tokens(text) <= max_tokens:
+        return text
+    out, used, start = [], 0, 0
+    for m in [*SENTENCE_END.finditer(text), None]:
+        sentence = text[start:m.start() + len(m.group(0).rstrip())] if m else text[start:]
+        n = count_tokens(sentence) + (1 if out else 0)
+        if used + n > max_tokens:
+            break
+        out.append(sentence)
+        used += n
+        if m is None:
+            break
+        start = m.end()
+    if out:
+        return " ".join(out)
+    words = text.split(" ")
+    lo, hi = 0, len(words)
+    while lo < hi:   # most words that still fit, with the ellipsis
+        mid = (lo + hi + 1) // 2
+        if count_tokens(" ".join(words[:mid]) + " …") <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return " ".join(words[:lo]) + " …" if lo else ""
+
+
+def short_source(path: str) -> str:
+    """Last two path components: enough to tell sources apart when spoken about."""
+    parts = [p for p in (path or "").replace("\\", "/").split("/") if p]
+    return "/".join(parts[-2:]) or "unknown source"
+
+
+class ContextPacker:
+    """Pack ranked RAG chunks into a token budget, grouped by source with citations."""
+
+    def __init__(self, budget_tokens: int = RAG_CONTEXT_TOKENS, chunk_tokens: int = RAG_CONTEXT_CHUNK_TOKENS):
+        self.budget_tokens = budget_tokens
+        self.chunk_tokens = chunk_tokens
+        self.packs = 0
+        self.tokens_in = 0    # what the unpacked listing would have cost
+        self.tokens_out = 0
+
+    def pack(self, chunks: List[Dict[str, Any]], budget_tokens: Optional[int] = None) -> Dict[str, Any]:
+        budget = self.budget_tokens if budget_tokens is None else budget_tokens
+        ranked = sorted(chunks, key=lambda c: -float(c.get("score") or 0.0))
+        sources: Dict[str, List[str]] = {}   # path -> snippet lines, in order of first use
+        remaining, used, truncated = budget, 0, 0
+        for chunk in ranked:
+            path = chunk.get("path") or ""
+            header = 0 if path in sources else count_tokens(f"[{len(sources) + 1}] {short_source(path)}") + 1
+            anchor = chunk.get("anchor")
+            prefix = f"- ({anchor}) " if anchor else "- "
+            room = min(self.chunk_tokens, remaining - header - count_tokens(prefix) - 1)
+            if room < MIN_SNIPPET_TOKENS:
+                continue
+            snippet = truncate_to_tokens(chunk.get("text", ""), room)
+            if not snippet:
+                continue
+            truncated += snippet != _WS.sub(" ", chunk.get("text") or "").strip()
+            line = prefix + snippet
+            sources.setdefault(path, []).append(line)
+            remaining -= header + count_tokens(line) + 1
+            used += 1
+
+        blocks = [f"[{i}] {short_source(path)}\n" + "\n".join(lines)
+                  for i, (path, lines) in enumerate(sources.items(), 1)]
+        text = "\n".join(blocks)
+        tokens = count_tokens(text) if text else 0
+        plain = sum(count_tokens(f"From {c.get('path', '')}: {c.get('text', '')}") for c in chunks)
+        self.packs += 1
+        self.tokens_in += plain
+        self.tokens_out += tokens
+        return {
+            "text": text,
+            "tokens": tokens,
+            "tokens_unpacked": plain,
+            "tokens_saved": max(0, plain - tokens),
+            "chunks_used": used,
+            "chunks_truncated": truncated,
+            "chunks_total": len(chunks),
+            "sources": list(sources),
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "packs": self.packs,
+            "budget_tokens": self.budget_tokens,
+            "tokens_unpacked": self.tokens_in,
+            "tokens_packed": self.tokens_out,
+            "tokens_saved": max(0, self.tokens_in - self.tokens_out),
+        }
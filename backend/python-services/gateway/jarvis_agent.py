@@ -2,6 +2,7 @@ import os
 import sys
 import httpx
 import json
+import logging
 from typing import Dict, Any, Optional
 
 # Add path to shared contracts
@@ -9,12 +10,26 @@ sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 
 from agents import function_tool
 from agents.realtime import RealtimeAgent
+from singleflight import SingleFlight
+from context_packer import ContextPacker
+from rag_stream import RagStreamError, search_with_deadline
 #from prompts import REALTIME_SYSTEM_PROMPT
 
 # Service URLs
 N8N_SERVICE_URL = os.getenv("N8N_SERVICE_URL", "http://localhost:8001")
 RAG_SERVICE_URL = os.getenv("RAG_SERVICE_URL", "http://localhost:8002")
 
+# n8n webhooks hit directly by the realtime tools
+DAILY_UPDATE_WEBHOOK = "https://ignatiusoey.app.n8n.cloud/webhook/92f56daa-8199-4b3b-b6f3-d968d68301d1"
+GET_TODOS_WEBHOOK = "https://ignatiusoey.app.n8n.cloud/webhook/ece8f158-310b-47a3-a337-efa01606010e"
+
+logger = logging.getLogger(__name__)
+
+# Identical read-only tool calls that overlap in time share one upstream request
+tool_flights = SingleFlight()
+# rag_search results are packed into a token budget before the realtime model reads them
+context_packer = ContextPacker()
+
 REALTIME_SYSTEM_PROMPT = """
 You are a real-time voice assistant.  
 Your role is to hold natural, spoken-style conversations with the user.  
@@ -44,25 +59,23 @@ async def rag_search_tool(query: str, top_k: int = 5) -> str:
     """Search the user's personal knowledge base for relevant information."""
     try:
         async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{RAG_SERVICE_URL}/search",
-                json={"query": query, "top_k": top_k},
-                timeout=10.0
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                if result.get("success") and result.get("data", {}).get("chunks"):
-                    chunks = result["data"]["chunks"]
-                    formatted_results = []
-                    for chunk in chunks:
-                        formatted_results.append(f"From {chunk['path']}: {chunk['text']}")
-                    return f"Found {len(chunks)} relevant results:\n\n" + "\n\n".join(formatted_results)
-                else:
-                    return "No relevant information found in your knowledge base."
+            # streamed: if the final passages are slow, answer from the best preliminary hits
+            result = await search_with_deadline(client, query, top_k, base_url=RAG_SERVICE_URL)
+            chunks = result["chunks"]
+            if chunks:
+                packed = context_packer.pack(chunks)
+                logger.info(f"rag_search context: {packed['chunks_used']}/{len(chunks)} chunks, "
+                            f"{packed['tokens']} tokens ({packed['tokens_saved']} saved), "
+                            f"first event {result['first_event_ms']} ms"
+                            + ("" if result["final"] else f", answered from {result['stage']} hits"))
+                return f"Found {len(chunks)} relevant results, cited by source:\n\n" + packed["text"]
             else:
-                return f"Search failed with status {response.status_code}"
-                
+                return "No relevant information found in your knowledge base."
+
+    except httpx.HTTPStatusError as e:
+        return f"Search failed with status {e.response.status_code}"
+    except RagStreamError as e:
+        return f"Search failed with status {e.status}"
     except Exception as e:
         return f"Error searching knowledge base: {str(e)}"
 
@@ -235,19 +248,26 @@ async def note_append_tool(path: str, content: str, section: str = "") -> str:
     except Exception as e:
         return f"Error updating note: {str(e)}"
     
+async def _get_webhook_json(url: str) -> Any:
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, timeout=10.0)
+        return response.json()
+
 @function_tool
-def daily_update_tool():
+async def daily_update_tool():
     """ Function that gets updates for weather, headlines and daily tasks. Returns data in JSON format """
-    response = httpx.get("https://ignatiusoey.app.n8n.cloud/webhook/92f56daa-8199-4b3b-b6f3-d968d68301d1")
-    data = response.json()
-    return data
+    return await tool_flights.do(
+        SingleFlight.key("daily_update_tool", {}),
+        lambda: _get_webhook_json(DAILY_UPDATE_WEBHOOK),
+    )
 
 @function_tool
-def get_todos_tool():
+async def get_todos_tool():
     """ Function that gets the user's current tasks and reminders. Returns data in JSON format """
-    response = httpx.get("https://ignatiusoey.app.n8n.cloud/webhook/ece8f158-310b-47a3-a337-efa01606010e")
-    data = response.json()
-    return data
+    return await tool_flights.do(
+        SingleFlight.key("get_todos_tool", {}),
+        lambda: _get_webhook_json(GET_TODOS_WEBHOOK),
+    )
 
 @function_tool
 def create_event(start:str, end: str, event_name: str):
@@ -5,8 +5,7 @@ import logging
 import struct
 from contextlib import asynccontextmanager
 from typing import TYPE_CHECKING, Any
-import shutil
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, UploadFile, File
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from typing_extensions import assert_never
@@ -27,17 +26,22 @@ except ImportError:
 
 # Import our agent configuration
 if TYPE_CHECKING:
-    from .jarvis_agent import get_starting_agent
+    from .jarvis_agent import get_starting_agent, tool_flights, context_packer
 else:
     try:
-        from jarvis_agent import get_starting_agent
+        from jarvis_agent import get_starting_agent, tool_flights, context_packer
     except ImportError:
         # Fallback if agent file doesn't exist yet
         get_starting_agent = None
+        tool_flights = None
+        context_packer = None
 
 # Import our shared contracts and prompts
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
+# Repo root, for the db/ package (upload storage)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from db.upload_store import store_stream, iter_upload_file, UploadTooLarge, MAX_UPLOAD_BYTES
 
 load_dotenv()
 
@@ -346,22 +350,54 @@ async def health_check():
         "status": "healthy",
         "version": "1.0.0",
         "services": services_status,
-        "environment": os.getenv("ENVIRONMENT", "development")
+        "environment": os.getenv("ENVIRONMENT", "development"),
+        "tool_singleflight": tool_flights.stats() if tool_flights else None,
+        "rag_context": context_packer.stats() if context_packer else None,
     }
 
 UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
-@app.post("/api/upload")
-async def upload(file: UploadFile = File(...)):
-    # read bytes (streamed, efficient)
-    file_path = UPLOAD_DIR / file.filename
-
-    # e.g. save to disk
-    with file_path.open("wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+def _upload_response(stored: dict) -> dict:
+    return {
+        "filename": stored["filename"],
+        "saved_to": stored["path"],
+        "sha256": stored["sha256"],
+        "size": stored["size"],
+        "duplicate": stored["duplicate"],
+    }
 
-    return {"filename": file.filename, "saved_to": str(file_path)}
+@app.post("/api/upload")
+async def upload(file: UploadFile = File(...), x_content_sha256: str | None = Header(None)):
+    """Multipart upload, copied to content-addressed storage chunk by chunk"""
+    try:
+        stored = await store_stream(
+            iter_upload_file(file), file.filename, UPLOAD_DIR, expected_sha256=x_content_sha256
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _upload_response(stored)
+
+@app.put("/api/upload/stream/{filename}")
+async def upload_stream(filename: str, request: Request, x_content_sha256: str | None = Header(None)):
+    """
+    Raw-body streaming upload: chunks are hashed and written as they arrive,
+    without multipart buffering. Send X-Content-SHA256 to skip known files entirely.
+    """
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > MAX_UPLOAD_BYTES:
+        raise HTTPException(status_code=413, detail=f"Upload exceeds the {MAX_UPLOAD_BYTES} byte limit")
+    try:
+        stored = await store_stream(
+            request.stream(), filename, UPLOAD_DIR, expected_sha256=x_content_sha256
+        )
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _upload_response(stored)
 
 
 
@@ -0,0 +1,105 @@
+"""
+Client for rag-service's streaming search (POST /tools/rag_search_stream).
+
+The service answers with NDJSON, one event per line:
+
+    {"event": "chunk", "stage": "keyword", "rank": 0, "chunk": {...}}   preliminary hits, best first
+    {"event": "passage", "rank": 0, "chunk": {...}}                     final results, best first
+    {"event": "done", "total_found": 5, "timings": {...}, ...}
+    {"event": "error", "status": 503, "detail": "..."}
+
+stream_rag_search() yields the events as their lines arrive. search_with_deadline()
+collects them for a tool call that has to return one answer: it waits for the final
+passages, but once preliminary hits are in hand it waits at most RAG_STREAM_SOFT_TIMEOUT
+seconds for them, then answers from the preliminary hits and drops the stream.
+"""
+
+import asyncio
+import json
+import os
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import httpx
+
+RAG_SERVICE_URL = os.getenv("RAG_SERVICE_URL", "http://localhost:8002")
+RAG_STREAM_SOFT_TIMEOUT = float(os.getenv("RAG_STREAM_SOFT_TIMEOUT", "1.5"))
+
+
+class RagStreamError(Exception):
+    """An error event from the stream (the HTTP status was already 200)."""
+
+    def __init__(self, status: int, detail: str):
+        super().__init__(detail)
+        self.status = status
+
+
+async def stream_rag_search(client: httpx.AsyncClient, query: str, top_k: int = 5,
+                            base_url: str = RAG_SERVICE_URL, timeout: float = 10.0,
+                            **params: Any) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Yield the stream's events in order. Extra keyword arguments (mode, filter_paths,
+    diversify, ...) are passed as search parameters. Raises httpx.HTTPStatusError if the
+    request is rejected (e.g. 400) and RagStreamError on an error event.
+    """
+    body = {"name": "rag_search", "parameters": {"query": query, "top_k": top_k, **params}}
+    async with client.stream("POST", f"{base_url}/tools/rag_search_stream", json=body, timeout=timeout) as response:
+        if response.status_code != 200:
+            await response.aread()
+            response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event.get("event") == "error":
+                raise RagStreamError(event.get("status", 500), event.get("detail", ""))
+            yield event
+
+
+async def search_with_deadline(client: httpx.AsyncClient, query: str, top_k: int = 5,
+                               soft_timeout: float = RAG_STREAM_SOFT_TIMEOUT, **kwargs: Any) -> Dict[str, Any]:
+    """
+    One result from the stream: {"chunks", "final", "stage", "first_event_ms", "done"}.
+    "final" is False when the answer is the preliminary hits of "stage" because the
+    passages did not arrive within soft_timeout of them; "done" is the done event, if any.
+    """
+    started = time.perf_counter()
+    preliminary: List[Dict[str, Any]] = []
+    passages: List[Dict[str, Any]] = []
+    stage: Optional[str] = None
+    first_event_ms: Optional[float] = None
+    done: Optional[Dict[str, Any]] = None
+    deadline: Optional[float] = None
+    events = stream_rag_search(client, query, top_k, **kwargs)
+    try:
+        while True:
+            # the soft deadline only applies while we hold preliminary hits and no passages
+            wait = None if deadline is None or passages else max(0.0, deadline - time.perf_counter())
+            try:
+                event = await asyncio.wait_for(events.__anext__(), wait)
+            except StopAsyncIteration:
+                break
+            except asyncio.TimeoutError:
+                break
+            if first_event_ms is None:
+                first_event_ms = round((time.perf_counter() - started) * 1000, 3)
+            kind = event.get("event")
+            if kind == "chunk":
+                preliminary.append(event["chunk"])
+                stage = event.get("stage")
+                deadline = deadline or time.perf_counter() + soft_timeout
+            elif kind == "passage":
+                passages.append(event["chunk"])
+            elif kind == "done":
+                done = event
+                break
+    finally:
+        await events.aclose()
+    final = bool(passages) or done is not None
+    return {
+        "chunks": passages if final else preliminary,
+        "final": final,
+        "stage": None if final else stage,
+        "first_event_ms": first_event_ms,
+        "done": done,
+    }
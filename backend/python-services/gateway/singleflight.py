@@ -0,0 +1,78 @@
+"""
+Single-flight coalescing for concurrent, identical tool calls.
+
+When several realtime sessions ask for the same thing at the same moment
+(e.g. everyone's morning "daily update"), only the first caller actually hits
+the upstream webhook. Everyone else who arrives while that request is still in
+flight awaits the same result (or the same exception).
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Share one in-flight upstream call between concurrent identical callers."""
+
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.started = 0     # upstream requests actually sent
+        self.collapsed = 0   # callers that piggy-backed on an in-flight request
+
+    @staticmethod
+    def key(tool_name: str, arguments: Dict[str, Any]) -> str:
+        """Stable key for a tool call: tool name + canonical JSON of its arguments."""
+        return f"{tool_name}:{json.dumps(arguments, sort_keys=True, default=str)}"
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            self._calls[key] = call
+            self.started += 1
+            call.task.add_done_callback(lambda _t, k=key, c=call: self._finish(k, c))
+        else:
+            self.collapsed += 1
+            logger.info(f"Single-flight: joined in-flight call {key} ({call.waiters} already waiting)")
+
+        call.waiters += 1
+        try:
+            # shield: one waiter being cancelled must not cancel the shared request
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                # last interested caller is gone, so drop the upstream request too
+                self._forget(key, call)
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "upstream_requests": self.started,
+            "collapsed_requests": self.collapsed,
+            "in_flight": len(self._calls),
+        }
+
+    def _forget(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _finish(self, key: str, call: _Call) -> None:
+        self._forget(key, call)
+        # mark the exception as retrieved even if every waiter went away
+        if not call.task.cancelled():
+            call.task.exception()
@@ -1,21 +1,82 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
 import weaviate
+from weaviate.config import Config, ConnectionConfig
 import os
+import time
+import asyncio
 from dotenv import load_dotenv
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple, Callable
 import json
+import logging
+import uuid
 # Import shared contracts
 import sys
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'shared'))
 from contracts import ToolExecutionRequest, RagSearchParams, RagSearchResult, RagChunk
+# Repo root, for the db/ package (local BM25 index and score fusion)
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', '..'))
+from db.hybrid import get_bm25_index, fuse, tokenize, FUSIONS, RAG_HYBRID_ALPHA, RAG_HYBRID_FUSION
+from db.embed_cache import get_embed_cache
+from db.query_cache import QueryCache, bump_index_generation, index_generation
+from db.path_filters import filter_keys, path_properties, path_where
+from db.diversify import diversify, RAG_DIVERSIFY, RAG_DIVERSIFY_FETCH
+from db.vector_index import get_vector_index
+from weaviate_pool import WeaviatePool, WeaviateBusy
+from search_metrics import SlowQueryLog, StageHistograms, StageTimer
 
 load_dotenv()
+logger = logging.getLogger(__name__)
+
+# vector (near_text) | keyword (BM25) | hybrid (both, fused). Hybrid is opt-in: it changes
+# ranking, and Weaviate BM25 on a collection older than the current schema needs
+# `python manual_ingest.py --reindex` first
+RAG_SEARCH_MODE = os.getenv("RAG_SEARCH_MODE", "vector")
+# Where vectors live: "weaviate", or "local" (db.vector_index.VectorIndex in this process: no
+# Weaviate at all, chunks are embedded here with RAG_EMBED_MODEL and BM25 runs locally too)
+RAG_VECTOR_BACKEND = os.getenv("RAG_VECTOR_BACKEND", "weaviate")
+# Where BM25 runs: "weaviate" (bm25 / hybrid queries) or "local" (db.hybrid.BM25Index, fused
+# here with near_text results; keeps answering keyword-only when Weaviate is unreachable)
+RAG_KEYWORD_INDEX = "local" if RAG_VECTOR_BACKEND == "local" else os.getenv("RAG_KEYWORD_INDEX", "weaviate")
+# Candidates taken from each side per requested result before local fusion
+RAG_HYBRID_CANDIDATES = int(os.getenv("RAG_HYBRID_CANDIDATES", "4"))
+SEARCH_MODES = ("vector", "keyword", "hybrid")
+# Batch search embeds its queries itself (one request) and sends near_vector queries, so the
+# model must be the RagChunk class vectorizer's (text2vec-openai ada-002, see create_schema);
+# the local vector backend embeds indexed chunks with it as well
+RAG_EMBED_MODEL = os.getenv("RAG_EMBED_MODEL", "text-embedding-ada-002")
+RAG_BATCH_MAX_QUERIES = int(os.getenv("RAG_BATCH_MAX_QUERIES", "32"))
+# Weaviate calls run on a thread pool of this size (also the HTTP keep-alive pool size);
+# callers beyond it wait up to RAG_WEAVIATE_QUEUE_TIMEOUT seconds, then get a 503
+RAG_WEAVIATE_CONCURRENCY = int(os.getenv("RAG_WEAVIATE_CONCURRENCY", "16"))
+RAG_WEAVIATE_QUEUE_TIMEOUT = float(os.getenv("RAG_WEAVIATE_QUEUE_TIMEOUT", "10"))
+# Searches at least this slow (ms, including serialization) go to the "rag.slow_query" log; 0 = off
+RAG_SLOW_QUERY_MS = float(os.getenv("RAG_SLOW_QUERY_MS", "1000"))
+
+weaviate_pool = WeaviatePool(RAG_WEAVIATE_CONCURRENCY, RAG_WEAVIATE_QUEUE_TIMEOUT)
+# Repeated / near-identical queries skip embedding and Weaviate; emptied whenever a RagChunk write
+# (any rag-service process) bumps its index generation or the local indexes change. The doc
+# ingest pipeline writes the separate JarvisDocs collection and has its own generation.
+query_cache = QueryCache(generation=lambda: (index_generation("RagChunk"), get_bm25_index().generation,
+                                             get_vector_index().generation if RAG_VECTOR_BACKEND == "local" else 0))
+# Per-stage search timings, served from /metrics
+stage_histograms = StageHistograms()
+slow_queries = SlowQueryLog(RAG_SLOW_QUERY_MS)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    weaviate_pool.close()
+    if RAG_VECTOR_BACKEND == "local":
+        get_vector_index().save()   # persists the HNSW graph, so a restart need not rebuild it
 
 app = FastAPI(
     title="Jarvis RAG Service",
     description="Python microservice for Weaviate vector database and RAG functionality",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -27,13 +88,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize Weaviate client
-weaviate_client = weaviate.Client(
+# Initialize Weaviate client (it waits for Weaviate on startup: not created for the local backend)
+weaviate_client = None if RAG_VECTOR_BACKEND == "local" else weaviate.Client(
     url=os.getenv("WEAVIATE_URL", "http://localhost:8080"),
     auth_client_secret=weaviate.AuthApiKey(api_key=os.getenv("WEAVIATE_API_KEY")) if os.getenv("WEAVIATE_API_KEY") else None,
     additional_headers={
         "X-OpenAI-Api-Key": os.getenv("OPENAI_API_KEY")
-    } if os.getenv("OPENAI_API_KEY") else None
+    } if os.getenv("OPENAI_API_KEY") else None,
+    # one keep-alive connection per pool thread, shared by every request
+    additional_config=Config(connection_config=ConnectionConfig(
+        session_pool_connections=RAG_WEAVIATE_CONCURRENCY,
+        session_pool_maxsize=RAG_WEAVIATE_CONCURRENCY
+    ))
 )
 
 @app.get("/health")
@@ -41,8 +107,11 @@ def health_check():
     """Health check endpoint"""
     try:
         # Test Weaviate connection
-        weaviate_client.schema.get()
-        weaviate_status = "connected"
+        if weaviate_client is None:
+            weaviate_status = "not used"
+        else:
+            weaviate_client.schema.get()
+            weaviate_status = "connected"
     except Exception as e:
         weaviate_status = f"error: {str(e)}"
     
@@ -50,80 +119,495 @@ def health_check():
         "status": "healthy",
         "service": "rag-service",
         "version": "1.0.0",
-        "weaviate_status": weaviate_status
+        "vector_backend": RAG_VECTOR_BACKEND,
+        "weaviate_status": weaviate_status,
+        "weaviate_pool": weaviate_pool.stats(),
+        "vector_index": get_vector_index().stats() if RAG_VECTOR_BACKEND == "local" else None,
+        "query_cache": query_cache.stats()
+    }
+
+def _require_weaviate() -> None:
+    if weaviate_client is None:
+        raise HTTPException(status_code=400, detail="Weaviate is not used (RAG_VECTOR_BACKEND=local)")
+
+def _item_chunk(item: Dict[str, Any], score: float) -> Dict[str, Any]:
+    return {
+        "text": item.get("text", ""),
+        "path": item.get("path", ""),
+        "anchor": item.get("anchor"),
+        "score": min(1.0, max(0.0, score)),
+        "metadata": item.get("metadata", {})
+    }
+
+def _diversified(chunks: List[Dict[str, Any]], vectors: List[Optional[List[float]]], top_k: int) -> List[Dict[str, Any]]:
+    """Merge overlapping chunks of the same file / page into passages, then pick top_k by MMR."""
+    hits = [{**c, "vector": v} for c, v in zip(chunks, vectors)]
+    return diversify(hits, top_k, key=lambda h: (h["path"], (h.get("metadata") or {}).get("page")))
+
+def _weaviate_search(query: str, limit: int, mode: str, alpha: float, fusion: str,
+                     where_filter: Optional[Dict[str, Any]], vector: Optional[List[float]] = None,
+                     with_vectors: bool = False) -> List[Dict[str, Any]]:
+    """
+    One Weaviate query; returns the raw RagChunk items with `_additional` (id, score/certainty,
+    and the stored vector if `with_vectors`). With `vector` (the query already embedded)
+    Weaviate skips vectorizing the query text.
+    """
+    builder = weaviate_client.query.get("RagChunk", ["text", "path", "anchor", "metadata"])
+    extra = ["vector"] if with_vectors else []
+    if mode == "vector":
+        near = builder.with_near_vector({"vector": vector}) if vector is not None else \
+            builder.with_near_text({"concepts": [query]})
+        builder = near.with_additional(["id", "certainty", "distance"] + extra)
+    elif mode == "keyword":
+        builder = builder.with_bm25(query=query, properties=["text"]).with_additional(["id", "score"] + extra)
+    else:
+        from weaviate.gql.get import HybridFusion
+        fusion_type = HybridFusion.RANKED if fusion == "rrf" else HybridFusion.RELATIVE_SCORE
+        builder = (
+            builder.with_hybrid(query=query, alpha=alpha, vector=vector, properties=["text"], fusion_type=fusion_type)
+            .with_additional(["id", "score"] + extra)
+        )
+    builder = builder.with_limit(limit)
+    if where_filter:
+        builder = builder.with_where(where_filter)
+    response = builder.do()
+    if response.get("errors"):
+        raise RuntimeError(response["errors"])
+    return ((response.get("data") or {}).get("Get") or {}).get("RagChunk") or []
+
+def _local_vector_search(limit: int, filter_paths: List[str], vector: Optional[List[float]],
+                         with_vectors: bool = False) -> List[Dict[str, Any]]:
+    """Nearest chunks in the in-process vector index, shaped like Weaviate near_vector items."""
+    if vector is None:
+        raise RuntimeError("the local vector index needs the query embedding")
+    index = get_vector_index()
+    items = []
+    # filter_paths are looked up in the index's path keys, like Weaviate's path_parts filter
+    for doc_id, sim in index.search(vector, limit, any_of=filter_keys(filter_paths)):
+        # Weaviate's certainty for cosine distance
+        additional = {"id": doc_id, "certainty": (1.0 + sim) / 2.0, "distance": 1.0 - sim}
+        if with_vectors:
+            additional["vector"] = index.vector(doc_id)
+        items.append({**index.get(doc_id), "_additional": additional})
+    return items
+
+def _scored_chunks(items: List[Dict[str, Any]], mode: str, fusion: str) -> List[Dict[str, Any]]:
+    """Map Weaviate results to RagChunks with scores in [0, 1]."""
+    if mode == "vector":
+        # certainty is Weaviate's similarity measure
+        return [_item_chunk(i, float(i.get("_additional", {}).get("certainty") or 0)) for i in items]
+    scores = [float(i.get("_additional", {}).get("score") or 0) for i in items]
+    if mode == "hybrid" and fusion == "relative":
+        return [_item_chunk(i, s) for i, s in zip(items, scores)]   # already normalized
+    top = max(scores, default=0.0) or 1.0   # BM25 and rank-fusion scores are relative to the best hit
+    return [_item_chunk(i, s / top) for i, s in zip(items, scores)]
+
+def _local_search(query: str, top_k: int, mode: str, alpha: float, fusion: str,
+                  filter_paths: List[str], where_filter: Optional[Dict[str, Any]],
+                  vector: Optional[List[float]], timer: StageTimer, diverse: bool,
+                  on_hits: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+    """
+    BM25 on the local index, fused with vector results from Weaviate (when it is reachable)
+    or from the local vector index.
+    """
+    index = get_bm25_index()
+    k = top_k * RAG_DIVERSIFY_FETCH if diverse else top_k
+    n = k * RAG_HYBRID_CANDIDATES if mode == "hybrid" else k
+    with timer.stage("filter"):
+        any_of = filter_keys(filter_paths)   # looked up in the index's path keys
+    with timer.stage("keyword"):
+        keyword_hits = index.search(query, n, any_of=any_of) if mode != "vector" else []
+    if on_hits and mode == "hybrid" and keyword_hits:
+        # in-process BM25 answers well before Weaviate does
+        top = keyword_hits[0][1] or 1.0
+        items = [(index.get(i), s / top) for i, s in keyword_hits[:top_k]]
+        on_hits("keyword", [_item_chunk(item, score) for item, score in items if item is not None])
+    vector_items: Dict[str, Dict[str, Any]] = {}
+    degraded = False
+    if mode != "keyword":
+        try:
+            with timer.stage("ann"):
+                if RAG_VECTOR_BACKEND == "local":
+                    items = _local_vector_search(n, filter_paths, vector, diverse)
+                else:
+                    items = _weaviate_search(query, n, "vector", alpha, fusion, where_filter, vector, diverse)
+                for item in items:
+                    vector_items[item["_additional"]["id"]] = item
+        except Exception as e:
+            if mode == "vector":
+                raise
+            logger.warning(f"Vector search unavailable, answering from the keyword index only: {e}")
+            degraded = True
+
+    with timer.stage("rerank"):
+        vector_hits = [(i, float(item["_additional"].get("certainty") or 0)) for i, item in vector_items.items()]
+        if mode == "vector":
+            fused = vector_hits
+        elif mode == "keyword" or degraded:
+            top = keyword_hits[0][1] if keyword_hits else 1.0
+            fused = [(i, s / top) for i, s in keyword_hits]
+        else:
+            fused = fuse(vector_hits, keyword_hits, alpha, fusion)
+        chunks, vectors = [], []
+        for doc_id, score in fused[:k]:
+            item = vector_items.get(doc_id) or index.get(doc_id)
+            if item is not None:
+                chunks.append(_item_chunk(item, score))
+                vectors.append((item.get("_additional") or {}).get("vector"))
+    if diverse:
+        if on_hits:
+            on_hits("ranked", chunks[:top_k])
+        with timer.stage("diversify"):
+            chunks = _diversified(chunks, vectors, top_k)
+    return {"chunks": chunks, "mode": "keyword" if degraded else mode, "degraded": degraded}
+
+def _search(query: str, top_k: int, mode: str, alpha: float, fusion: str, filter_paths: List[str],
+            vector: Optional[List[float]] = None, timer: Optional[StageTimer] = None,
+            diverse: bool = False,
+            on_hits: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+    """
+    One retrieval (runs on the Weaviate pool): {"chunks", "mode", "degraded"}. With `diverse`
+    it over-fetches, merges overlapping neighbours and picks top_k by MMR on the stored vectors.
+    `on_hits(stage, chunks)` is called with preliminary top_k lists, best first, as soon as
+    they exist: "keyword" (local BM25, before the vector query returns) and "ranked" (before
+    diversify). It runs on the pool thread.
+    """
+    timer = timer or StageTimer()
+    # filter_paths become Equal / ContainsAny on the indexed path components
+    with timer.stage("filter"):
+        where_filter = path_where(filter_paths)
+    if RAG_KEYWORD_INDEX == "local":
+        return _local_search(query, top_k, mode, alpha, fusion, filter_paths, where_filter, vector, timer, diverse,
+                             on_hits)
+    limit = top_k * RAG_DIVERSIFY_FETCH if diverse else top_k
+    with timer.stage("ann"):
+        items = _weaviate_search(query, limit, mode, alpha, fusion, where_filter, vector, diverse)
+    with timer.stage("rerank"):
+        chunks = _scored_chunks(items, mode, fusion)
+    if diverse:
+        if on_hits:
+            on_hits("ranked", chunks[:top_k])
+        with timer.stage("diversify"):
+            chunks = _diversified(chunks, [i["_additional"].get("vector") for i in items], top_k)
+    return {"chunks": chunks, "mode": mode, "degraded": False}
+
+def _pooled_search(submitted: float, timer: StageTimer, *args: Any, **kwargs: Any) -> Dict[str, Any]:
+    """_search on a pool thread, counting the wait for the slot as the "queue" stage."""
+    timer.add("queue", (time.perf_counter() - submitted) * 1000)
+    return _search(*args, timer=timer, **kwargs)
+
+def _search_options(params: Dict[str, Any]) -> Tuple[str, float, str, bool]:
+    """(mode, alpha, fusion, diversify) from the request, defaulting to the service settings."""
+    mode = params.get("mode") or RAG_SEARCH_MODE
+    alpha = params.get("alpha")
+    fusion = params.get("fusion") or RAG_HYBRID_FUSION
+    diverse = params.get("diversify")
+    diverse = RAG_DIVERSIFY if diverse is None else bool(diverse)
+    if mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(SEARCH_MODES)}")
+    if fusion not in FUSIONS:
+        raise HTTPException(status_code=400, detail=f"fusion must be one of {', '.join(FUSIONS)}")
+    try:
+        alpha = RAG_HYBRID_ALPHA if alpha is None else float(alpha)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="alpha must be a number between 0 and 1")
+    if not 0.0 <= alpha <= 1.0:   # also rejects NaN
+        raise HTTPException(status_code=400, detail="alpha must be a number between 0 and 1")
+    return mode, alpha, fusion, diverse
+
+_query_embedder = None
+
+def _embed_queries(queries: List[str]) -> List[List[float]]:
+    """All queries in one embeddings request (repeats served from the shared embedding cache)."""
+    global _query_embedder
+    if _query_embedder is None:
+        from db.embed_client import EmbeddingClient
+        # interactive path: one quick retry, then let Weaviate vectorize instead
+        _query_embedder = EmbeddingClient(model=RAG_EMBED_MODEL, dimensions=None, max_in_flight=1, max_retries=1)
+    vectors = get_embed_cache().get_or_embed(queries, _query_embedder.embed, RAG_EMBED_MODEL)
+    return [v.astype("float32").tolist() for v in vectors]
+
+async def _embed_or_none(queries: List[str]) -> List[Optional[List[float]]]:
+    try:
+        return await asyncio.to_thread(_embed_queries, queries)
+    except Exception as e:   # Weaviate vectorizes each query itself instead
+        logger.warning(f"Query embedding failed, falling back to Weaviate-side vectorization: {e}")
+        return [None] * len(queries)
+
+async def _searches(queries: List[str], top_k: int, mode: str, alpha: float, fusion: str,
+                    filter_paths: List[str], diverse: bool = False,
+                    on_hits: Optional[Callable[[str, List[Dict[str, Any]]], None]] = None
+                    ) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Run queries through the query cache: exact hits are answered first, the rest are embedded
+    in one request and checked against the semantic tier, and whatever is left is searched
+    concurrently on the Weaviate pool. Returns per-query results (with their stage timings)
+    and the shared timings (ms). `on_hits` is passed to _search (single-query streaming).
+    """
+    started = time.perf_counter()
+    filters = {"top_k": top_k, "filter_paths": sorted(filter_paths or []), "mode": mode,
+               "alpha": alpha, "fusion": fusion, "index": RAG_KEYWORD_INDEX, "diversify": diverse}
+    results: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+    timers = [StageTimer() for _ in queries]
+    done = [started] * len(queries)
+    for i, query in enumerate(queries):
+        with timers[i].stage("cache"):
+            cached = query_cache.get_exact(query, filters)
+        if cached is not None:
+            results[i] = {**cached, "cached": "exact"}
+            done[i] = time.perf_counter()
+    generation = query_cache.generation()
+    misses = [i for i, r in enumerate(results) if r is None]
+    vectors: Dict[int, Optional[List[float]]] = {}
+    embedding = time.perf_counter()
+    if mode != "keyword" and misses:
+        vectors = dict(zip(misses, await _embed_or_none([queries[i] for i in misses])))
+        for i in misses:   # one request for all of them
+            timers[i].add("embed", (time.perf_counter() - embedding) * 1000)
+    embedded = time.perf_counter()
+
+    async def one(i: int) -> None:
+        timer, query, vector = timers[i], queries[i], vectors.get(i)
+        # keyword scores depend on the exact terms, so near-identical embeddings are not enough
+        terms = None if mode == "vector" else frozenset(tokenize(query))
+        with timer.stage("cache"):
+            cached = query_cache.get_similar(vector, filters, terms) if vector is not None else None
+        if cached is not None:
+            result = {**cached, "cached": "semantic"}
+        else:
+            result = await weaviate_pool.run(_pooled_search, time.perf_counter(), timer,
+                                             query, top_k, mode, alpha, fusion, filter_paths, vector,
+                                             diverse=diverse, on_hits=on_hits)
+            if not result["degraded"]:
+                query_cache.put(query, filters, result, vector=vector, terms=terms, generation=generation)
+            result["cached"] = None
+        results[i] = result
+        done[i] = time.perf_counter()
+
+    await asyncio.gather(*(one(i) for i in misses))
+    finished = time.perf_counter()
+    for i, result in enumerate(results):
+        result["query_time_ms"] = int((done[i] - started) * 1000)
+        result["timings"] = timers[i].rounded()
+    return results, {
+        "embedding_time_ms": int((embedded - started) * 1000),
+        "search_time_ms": int((finished - embedded) * 1000),
+        "query_time_ms": int((finished - started) * 1000)
     }
 
+def _json_with(key: str, raw: str, rest: Dict[str, Any]) -> str:
+    """JSON object with `key` set to the already-encoded `raw`, followed by `rest`."""
+    return "{" + json.dumps(key) + ": " + raw + (", " + json.dumps(rest, default=str)[1:] if rest else "}")
+
+def _server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{stage};dur={ms:.1f}" for stage, ms in timings.items())
+
+def _record_timings(result: Dict[str, Any], params: Dict[str, Any], total_ms: float) -> None:
+    """Feed one query's stage times to the histograms and the slow-query log."""
+    stage_histograms.observe({**result["timings"], "total": total_ms})
+    slow_queries.check(total_ms, {**params, "cached": result.get("cached"), "degraded": result.get("degraded")},
+                       result["timings"])
+
 @app.post("/tools/rag_search")
 async def rag_search(request: ToolExecutionRequest):
-    """Execute RAG search using Weaviate"""
+    """Execute RAG search: vector, keyword (BM25) or hybrid retrieval"""
     try:
         params = request.parameters
         query = params.get("query", "")
         top_k = params.get("top_k", 5)
         filter_paths = params.get("filter_paths", [])
-        
+
         if not query:
             raise HTTPException(status_code=400, detail="Query parameter is required")
-        
-        # Build Weaviate query
-        where_filter = None
-        if filter_paths:
-            # Create filter for specific paths
-            where_filter = {
-                "operator": "Or",
-                "operands": [
-                    {
-                        "path": ["path"],
-                        "operator": "Like",
-                        "valueText": f"*{path}*"
-                    } for path in filter_paths
-                ]
-            }
-        
-        # Execute semantic search
-        result = (
-            weaviate_client.query
-            .get("RagChunk", ["text", "path", "anchor", "metadata"])
-            .with_near_text({"concepts": [query]})
-            .with_limit(top_k)
-            .with_additional(["certainty", "distance"])
-        )
-        
-        if where_filter:
-            result = result.with_where(where_filter)
-        
-        response = result.do()
-        
-        # Process results
-        chunks = []
-        if "data" in response and "Get" in response["data"] and "RagChunk" in response["data"]["Get"]:
-            for item in response["data"]["Get"]["RagChunk"]:
-                # Calculate score from certainty (Weaviate's similarity measure)
-                certainty = item.get("_additional", {}).get("certainty", 0)
-                score = float(certainty) if certainty else 0.0
-                
-                chunks.append({
-                    "text": item.get("text", ""),
-                    "path": item.get("path", ""),
-                    "anchor": item.get("anchor"),
-                    "score": score,
-                    "metadata": item.get("metadata", {})
-                })
-        
-        return {
+        mode, alpha, fusion, diverse = _search_options(params)
+
+        started = time.perf_counter()
+        results, timing = await _searches([query], top_k, mode, alpha, fusion, filter_paths, diverse)
+        result = results[0]
+        chunks = result["chunks"]
+
+        # the chunks are the bulk of the response: encode them first so the cost is reported too
+        t0 = time.perf_counter()
+        chunks_json = json.dumps(chunks, default=str)
+        result["timings"]["serialize"] = round((time.perf_counter() - t0) * 1000, 3)
+        body = _json_with("chunks", chunks_json, {
             "success": True,
-            "chunks": chunks,
             "total_found": len(chunks),
-            "query_time_ms": 0,  # TODO: Add timing
-            "query": query
-        }
-        
+            "query_time_ms": timing["query_time_ms"],
+            "timings": result["timings"],
+            "query": query,
+            "mode": result["mode"],
+            "degraded": result["degraded"],
+            "cached": result["cached"]
+        })
+        _record_timings(result, {"query": query, "top_k": top_k, "mode": mode, "alpha": alpha, "fusion": fusion,
+                                 "filter_paths": filter_paths, "diversify": diverse},
+                        (time.perf_counter() - started) * 1000)
+        return Response(body, media_type="application/json",
+                        headers={"Server-Timing": _server_timing(result["timings"])})
+
+    except HTTPException:
+        raise
+    except WeaviateBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"RAG search failed: {str(e)}")
 
+@app.post("/tools/rag_search_batch")
+async def rag_search_batch(request: ToolExecutionRequest):
+    """Run several searches at once: one embedding request, concurrent Weaviate queries"""
+    try:
+        params = request.parameters
+        raw = params.get("queries")
+        # a bare string would otherwise be searched character by character
+        queries = [q for q in raw if isinstance(q, str) and q.strip()] if isinstance(raw, list) else []
+        top_k = params.get("top_k", 5)
+        filter_paths = params.get("filter_paths", [])
+
+        if not queries:
+            raise HTTPException(status_code=400, detail="queries must be a non-empty list of strings")
+        if len(queries) > RAG_BATCH_MAX_QUERIES:
+            raise HTTPException(status_code=400, detail=f"At most {RAG_BATCH_MAX_QUERIES} queries per batch")
+        mode, alpha, fusion, diverse = _search_options(params)
+
+        results, timing = await _searches(queries, top_k, mode, alpha, fusion, filter_paths, diverse)
+
+        t0 = time.perf_counter()
+        results_json = json.dumps([
+            {"query": q, "total_found": len(r["chunks"]), **r} for q, r in zip(queries, results)
+        ], default=str)
+        serialize_ms = (time.perf_counter() - t0) * 1000
+        body = _json_with("results", results_json, {
+            "success": True,
+            "total_queries": len(results),
+            **timing,
+            "serialize_time_ms": int(serialize_ms)
+        })
+        stage_histograms.observe({"serialize": serialize_ms})
+        for q, r in zip(queries, results):
+            _record_timings(r, {"query": q, "top_k": top_k, "mode": mode, "alpha": alpha, "fusion": fusion,
+                                "filter_paths": filter_paths, "diversify": diverse, "batch": len(queries)},
+                            r["query_time_ms"])
+        return Response(body, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except WeaviateBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"RAG batch search failed: {str(e)}")
+
+def _ndjson(event: Dict[str, Any]) -> bytes:
+    return (json.dumps(event, default=str) + "\n").encode()
+
+@app.post("/tools/rag_search_stream")
+async def rag_search_stream(request: ToolExecutionRequest):
+    """
+    rag_search as NDJSON, one event per line, so the caller can act on the best hit early:
+        {"event": "chunk", "stage": "keyword" | "ranked", "rank": 0, "chunk": {...}}
+            preliminary hits, best first: local BM25 before the vector query returns (hybrid
+            with RAG_KEYWORD_INDEX=local), or the ranked hits before merging / MMR (diversify)
+        {"event": "passage", "rank": 0, "chunk": {...}}
+            the final results, best first; they replace any preliminary chunks
+        {"event": "done", "total_found", "query_time_ms", "first_event_ms", "timings", "mode", ...}
+        {"event": "error", "status": 503, "detail": "..."}   (after the 200 has been sent)
+    Only the first preliminary list is streamed; cache hits go straight to the passages.
+    """
+    params = request.parameters
+    query = params.get("query", "")
+    top_k = params.get("top_k", 5)
+    filter_paths = params.get("filter_paths", [])
+    if not query:
+        raise HTTPException(status_code=400, detail="Query parameter is required")
+    mode, alpha, fusion, diverse = _search_options(params)
+
+    async def events():
+        started = time.perf_counter()
+        first_event_ms = None
+        loop = asyncio.get_running_loop()
+        preliminary: asyncio.Queue = asyncio.Queue()
+
+        def on_hits(stage: str, chunks: List[Dict[str, Any]]) -> None:   # pool thread
+            loop.call_soon_threadsafe(preliminary.put_nowait, (stage, chunks))
+
+        async def search():
+            try:
+                return await _searches([query], top_k, mode, alpha, fusion, filter_paths, diverse, on_hits=on_hits)
+            finally:
+                preliminary.put_nowait(None)
+
+        task = asyncio.create_task(search())
+        streamed = False
+        try:
+            while (item := await preliminary.get()) is not None:
+                stage, chunks = item
+                if streamed or not chunks:
+                    continue
+                streamed = True
+                first_event_ms = first_event_ms or round((time.perf_counter() - started) * 1000, 3)
+                for rank, chunk in enumerate(chunks):
+                    yield _ndjson({"event": "chunk", "stage": stage, "rank": rank, "chunk": chunk})
+            results, timing = await task
+        except WeaviateBusy as e:
+            yield _ndjson({"event": "error", "status": 503, "detail": str(e)})
+            return
+        except Exception as e:
+            yield _ndjson({"event": "error", "status": 500, "detail": f"RAG search failed: {str(e)}"})
+            return
+        finally:
+            task.cancel()
+
+        result = results[0]
+        first_event_ms = first_event_ms or round((time.perf_counter() - started) * 1000, 3)
+        for rank, chunk in enumerate(result["chunks"]):
+            yield _ndjson({"event": "passage", "rank": rank, "chunk": chunk})
+        yield _ndjson({
+            "event": "done",
+            "success": True,
+            "total_found": len(result["chunks"]),
+            "query_time_ms": timing["query_time_ms"],
+            "first_event_ms": first_event_ms,
+            "timings": result["timings"],
+            "query": query,
+            "mode": result["mode"],
+            "degraded": result["degraded"],
+            "cached": result["cached"]
+        })
+        _record_timings(result, {"query": query, "top_k": top_k, "mode": mode, "alpha": alpha, "fusion": fusion,
+                                 "filter_paths": filter_paths, "diversify": diverse, "stream": True},
+                        (time.perf_counter() - started) * 1000)
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@app.get("/metrics")
+def metrics():
+    """Per-stage search latency histograms (Prometheus text format)"""
+    return Response(stage_histograms.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/metrics/slow_queries")
+def recent_slow_queries(limit: int = 20):
+    """The most recent searches slower than RAG_SLOW_QUERY_MS"""
+    return {"threshold_ms": slow_queries.threshold_ms, "queries": slow_queries.recent(limit)}
+
+def _index_document(document_obj: Dict[str, Any]) -> str:
+    if RAG_VECTOR_BACKEND == "local":
+        # embedded here: the same model Weaviate's vectorizer would use for the chunk
+        result = str(uuid.uuid4())
+        get_vector_index().add({"id": result, **document_obj}, _embed_queries([document_obj["text"]])[0])
+    else:
+        # Add to Weaviate, with the path components filter_paths match on
+        result = weaviate_client.data_object.create(
+            data_object={**document_obj, **path_properties(document_obj["path"])},
+            class_name="RagChunk"
+        )
+    # Keep the local keyword index in step (ids match, so hits fuse with vector results)
+    get_bm25_index().add({"id": result, **document_obj})
+    bump_index_generation("RagChunk")
+    return result
+
 @app.post("/index/document")
 async def index_document(request: Dict[str, Any]):
-    """Index a document into Weaviate"""
+    """Index a document into Weaviate (or the local vector index)"""
     try:
         path = request.get("path")
         text = request.get("text")
@@ -140,11 +624,7 @@ async def index_document(request: Dict[str, Any]):
             "metadata": metadata
         }
         
-        # Add to Weaviate
-        result = weaviate_client.data_object.create(
-            data_object=document_obj,
-            class_name="RagChunk"
-        )
+        result = await weaviate_pool.run(_index_document, document_obj)
         
         return {
             "success": True,
@@ -152,19 +632,65 @@ async def index_document(request: Dict[str, Any]):
             "message": f"Document indexed: {path}"
         }
         
+    except HTTPException:
+        raise
+    except WeaviateBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Document indexing failed: {str(e)}")
 
+def _delete_document(document_id: str) -> bool:
+    if RAG_VECTOR_BACKEND == "local":
+        found = get_vector_index().remove(document_id)
+    else:
+        found = weaviate_client.data_object.exists(document_id, class_name="RagChunk")
+        if found:
+            weaviate_client.data_object.delete(document_id, class_name="RagChunk")
+    found = get_bm25_index().remove(document_id) or found
+    if found:
+        bump_index_generation("RagChunk")
+    return found
+
+@app.delete("/index/document/{document_id}")
+async def delete_document(document_id: str):
+    """Remove one indexed chunk by its document id"""
+    try:
+        if not await weaviate_pool.run(_delete_document, document_id):
+            raise HTTPException(status_code=404, detail=f"Document not found: {document_id}")
+        return {
+            "success": True,
+            "document_id": document_id,
+            "message": f"Document deleted: {document_id}"
+        }
+
+    except HTTPException:
+        raise
+    except WeaviateBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Document deletion failed: {str(e)}")
+
 @app.get("/index/stats")
 async def get_index_stats():
     """Get statistics about the indexed documents"""
     try:
+        if RAG_VECTOR_BACKEND == "local":
+            index = get_vector_index()
+            return {
+                "success": True,
+                "total_documents": len(index),
+                "keyword_index_documents": len(get_bm25_index()),
+                "vector_index": index.stats(),
+                "index_version": "1.0.0",
+                "embedding_model": RAG_EMBED_MODEL
+            }
+
         # Get total count
-        result = (
+        result = await weaviate_pool.run(
             weaviate_client.query
             .aggregate("RagChunk")
             .with_meta_count()
-            .do()
+            .do
         )
         
         total_count = 0
@@ -175,16 +701,130 @@ async def get_index_stats():
         return {
             "success": True,
             "total_documents": total_count,
+            "keyword_index_documents": len(get_bm25_index()),
             "index_version": "1.0.0",
             "embedding_model": "text-embedding-ada-002"  # Default OpenAI model
         }
         
+    except WeaviateBusy as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get stats: {str(e)}")
 
+def _rebuild_keyword_index() -> int:
+    index = get_bm25_index()
+    docs, after = [], None
+    if RAG_VECTOR_BACKEND == "local":
+        docs = get_vector_index().documents()
+    while weaviate_client is not None:   # page through every RagChunk
+        page = (
+            weaviate_client.query
+            .get("RagChunk", ["text", "path", "anchor", "metadata"])
+            .with_additional(["id"])
+            .with_limit(500)
+        )
+        if after:
+            page = page.with_after(after)
+        items = page.do().get("data", {}).get("Get", {}).get("RagChunk") or []
+        if not items:
+            break
+        for item in items:
+            after = item["_additional"]["id"]
+            docs.append({"id": after, "text": item.get("text", ""), "path": item.get("path", ""),
+                         "anchor": item.get("anchor"), "metadata": item.get("metadata", {})})
+    index.clear()
+    index.add_many(docs, persist=False)
+    index.save()
+    return len(docs)
+
+@app.post("/index/rebuild_keyword_index")
+async def rebuild_keyword_index():
+    """Rebuild the local BM25 index from every RagChunk in Weaviate (or the local vector index)"""
+    try:
+        n = await weaviate_pool.run(_rebuild_keyword_index)
+        return {
+            "success": True,
+            "keyword_index_documents": len(get_bm25_index()),
+            "message": f"Keyword index rebuilt from {n} chunks"
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Keyword index rebuild failed: {str(e)}")
+
+# Path components for indexed filter_paths (db.path_filters): field tokenization, filterable only
+PATH_PROPERTY_SCHEMA = [
+    {
+        "name": "path_parts",
+        "dataType": ["text[]"],
+        "description": "Every run of consecutive path components (folders, file name, full path)",
+        "tokenization": "field",
+        "indexFilterable": True,
+        "indexSearchable": False,
+        "moduleConfig": {"text2vec-openai": {"skip": True, "vectorizePropertyName": False}}
+    },
+    {
+        "name": "extension",
+        "dataType": ["text"],
+        "description": "Lowercase file extension without the dot",
+        "tokenization": "field",
+        "indexFilterable": True,
+        "indexSearchable": False,
+        "moduleConfig": {"text2vec-openai": {"skip": True, "vectorizePropertyName": False}}
+    }
+]
+
+def _backfill_path_properties() -> Tuple[int, int]:
+    """Add the path filter properties to the class and to every chunk stored without them."""
+    existing = {p["name"] for p in weaviate_client.schema.get("RagChunk").get("properties", [])}
+    for prop in PATH_PROPERTY_SCHEMA:
+        if prop["name"] not in existing:
+            weaviate_client.schema.property.create("RagChunk", prop)
+    seen = updated = 0
+    after = None
+    while True:
+        page = (
+            weaviate_client.query
+            .get("RagChunk", ["path", "path_parts"])
+            .with_additional(["id"])
+            .with_limit(500)
+        )
+        if after:
+            page = page.with_after(after)
+        items = page.do().get("data", {}).get("Get", {}).get("RagChunk") or []
+        if not items:
+            break
+        for item in items:
+            after = item["_additional"]["id"]
+            seen += 1
+            if not item.get("path_parts") and item.get("path"):
+                weaviate_client.data_object.update(
+                    data_object=path_properties(item["path"]), class_name="RagChunk", uuid=after
+                )
+                updated += 1
+    if updated:
+        bump_index_generation("RagChunk")
+    return seen, updated
+
+@app.post("/index/backfill_path_properties")
+async def backfill_path_properties():
+    """Store path filter properties on chunks indexed before they existed"""
+    _require_weaviate()
+    try:
+        seen, updated = await weaviate_pool.run(_backfill_path_properties)
+        return {
+            "success": True,
+            "chunks": seen,
+            "updated": updated,
+            "message": f"Path properties added to {updated} of {seen} chunks"
+        }
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Path property backfill failed: {str(e)}")
+
 @app.post("/index/create_schema")
 async def create_schema():
     """Create the RagChunk schema in Weaviate"""
+    _require_weaviate()
     try:
         schema = {
             "class": "RagChunk",
@@ -242,15 +882,15 @@ async def create_schema():
                         }
                     }
                 }
-            ]
+            ] + PATH_PROPERTY_SCHEMA
         }
         
         # Check if schema already exists
-        existing_schema = weaviate_client.schema.get()
+        existing_schema = await weaviate_pool.run(weaviate_client.schema.get)
         existing_classes = [cls["class"] for cls in existing_schema.get("classes", [])]
         
         if "RagChunk" not in existing_classes:
-            weaviate_client.schema.create_class(schema)
+            await weaviate_pool.run(weaviate_client.schema.create_class, schema)
             return {
                 "success": True,
                 "message": "RagChunk schema created successfully"
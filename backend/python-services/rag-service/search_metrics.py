@@ -0,0 +1,107 @@
+"""
+Per-stage timing for the RAG search path.
+
+Each query gets a StageTimer. The handlers wrap the stages it goes through:
+    cache      exact / semantic query cache lookups
+    embed      the query embeddings request (shared by a batch)
+    queue      waiting for a Weaviate pool slot
+    filter     turning filter_paths into a where filter / predicate
+    ann        the vector (or Weaviate keyword / hybrid) query
+    keyword    the local BM25 index, when RAG_KEYWORD_INDEX=local
+    rerank     fusing and rescoring hits into chunks
+    diversify  merging overlapping chunks and MMR selection
+    serialize  encoding the response
+The stage times are returned with every result. StageHistograms accumulates
+them as Prometheus-style cumulative histograms, served as text from
+GET /metrics, so no client library is needed. A query whose total time
+reaches the slow-query threshold is logged as one JSON line on the
+"rag.slow_query" logger, with its parameters and stage times. The last
+`keep` such queries are also kept for GET /metrics/slow_queries.
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+slow_query_logger = logging.getLogger("rag.slow_query")
+
+# ms; a final +Inf bucket is implied
+DEFAULT_BUCKETS = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class StageTimer:
+    """Wall time per stage of one query, in ms. A stage that runs more than once adds up."""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - t0) * 1000)
+
+    def add(self, name: str, ms: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def rounded(self) -> Dict[str, float]:
+        return {name: round(ms, 3) for name, ms in self.stages.items()}
+
+
+class StageHistograms:
+    """Cumulative latency histograms per stage (plus "total"), rendered in Prometheus text format."""
+
+    def __init__(self, name: str = "rag_search_stage_ms", buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.buckets = tuple(sorted(buckets))
+        self._counts: Dict[str, List[int]] = {}   # stage -> per-bucket counts (last one is +Inf)
+        self._sums: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stages: Dict[str, float]) -> None:
+        with self._lock:
+            for stage, ms in stages.items():
+                counts = self._counts.setdefault(stage, [0] * (len(self.buckets) + 1))
+                counts[next((i for i, b in enumerate(self.buckets) if ms <= b), len(self.buckets))] += 1
+                self._sums[stage] = self._sums.get(stage, 0.0) + ms
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} RAG search time per stage in milliseconds", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for stage in sorted(self._counts):
+                running = 0
+                for bound, n in zip([*self.buckets, "+Inf"], self._counts[stage]):
+                    running += n
+                    lines.append(f'{self.name}_bucket{{stage="{stage}",le="{bound}"}} {running}')
+                lines.append(f'{self.name}_sum{{stage="{stage}"}} {self._sums[stage]:.3f}')
+                lines.append(f'{self.name}_count{{stage="{stage}"}} {running}')
+        return "\n".join(lines) + "\n"
+
+
+class SlowQueryLog:
+    """Log (and keep the last `keep`) queries whose total time is at least `threshold_ms`."""
+
+    def __init__(self, threshold_ms: float = 1000.0, keep: int = 100):
+        self.threshold_ms = threshold_ms
+        self._recent: deque = deque(maxlen=keep)
+        self._lock = threading.Lock()
+
+    def check(self, total_ms: float, params: Dict[str, Any], stages: Dict[str, float]) -> bool:
+        if self.threshold_ms <= 0 or total_ms < self.threshold_ms:
+            return False
+        entry = {"at": time.time(), "total_ms": round(total_ms, 3), "params": params, "stages": stages}
+        with self._lock:
+            self._recent.append(entry)
+        slow_query_logger.warning(json.dumps(entry, default=str))
+        return True
+
+    def recent(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            entries = list(self._recent)
+        return entries[-limit:] if limit else entries
@@ -0,0 +1,91 @@
+"""
+Thread-pooled access to the synchronous v3 Weaviate client.
+
+The v3 client blocks on HTTP, so calling it straight from an async handler
+stalls the event loop and concurrent searches run one at a time. WeaviatePool
+runs those calls on a dedicated thread pool instead. The client's HTTP session
+keeps as many keep-alive connections as the pool has threads, so every worker
+reuses a warm connection. At most `concurrency` calls are in flight. Callers
+beyond that wait in line for up to `queue_timeout` seconds and then get
+WeaviateBusy, which the handlers turn into a 503, so an overloaded Weaviate
+sheds load instead of piling up requests. A caller that is cancelled while its
+call runs keeps holding the slot until the call returns.
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class WeaviateBusy(RuntimeError):
+    """No Weaviate slot became free within the queue timeout."""
+
+
+class WeaviatePool:
+    """Run blocking Weaviate calls off the event loop with bounded concurrency."""
+
+    def __init__(self, concurrency: int = 16, queue_timeout: float = 10.0):
+        self.concurrency = max(1, concurrency)
+        self.queue_timeout = queue_timeout
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="weaviate")
+        self._slots: Optional[asyncio.Semaphore] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.completed = 0
+        self.rejected = 0   # callers that gave up waiting for a slot
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        # created on first use so it belongs to the running loop
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        return self._slots
+
+    async def run(self, fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        slots = self._semaphore()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise WeaviateBusy(f"all {self.concurrency} Weaviate slots busy for {self.queue_timeout:g}s")
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        loop = asyncio.get_running_loop()
+
+        def release() -> None:
+            self.in_flight -= 1
+            self.completed += 1
+            slots.release()
+
+        def on_done(_: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(release)
+            except RuntimeError:   # loop already closed, nobody left to hand the slot to
+                pass
+
+        try:
+            job = self._executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            release()
+            raise
+        # the slot is freed when the call itself finishes, not when the caller stops waiting:
+        # a cancelled request (client gone, deadline) leaves its job running on the client
+        job.add_done_callback(on_done)
+        return await asyncio.wrap_future(job)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "concurrency": self.concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
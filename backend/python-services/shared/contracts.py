@@ -6,10 +6,32 @@ from enum import Enum
 # TOOL PARAMETER SCHEMAS (Pydantic for runtime validation)
 # =============================================================================
 
+class RagSearchMode(str, Enum):
+    vector = "vector"
+    keyword = "keyword"
+    hybrid = "hybrid"
+
+class RagFusion(str, Enum):
+    rrf = "rrf"
+    relative = "relative"
+
 class RagSearchParams(BaseModel):
     query: str = Field(..., min_length=1, description="Query cannot be empty")
     top_k: int = Field(5, ge=1, le=20, description="Number of results to return (1-20)")
-    filter_paths: Optional[List[str]] = Field(None, description="Optional: filter to specific files/folders")
+    filter_paths: Optional[List[str]] = Field(None, description="Optional: filter to specific files/folders (whole path components) or extensions like '.md'")
+    mode: Optional[RagSearchMode] = Field(None, description="Optional: vector, keyword (BM25) or hybrid; defaults to the service setting")
+    alpha: Optional[float] = Field(None, ge=0.0, le=1.0, description="Optional: hybrid weight of the vector side (1 = pure vector)")
+    fusion: Optional[RagFusion] = Field(None, description="Optional: hybrid fusion, rank-based (rrf) or normalized scores (relative)")
+    diversify: Optional[bool] = Field(None, description="Optional: merge overlapping chunks and diversify results (MMR); defaults to the service setting")
+
+class RagSearchBatchParams(BaseModel):
+    queries: List[str] = Field(..., min_length=1, max_length=32, description="Queries to run together (1-32)")
+    top_k: int = Field(5, ge=1, le=20, description="Number of results per query (1-20)")
+    filter_paths: Optional[List[str]] = Field(None, description="Optional: filter to specific files/folders (whole path components) or extensions like '.md'")
+    mode: Optional[RagSearchMode] = Field(None, description="Optional: vector, keyword (BM25) or hybrid; defaults to the service setting")
+    alpha: Optional[float] = Field(None, ge=0.0, le=1.0, description="Optional: hybrid weight of the vector side (1 = pure vector)")
+    fusion: Optional[RagFusion] = Field(None, description="Optional: hybrid fusion, rank-based (rrf) or normalized scores (relative)")
+    diversify: Optional[bool] = Field(None, description="Optional: merge overlapping chunks and diversify results (MMR); defaults to the service setting")
 
 class NoteAppendParams(BaseModel):
     path: str = Field(..., min_length=1, description="Path cannot be empty")
@@ -116,11 +138,31 @@ class RagChunk(BaseModel):
     anchor: Optional[str] = Field(None, description="Section header or page number")
     score: float = Field(..., ge=0.0, le=1.0)
     metadata: Optional[Dict[str, Any]] = None
+    merged: int = Field(1, ge=1, description="Overlapping chunks merged into this passage")
 
 class RagSearchResult(BaseModel):
     chunks: List[RagChunk]
     total_found: int
     query_time_ms: int
+    timings: Dict[str, float] = Field(default_factory=dict, description="ms per stage: cache, embed, queue, filter, ann, keyword, rerank, diversify, serialize")
+
+class RagQueryResult(RagSearchResult):
+    query: str
+
+class RagStreamEvent(BaseModel):
+    """One NDJSON line of /tools/rag_search_stream."""
+    event: str = Field(..., description="chunk (preliminary hit), passage (final result), done or error")
+    stage: Optional[str] = Field(None, description="chunk events: keyword (local BM25) or ranked (before merging / MMR)")
+    rank: Optional[int] = Field(None, description="chunk / passage events: position, best first")
+    chunk: Optional[RagChunk] = None
+
+class RagSearchBatchResult(BaseModel):
+    results: List[RagQueryResult]
+    total_queries: int
+    embedding_time_ms: int
+    search_time_ms: int
+    query_time_ms: int
+    serialize_time_ms: int = 0
 
 class NoteAppendResult(BaseModel):
     success: bool
@@ -0,0 +1,117 @@
+"""
+Weaviate write throughput: fixed 128-object batches vs. the BatchWriter.
+
+    python benchmarks/bench_batch_writer.py --objects 20000 --dims 3072 --latency-ms 40
+
+The collection is a stand-in whose insert_many sleeps for a fixed round trip
+plus a per-MB transfer cost, and fails a fraction of objects (transient
+errors) so retries are exercised. Reports objects/s and MB/s per mode.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from weaviate.classes.data import DataObject  # noqa: E402
+
+from db.batch_writer import BatchWriter, payload_bytes  # noqa: E402
+
+
+class _Error:
+    def __init__(self, message):
+        self.message = message
+
+
+class _Result:
+    def __init__(self, errors):
+        self.errors = errors
+
+
+class SlowCollection:
+    def __init__(self, latency_ms, ms_per_mb, fail_rate, seed=0):
+        self.data = self
+        self.latency_ms, self.ms_per_mb, self.fail_rate = latency_ms, ms_per_mb, fail_rate
+        self.rng = random.Random(seed)
+        self.stored = set()
+        self.lock = threading.Lock()
+
+    def insert_many(self, objs):
+        mb = sum(payload_bytes(o) for o in objs) / 2**20
+        time.sleep((self.latency_ms + self.ms_per_mb * mb) / 1000.0)
+        errors = {}
+        with self.lock:
+            for i, o in enumerate(objs):
+                if self.rng.random() < self.fail_rate:
+                    errors[i] = _Error("context deadline exceeded")
+                else:
+                    self.stored.add(o.uuid)
+        return _Result(errors)
+
+
+def objects(n, dims, seed=0):
+    rng = random.Random(seed)
+    vec = [rng.random() for _ in range(dims)]
+    for i in range(n):
+        yield DataObject(properties={"text": "lorem ipsum dolor sit amet " * 40, "source_path": f"/bench/{i // 50}.md"},
+                         vector=vec, uuid=str(uuid.UUID(int=i)))
+
+
+def fixed_batches(col, objs, size=128):
+    batch, failed = [], 0
+    for o in objs:
+        batch.append(o)
+        if len(batch) >= size:
+            failed += len(col.insert_many(batch).errors)
+            batch = []
+    if batch:
+        failed += len(col.insert_many(batch).errors)
+    return failed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--objects", type=int, default=20000)
+    ap.add_argument("--dims", type=int, default=3072)
+    ap.add_argument("--latency-ms", type=float, default=40.0)
+    ap.add_argument("--ms-per-mb", type=float, default=8.0)
+    ap.add_argument("--fail-rate", type=float, default=0.01)
+    ap.add_argument("--batch-mb", type=float, nargs="+", default=[1, 4, 8])
+    ap.add_argument("--in-flight", type=int, nargs="+", default=[1, 2, 4])
+    args = ap.parse_args()
+
+    total_mb = sum(payload_bytes(o) for o in objects(args.objects, args.dims)) / 2**20
+    print(f"{args.objects} objects x {args.dims} dims ({total_mb:.0f} MB), "
+          f"{args.latency_ms:.0f} ms + {args.ms_per_mb:.0f} ms/MB per request, {args.fail_rate:.1%} transient failures")
+    print(f"{'mode':<26} {'seconds':>8} {'objects/s':>10} {'MB/s':>7} {'stored':>7} {'lost':>5}")
+
+    col = SlowCollection(args.latency_ms, args.ms_per_mb, args.fail_rate)
+    t0 = time.perf_counter()
+    lost = fixed_batches(col, objects(args.objects, args.dims))
+    elapsed = time.perf_counter() - t0
+    print(f"{'fixed 128, sequential':<26} {elapsed:>8.2f} {args.objects / elapsed:>10.0f} "
+          f"{total_mb / elapsed:>7.1f} {len(col.stored):>7} {lost:>5}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for mb in args.batch_mb:
+            for in_flight in args.in_flight:
+                col = SlowCollection(args.latency_ms, args.ms_per_mb, args.fail_rate)
+                writer = BatchWriter(col, max_bytes=int(mb * 2**20), in_flight=in_flight,
+                                     dead_letter=os.path.join(tmp, "dead.jsonl"))
+                with writer:
+                    for o in objects(args.objects, args.dims):
+                        writer.add(o)
+                t = writer.throughput()
+                label = f"{mb:g} MB batches, {in_flight} in flight"
+                print(f"{label:<26} {t['seconds']:>8.2f} {t['objects_per_s']:>10.0f} {t['mb_per_s']:>7.1f} "
+                      f"{len(col.stored):>7} {t['dead_lettered']:>5.0f}")
+
+
+if __name__ == "__main__":
+    main()
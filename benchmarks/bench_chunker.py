@@ -0,0 +1,78 @@
+"""
+Chunker throughput and scaling on large and pathological inputs.
+
+    python benchmarks/bench_chunker.py --sizes 0.1 1 10
+
+For each size (in MB) chunks a synthetic markdown document, one long line with
+no whitespace, and one long run of words with no sentence punctuation. Reports
+MB/s and chunks per input; MB/s should stay flat as the input grows (linear
+time), and every chunk must respect the token limit.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import WORDS, markdown_document  # noqa: E402
+from db.chunking import iter_chunks, CHUNK_TOKENS, CHUNK_OVERLAP_TOKENS  # noqa: E402
+
+
+def markdown_text(rng, n_bytes):
+    parts, size = [], 0
+    while size < n_bytes:
+        doc = markdown_document(rng, sections=rng.randint(4, 12))
+        parts.append(doc)
+        size += len(doc)
+    return "\n\n".join(parts)[:n_bytes]
+
+
+def no_whitespace(rng, n_bytes):
+    return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(n_bytes))
+
+
+def no_punctuation(rng, n_bytes):
+    words, size = [], 0
+    while size < n_bytes:
+        w = rng.choice(WORDS)
+        words.append(w)
+        size += len(w) + 1
+    return " ".join(words)[:n_bytes]
+
+
+INPUTS = {"markdown": markdown_text, "no-whitespace": no_whitespace, "no-punctuation": no_punctuation}
+
+
+def run(text, max_tokens, overlap):
+    t0 = time.perf_counter()
+    n, biggest = 0, 0
+    for ch in iter_chunks(text, max_tokens, overlap):
+        n += 1
+        biggest = max(biggest, ch["tokens"])
+    return time.perf_counter() - t0, n, biggest
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=float, nargs="+", default=[0.1, 1, 10], help="input sizes in MB")
+    ap.add_argument("--max-tokens", type=int, default=CHUNK_TOKENS)
+    ap.add_argument("--overlap", type=int, default=CHUNK_OVERLAP_TOKENS)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    print(f"max_tokens={args.max_tokens} overlap={args.overlap}")
+    print(f"{'input':>15} {'MB':>7} {'seconds':>9} {'MB/s':>8} {'chunks':>9} {'max tok':>8}")
+    for name, make in INPUTS.items():
+        for mb in args.sizes:
+            text = make(random.Random(args.seed), int(mb * 1_000_000))
+            elapsed, n, biggest = run(text, args.max_tokens, args.overlap)
+            if biggest > args.max_tokens:
+                raise SystemExit(f"{name} {mb}MB: chunk of {biggest} tokens exceeds {args.max_tokens}")
+            print(f"{name:>15} {mb:>7.1f} {elapsed:>9.2f} {mb / elapsed:>8.2f} {n:>9} {biggest:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+rag_search tool output size: plain chunk listing vs. the token-budgeted packer.
+
+    python benchmarks/bench_context_pack.py --top-k 5 10 20 --budget 800
+
+Chunks come from benchmarks.corpus markdown run through db.chunking (about
+CHUNK_TOKENS tokens each, from a handful of files) with descending scores,
+as rag_search returns them. For each top_k, reports the tokens of the old
+"From <path>: <text>" listing, the tokens of the packed context
+(gateway/context_packer.py), how many chunks made it in and how many were cut
+at a sentence boundary, and the p50 time to pack.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "backend", "python-services", "gateway"))
+
+from benchmarks.corpus import markdown_document  # noqa: E402
+from db.chunking import iter_chunks  # noqa: E402
+from db.embed_client import count_tokens  # noqa: E402
+from context_packer import ContextPacker  # noqa: E402
+
+
+def result_sets(n_sets, top_k, seed):
+    rng = random.Random(seed)
+    pool = []
+    for f in range(12):
+        path = f"/home/user/uploads/notes/file{f}.md"
+        pool += [{"text": ch["text"], "path": path, "anchor": ch["anchor"]}
+                 for ch in iter_chunks(markdown_document(rng, sections=4))]
+    for _ in range(n_sets):
+        picked = rng.sample(pool, top_k)
+        yield [{**c, "score": round(0.9 - i * 0.02, 3)} for i, c in enumerate(picked)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--top-k", type=int, nargs="+", default=[5, 10, 20])
+    ap.add_argument("--budget", type=int, default=800, help="RAG_CONTEXT_TOKENS")
+    ap.add_argument("--chunk-tokens", type=int, default=250, help="RAG_CONTEXT_CHUNK_TOKENS")
+    ap.add_argument("--sets", type=int, default=50, help="result lists per top_k")
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    print(f"budget {args.budget} tokens, at most {args.chunk_tokens} per chunk")
+    print(f"{'top_k':>5} {'plain tok':>10} {'packed tok':>11} {'saved':>7} {'chunks in':>10} {'cut':>5} {'pack ms':>8}")
+    for top_k in args.top_k:
+        packer = ContextPacker(args.budget, args.chunk_tokens)
+        plain, packed, used, cut, times = [], [], [], [], []
+        for chunks in result_sets(args.sets, top_k, args.seed):
+            listing = f"Found {len(chunks)} relevant results:\n\n" + "\n\n".join(
+                f"From {c['path']}: {c['text']}" for c in chunks)
+            t0 = time.perf_counter()
+            r = packer.pack(chunks)
+            times.append((time.perf_counter() - t0) * 1000)
+            plain.append(count_tokens(listing))
+            packed.append(r["tokens"])
+            used.append(r["chunks_used"])
+            cut.append(r["chunks_truncated"])
+        saved = 1 - np.mean(packed) / np.mean(plain)
+        print(f"{top_k:>5} {np.mean(plain):>10.0f} {np.mean(packed):>11.0f} {saved:>7.0%} {np.mean(used):>10.1f} "
+              f"{np.mean(cut):>5.1f} {np.percentile(times, 50):>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Redundancy in retrieved chunks: plain top-k vs. overlap merging + MMR (db.diversify).
+
+    python benchmarks/bench_diversify.py --docs 200 --queries 200 --k 5
+
+Synthetic documents (sections whose sentences share section-specific terms)
+are chunked with db.chunking.iter_chunks, so neighbouring chunks share
+CHUNK_OVERLAP_TOKENS of text as they do at ingest. A bag-of-words stand-in
+embedder makes chunks of one section similar, as a real embedding model
+does. Each query asks about one section (a few of its terms), so several
+consecutive chunks of it rank high. The k nearest chunks are compared with diversify() over --fetch x k candidates at several
+MMR lambdas. Reports per result list:
+    repeated   share of the returned text that repeats text already returned
+    sources    distinct documents among the results
+    sections   distinct document sections the results cover
+    chars      characters handed to the model
+    ms         p50 time of the post-retrieval stage alone
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from db.chunking import iter_chunks  # noqa: E402
+from db.diversify import diversify  # noqa: E402
+
+TOPICS = 40
+SECTION = re.compile(r"d(\d+)s(\d+)term", re.I)
+
+
+def build_corpus(n_docs, seed):
+    rng = random.Random(seed)
+    vocab = [[f"t{t}w{w}" for w in range(30)] for t in range(TOPICS)]
+    filler = [f"common{w}" for w in range(200)]
+    chunks = []
+    for d in range(n_docs):
+        topics = rng.sample(range(TOPICS), 2)
+        paras = []
+        for p in range(rng.randint(3, 8)):
+            # a section: its own terms recur in every sentence, alongside topic and filler words
+            terms = [f"d{d}s{p}term{j}" for j in range(8)]
+            topic = vocab[rng.choice(topics)]
+            sentences = [
+                " ".join(rng.sample(terms, 2) + rng.sample(topic, 2) + rng.sample(filler, 2)).capitalize() + "."
+                for _ in range(rng.randint(20, 60))
+            ]
+            paras.append(" ".join(sentences))
+        for ch in iter_chunks("\n\n".join(paras)):
+            chunks.append({"text": ch["text"], "source_path": f"/docs/{d}.md", "page": None})
+    return chunks, vocab
+
+
+def embed(texts, dims):
+    out = np.zeros((len(texts), dims), dtype=np.float32)
+    for i, text in enumerate(texts):
+        for w in text.lower().replace(".", "").split():
+            out[i, zlib.crc32(w.encode()) % dims] += 1.0
+    return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+
+def repeated_share(texts):
+    """Share of 8-word shingles in texts (in order) that were already returned."""
+    seen, repeated, total = set(), 0, 0
+    for t in texts:
+        words = t.split()
+        for i in range(max(len(words) - 7, 1)):
+            shingle = tuple(words[i:i + 8])
+            repeated += shingle in seen
+            total += 1
+            seen.add(shingle)
+    return repeated / max(total, 1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--fetch", type=int, default=4, help="candidates per result for diversify")
+    ap.add_argument("--lambdas", type=float, nargs="+", default=[1.0, 0.7, 0.5])
+    ap.add_argument("--dims", type=int, default=4096)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    chunks, vocab = build_corpus(args.docs, args.seed)
+    matrix = embed([c["text"] for c in chunks], args.dims)
+    rng = random.Random(args.seed + 1)
+    queries = []
+    for _ in range(args.queries):   # a question about one section: a few of its terms and a topic word
+        words = chunks[rng.randrange(len(chunks))]["text"].lower().replace(".", "").split()
+        terms = sorted({w for w in words if "term" in w})
+        topic = [w for w in words if w.startswith("t")]
+        queries.append(" ".join(rng.sample(terms, min(3, len(terms))) + rng.sample(topic, min(1, len(topic)))))
+    q_matrix = embed(queries, args.dims)
+    print(f"{len(chunks)} chunks from {args.docs} documents, {args.queries} queries, k={args.k}")
+
+    ways = [("plain top-k", None)] + [(f"merge+MMR l={lam:g}", lam) for lam in args.lambdas]
+    print(f"{'way':<20} {'repeated':>9} {'sources':>8} {'sections':>9} {'chars':>7} {'ms':>7}")
+    for label, lam in ways:
+        repeated, sources, sections, chars, times = [], [], [], [], []
+        for q in q_matrix:
+            scores = matrix @ q
+            n = args.k * (args.fetch if lam is not None else 1)
+            top = np.argpartition(-scores, n)[:n]
+            top = top[np.argsort(-scores[top])]
+            t0 = time.perf_counter()
+            if lam is None:
+                results = [chunks[i] for i in top]
+            else:
+                hits = [{**chunks[i], "score": float(scores[i]), "vector": matrix[i]} for i in top]
+                results = diversify(hits, args.k, key=lambda h: (h["source_path"], h["page"]), lambda_=lam)
+            times.append((time.perf_counter() - t0) * 1000)
+            texts = [r["text"] for r in results]
+            repeated.append(repeated_share(texts))
+            sources.append(len({r["source_path"] for r in results}))
+            sections.append(len({m.groups() for t in texts for m in SECTION.finditer(t)}))
+            chars.append(sum(len(t) for t in texts))
+        print(f"{label:<20} {np.mean(repeated):>9.3f} {np.mean(sources):>8.2f} {np.mean(sections):>9.2f} "
+              f"{np.mean(chars):>7.0f} "
+              f"{np.percentile(times, 50):>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Embedding client throughput against the local fake endpoint (no OpenAI costs).
+
+    python benchmarks/bench_embed_client.py --texts 2000 --latency-ms 150
+
+Starts benchmarks/fake_openai.py in-process, then embeds the same texts with
+the old strategy (sequential fixed 64-item batches) and with EmbeddingClient
+at several in-flight settings. Reports texts/s, request count and 429 retries.
+"""
+
+import argparse
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+import httpx  # noqa: E402
+import uvicorn  # noqa: E402
+from openai import OpenAI  # noqa: E402
+
+from benchmarks.corpus import WORDS  # noqa: E402
+from benchmarks.fake_openai import create_app  # noqa: E402
+from db.embed_client import EmbeddingClient  # noqa: E402
+
+
+def start_server(port, **kwargs):
+    server = uvicorn.Server(uvicorn.Config(create_app(**kwargs), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def sequential_fixed_batches(client, texts, dims):
+    for i in range(0, len(texts), 64):
+        client.embeddings.create(model="text-embedding-3-large", input=texts[i:i + 64], dimensions=dims)
+
+
+def baseline(base_url, texts, dims):
+    t0 = time.perf_counter()
+    sequential_fixed_batches(OpenAI(base_url=base_url, max_retries=5), texts, dims)
+    elapsed = time.perf_counter() - t0
+    print(f"{'sequential, 64 per request':<28} {elapsed:>8.2f} {len(texts) / elapsed:>9.1f} "
+          f"{(len(texts) + 63) // 64:>9} {'-':>5}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--texts", type=int, default=2000)
+    ap.add_argument("--words", type=int, default=180, help="words per text (~1 chunk)")
+    ap.add_argument("--dims", type=int, default=256, help="smaller vectors keep the fake server cheap")
+    ap.add_argument("--latency-ms", type=float, default=150.0)
+    ap.add_argument("--rpm", type=int, default=0, help="make the fake server rate limit")
+    ap.add_argument("--port", type=int, default=8099)
+    args = ap.parse_args()
+
+    server = start_server(args.port, latency_ms=args.latency_ms, rpm=args.rpm, default_dims=args.dims)
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    rng = random.Random(7)
+    texts = [" ".join(rng.choice(WORDS) for _ in range(args.words)) for _ in range(args.texts)]
+
+    print(f"{args.texts} texts x {args.words} words, fake latency {args.latency_ms:.0f} ms, rpm={args.rpm or 'inf'}")
+    print(f"{'mode':<28} {'seconds':>8} {'texts/s':>9} {'requests':>9} {'429s':>5}")
+    if args.rpm:
+        print("(sequential baseline skipped: it would only measure 429 back-off)")
+    else:
+        baseline(base_url, texts, args.dims)
+
+    for in_flight in (1, 4, 8, 16):
+        httpx.post(f"http://127.0.0.1:{args.port}/reset")
+        client = EmbeddingClient(
+            dimensions=args.dims, max_in_flight=in_flight, rpm=args.rpm or 10_000,
+            client=OpenAI(base_url=base_url, max_retries=0),
+        )
+        t0 = time.perf_counter()
+        vecs = client.embed(texts)
+        elapsed = time.perf_counter() - t0
+        assert len(vecs) == len(texts) and all(len(v) == args.dims for v in vecs)
+        label = f"client, {in_flight} in flight"
+        print(f"{label:<28} {elapsed:>8.2f} {len(texts) / elapsed:>9.1f} "
+              f"{client.stats['requests']:>9} {client.stats['rate_limited']:>5}")
+        client.pool.shutdown()
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+"""
+Retrieval quality and latency: vector vs. BM25 vs. hybrid (RRF / relative-score fusion).
+
+    python benchmarks/bench_hybrid.py --docs 20000 --queries 300 --k 5
+
+The corpus is synthetic but built to show both failure modes. Words are
+surface forms of "concepts" (three synonyms each) and the stand-in embedder
+sums concept vectors, so it matches paraphrases the way a real embedding
+model does but drowns a single rare token among a hundred others. Two query
+sets, each with one relevant chunk:
+    paraphrase  the chunk's specific concepts, mostly spelled with other synonyms
+    exact       an identifier (error code, ticket id) that appears in only that
+                chunk, plus a few generic words
+Reports recall@k per query set and p50/p95 latency per mode, all on the local
+path (numpy brute-force vectors + db.hybrid.BM25Index + db.hybrid.fuse);
+Weaviate's hybrid query runs the same two fusions server-side.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import zlib
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from db.hybrid import BM25Index, fuse, tokenize  # noqa: E402
+
+SYLLABLES = "ka lo mi nu pe ra si to vu xe za bo".split()
+
+
+def pseudo_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+class Corpus:
+    def __init__(self, n_docs, dims, seed):
+        rng = random.Random(seed)
+        self.rng = rng
+        n_concepts = max(2000, n_docs // 2)
+        self.forms = [[pseudo_word(rng) + str(c) for _ in range(3)] for c in range(n_concepts)]
+        self.concept_of = {w: c for c, forms in enumerate(self.forms) for w in forms}
+        nrng = np.random.default_rng(seed)
+        self.concept_vecs = nrng.standard_normal((n_concepts, dims)).astype(np.float32)
+        self.dims = dims
+        self.background = list(range(200))   # common concepts every chunk draws from
+        self.docs, self.specific, self.idents = [], [], []
+        for i in range(n_docs):
+            # the chunk's own topic: five concepts, each spelled one way throughout the chunk
+            specific = [(c, rng.randrange(3)) for c in rng.sample(range(200, n_concepts), 5)]
+            words = [self.forms[c][form] for c, form in specific for _ in range(4)]
+            words += [rng.choice(self.forms[rng.choice(self.background)]) for _ in range(80)]
+            ident = None
+            if rng.random() < 0.3:
+                ident = f"err{i:06d}x{rng.randint(100, 999)}"
+                words.insert(rng.randrange(len(words)), ident)
+            rng.shuffle(words)
+            self.docs.append({"id": f"doc-{i}", "text": " ".join(words), "path": f"/notes/{i // 20}.md"})
+            self.specific.append(specific)
+            self.idents.append(ident)
+
+    def embed(self, text):
+        v = np.zeros(self.dims, dtype=np.float32)
+        for w in tokenize(text):
+            c = self.concept_of.get(w)
+            if c is None:   # unknown token (identifiers): its own random direction
+                v += np.random.default_rng(zlib.crc32(w.encode())).standard_normal(self.dims).astype(np.float32)
+            else:
+                v += self.concept_vecs[c]
+        return v / max(np.linalg.norm(v), 1e-12)
+
+    def paraphrase_queries(self, n):
+        out = []
+        for i in self.rng.sample(range(len(self.docs)), n):
+            # a paraphrase: mostly the synonyms the chunk does not use
+            words = [self.forms[c][(form + self.rng.choice((0, 1, 1, 2, 2))) % 3] for c, form in self.specific[i]]
+            out.append((" ".join(words), f"doc-{i}"))
+        return out
+
+    def exact_queries(self, n):
+        with_ident = [i for i, ident in enumerate(self.idents) if ident]
+        out = []
+        for i in self.rng.sample(with_ident, min(n, len(with_ident))):
+            generic = [self.rng.choice(self.forms[self.rng.choice(self.background)]) for _ in range(3)]
+            out.append((f"what does {self.idents[i]} mean " + " ".join(generic), f"doc-{i}"))
+        return out
+
+
+def vector_search(matrix, ids, q_vec, k):
+    scores = matrix @ q_vec
+    top = np.argpartition(-scores, min(k, len(ids) - 1))[:k]
+    top = top[np.argsort(-scores[top])]
+    return [(ids[i], float(scores[i])) for i in top]
+
+
+def run_mode(mode, queries, corpus, matrix, ids, index, k, candidates):
+    alpha, fusion = mode[1], mode[2]
+    hits, times = 0, []
+    for query, gold in queries:
+        t0 = time.perf_counter()
+        if alpha == 1.0:
+            ranked = vector_search(matrix, ids, corpus.embed(query), k)
+        elif alpha == 0.0:
+            ranked = index.search(query, k)
+        else:
+            n = k * candidates
+            ranked = fuse(vector_search(matrix, ids, corpus.embed(query), n), index.search(query, n), alpha, fusion)
+        times.append((time.perf_counter() - t0) * 1000)
+        hits += gold in {doc_id for doc_id, _ in ranked[:k]}
+    return hits / max(len(queries), 1), times
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--docs", type=int, default=20000)
+    ap.add_argument("--queries", type=int, default=300, help="per query set")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--dims", type=int, default=256)
+    ap.add_argument("--candidates", type=int, default=4, help="candidates per side = k x this")
+    ap.add_argument("--alphas", type=float, nargs="+", default=[0.3, 0.5, 0.7])
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    t0 = time.perf_counter()
+    corpus = Corpus(args.docs, args.dims, args.seed)
+    matrix = np.stack([corpus.embed(d["text"]) for d in corpus.docs])
+    ids = [d["id"] for d in corpus.docs]
+    t1 = time.perf_counter()
+    index = BM25Index(path=None)
+    index.add_many(corpus.docs, persist=False)
+    t2 = time.perf_counter()
+    print(f"{args.docs} chunks, {args.dims} dims: corpus + vectors {t1 - t0:.1f}s, BM25 index {t2 - t1:.1f}s")
+
+    sets = {"paraphrase": corpus.paraphrase_queries(args.queries), "exact": corpus.exact_queries(args.queries)}
+    modes = [("vector", 1.0, None), ("keyword (BM25)", 0.0, None)]
+    for fusion in ("rrf", "relative"):
+        modes += [(f"hybrid {fusion} a={a:g}", a, fusion) for a in args.alphas]
+
+    print(f"{'mode':<24} {'para R@' + str(args.k):>10} {'exact R@' + str(args.k):>10} {'all':>6} "
+          f"{'p50 ms':>8} {'p95 ms':>8}")
+    for mode in modes:
+        recalls, times = {}, []
+        for name, queries in sets.items():
+            recalls[name], t = run_mode(mode, queries, corpus, matrix, ids, index, args.k, args.candidates)
+            times += t
+        overall = sum(recalls[n] * len(sets[n]) for n in sets) / sum(len(q) for q in sets.values())
+        p50, p95 = np.percentile(times, [50, 95])
+        print(f"{mode[0]:<24} {recalls['paraphrase']:>10.3f} {recalls['exact']:>10.3f} {overall:>6.3f} "
+              f"{p50:>8.2f} {p95:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+"""
+End-to-end ingestion benchmark: synthetic corpus -> ingest -> in-memory Weaviate.
+
+    python benchmarks/bench_ingest.py --markdown 200 --pdf 5 --pdf-pages 100
+    python benchmarks/bench_ingest.py --json before.json        # on the old commit
+    python benchmarks/bench_ingest.py --compare before.json     # on the new one
+
+Runs weaviate_utils.ingest_paths (or manual_ingest.ingest_path with
+--entry manual_ingest) with the OpenAI client replaced by a deterministic
+fake embedder (optionally with simulated request latency) and Weaviate by
+benchmarks.fakes.InMemoryClient. The manifest, embedding cache and
+dead-letter file live in a temp dir, so every run starts cold.
+
+Reports wall time, chunks/s, peak RSS and per-stage busy time:
+    parse   reading markdown / extracting PDF pages
+    chunk   iter_chunks
+    dedup   SimHash of each chunk
+    embed   embed_texts (cache + fake embedder)
+    insert  insert_many on the in-memory collection
+Stages run concurrently, so busy times can add up to more than the wall time.
+The corpus is seeded and the JSON output records the commit, so runs on
+different commits are comparable.
+"""
+
+import argparse
+import json
+import os
+import pathlib
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+STAGES = ("parse", "chunk", "dedup", "embed", "insert")
+
+
+class StageTimer:
+    def __init__(self):
+        self.busy = {s: 0.0 for s in STAGES}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            self.busy[stage] += seconds
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - t0)
+        return timed
+
+    def wrap_iter(self, stage, fn):
+        """Time spent inside next() of the generator fn returns."""
+        def timed(*args, **kwargs):
+            it = iter(fn(*args, **kwargs))
+            while True:
+                t0 = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    self.add(stage, time.perf_counter() - t0)
+                    return
+                self.add(stage, time.perf_counter() - t0)
+                yield item
+        return timed
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def git_commit():
+    root = os.path.join(os.path.dirname(__file__), "..")
+    try:
+        sha = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=root, capture_output=True,
+                             text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+                               capture_output=True, text=True).stdout.strip()
+        return sha + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args, tmp):
+    os.environ["INGEST_MANIFEST"] = os.path.join(tmp, "manifest.json")
+    os.environ["EMBED_CACHE_PATH"] = os.path.join(tmp, "embed_cache.sqlite3")
+    os.environ["INGEST_DEAD_LETTER"] = os.path.join(tmp, "dead_letter.jsonl")
+    os.environ["INDEX_GENERATION_DIR"] = os.path.join(tmp, "index_generations")
+    os.environ.setdefault("OPENAI_API_KEY", "fake")
+
+    from benchmarks.corpus import write_corpus
+    from benchmarks.fakes import InMemoryClient, fake_embed_matrix
+    import db.weaviate_utils as wu
+
+    corpus = pathlib.Path(tmp) / "corpus"
+    t0 = time.perf_counter()
+    write_corpus(corpus, args.markdown, args.pdf, args.pdf_pages, args.seed)
+    corpus_mb = sum(p.stat().st_size for p in corpus.iterdir()) / 2**20
+    print(f"corpus: {args.markdown} md + {args.pdf} pdf x {args.pdf_pages} pages ({corpus_mb:.1f} MB, "
+          f"written in {time.perf_counter() - t0:.1f}s)")
+
+    timer = StageTimer()
+    client = InMemoryClient(insert_latency_ms=args.insert_latency_ms)
+    col = client.collection(wu.COLLECTION)
+    col.data.insert_many = timer.wrap("insert", col.data.insert_many)
+
+    def fake_embed(texts):
+        time.sleep(args.embed_latency_ms / 1000.0)
+        return fake_embed_matrix(texts, args.dims)
+
+    wu.connect_weaviate = client.connect
+    wu._embed_uncached = fake_embed
+    wu.embed_texts = timer.wrap("embed", wu.embed_texts)
+    wu.read_markdown = timer.wrap("parse", wu.read_markdown)
+    iter_pdf_files = timer.wrap_iter("parse", wu.iter_pdf_files)
+    wu.iter_pdf_files = lambda *a, **kw: (
+        (path, timer.wrap_iter("parse", lambda p=pages: p)()) for path, pages in iter_pdf_files(*a, **kw)
+    )
+    wu.iter_chunks = timer.wrap_iter("chunk", wu.iter_chunks)
+    wu.simhash = timer.wrap("dedup", wu.simhash)
+
+    if args.entry == "manual_ingest":
+        import manual_ingest
+        ingest = lambda: manual_ingest.ingest_path(str(corpus))
+    else:
+        ingest = lambda: wu.ingest_paths([str(corpus)])
+
+    base_rss = rss_mb()
+    t0 = time.perf_counter()
+    ingest()
+    wall = time.perf_counter() - t0
+    result = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "params": {k: v for k, v in vars(args).items() if k not in ("json", "compare")},
+        "chunks": len(col),
+        "wall_s": wall,
+        "chunks_per_s": len(col) / wall if wall else 0.0,
+        "stages_s": dict(timer.busy),
+        "peak_rss_mb": rss_mb(),
+        "rss_over_base_mb": rss_mb() - base_rss,
+        "insert_requests": col.stats["insert_requests"],
+    }
+    if args.rerun:
+        t0 = time.perf_counter()
+        ingest()
+        result["rerun_s"] = time.perf_counter() - t0
+    return result
+
+
+def report(r, base=None):
+    def cmp(key, value, higher_is_better=False):
+        if not base:
+            return ""
+        old = base.get(key) if not isinstance(key, tuple) else base.get(key[0], {}).get(key[1])
+        if not old:
+            return ""
+        ratio = value / old
+        better = ratio > 1 if higher_is_better else ratio < 1
+        return f"  ({ratio:.2f}x {'better' if better else 'worse' if ratio != 1 else 'same'} than {base.get('commit')})"
+
+    print(f"commit {r['commit']}, {r['params']['entry']}")
+    print(f"{'chunks':<18} {r['chunks']:>10}")
+    print(f"{'wall':<18} {r['wall_s']:>9.2f}s{cmp('wall_s', r['wall_s'])}")
+    print(f"{'chunks/s':<18} {r['chunks_per_s']:>10.1f}{cmp('chunks_per_s', r['chunks_per_s'], True)}")
+    print(f"{'peak RSS':<18} {r['peak_rss_mb']:>8.0f}MB{cmp('peak_rss_mb', r['peak_rss_mb'])}")
+    print(f"{'insert requests':<18} {r['insert_requests']:>10}")
+    for stage in STAGES:
+        s = r["stages_s"][stage]
+        pct = 100.0 * s / r["wall_s"] if r["wall_s"] else 0.0
+        print(f"  {stage:<16} {s:>9.2f}s {pct:>5.0f}% of wall{cmp(('stages_s', stage), s)}")
+    if "rerun_s" in r:
+        print(f"{'no-change rerun':<18} {r['rerun_s']:>9.2f}s{cmp('rerun_s', r['rerun_s'])}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--markdown", type=int, default=200)
+    ap.add_argument("--pdf", type=int, default=5)
+    ap.add_argument("--pdf-pages", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--dims", type=int, default=3072)
+    ap.add_argument("--embed-latency-ms", type=float, default=0.0, help="simulated latency per embedding request")
+    ap.add_argument("--insert-latency-ms", type=float, default=0.0, help="simulated latency per insert request")
+    ap.add_argument("--entry", choices=("ingest_paths", "manual_ingest"), default="ingest_paths")
+    ap.add_argument("--rerun", action="store_true", help="also time a second, no-change ingest")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--compare", help="results JSON from an earlier run to compare against")
+    args = ap.parse_args()
+
+    base = json.loads(pathlib.Path(args.compare).read_text()) if args.compare else None
+    with tempfile.TemporaryDirectory() as tmp:
+        result = run(args, tmp)
+    report(result, base)
+    if args.json:
+        pathlib.Path(args.json).write_text(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
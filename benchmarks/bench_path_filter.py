@@ -0,0 +1,277 @@
+"""
+Filtered search latency: wildcard Like on the path vs. indexed path components.
+
+    python benchmarks/bench_path_filter.py --chunks 10000 100000 1000000 --bm25-chunks 10000 100000
+    python benchmarks/bench_path_filter.py --weaviate-url http://localhost:8080 --weaviate-chunks 100000
+
+Builds a synthetic tree of files (--chunks-per-file chunks each, nested
+three to six folders deep) and filters it by a folder, a single file and an
+extension. Three sections, each labelled in the output:
+
+modelled (always): the two Weaviate where-filters reimplemented in Python,
+each followed by a brute-force vector search restricted to the matching
+chunks. No Weaviate is involved; this shows how the costs scale, not what a
+server measures.
+    like     Like "*<filter>*" on the path. The leading wildcard rules out
+             an index seek, so every distinct stored path is matched
+             against the pattern on every query
+    indexed  Equal / ContainsAny on path_parts and extension, i.e. hash
+             lookups in an inverted index from each component to its chunks
+    none     no filter (top-k over every chunk), for reference
+
+measured, local BM25 (--bm25-chunks): db.hybrid.BM25Index, the keyword
+index rag-service queries in-process, searched for a common term with
+    post     the pre-index filter: a predicate on each hit's path, walking
+             the ranked hits until top-k pass
+    any_of   filter_keys() looked up in the index's path keys, so only the
+             postings of matching chunks are scored
+
+measured, Weaviate (--weaviate-url): a scratch class with RagChunk's path
+properties is filled with --weaviate-chunks chunks (random vectors, the
+server's import time is not part of the result), then the same near_vector
+query runs with the old Or-of-Like where-filter and with path_where(). The
+class is deleted afterwards.
+
+Reports matching chunks and p50 times. Where the counts differ, Like matched
+more by substring ("clients/nova1" also hits "clients/nova12/...").
+"""
+
+import argparse
+import fnmatch
+import os
+import random
+import re
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from db.hybrid import BM25Index  # noqa: E402
+from db.path_filters import (  # noqa: E402
+    filter_keys, path_extension, path_keys, path_parts, path_properties, path_where, split_filters,
+)
+
+TOP = ["projects", "notes", "archive", "clients", "research", "admin"]
+WORDS = "alpha bravo delta echo gamma kilo lima nova oscar polar quartz sierra tango zulu".split()
+EXTS = ["md", "md", "md", "pdf", "pdf", "txt"]
+BENCH_CLASS = "PathFilterBench"
+
+
+def build_tree(n_files, seed):
+    rng = random.Random(seed)
+    paths = []
+    for i in range(n_files):
+        depth = rng.randint(1, 4)
+        dirs = [rng.choice(TOP)] + [f"{rng.choice(WORDS)}{rng.randrange(20)}" for _ in range(depth)]
+        paths.append("/".join(["", "data", *dirs, f"{rng.choice(WORDS)}-{i}.{rng.choice(EXTS)}"]))
+    return paths
+
+
+def sample_filters(paths):
+    sample = paths[len(paths) // 2].split("/")
+    return {
+        "folder " + "/".join(sample[2:-1][:2]): ["/".join(sample[2:-1][:2])],
+        "file " + sample[-1]: [sample[-1]],
+        "extension .pdf": [".pdf"],
+    }
+
+
+def build_index(paths):
+    """component -> file ids, the inverted index Weaviate keeps for a filterable property."""
+    index = {}
+    for f, path in enumerate(paths):
+        props = path_properties(path)
+        for part in props["path_parts"]:
+            index.setdefault(("path_parts", part), []).append(f)
+        index.setdefault(("extension", props["extension"]), []).append(f)
+    return {k: np.asarray(v, dtype=np.int64) for k, v in index.items()}
+
+
+def chunk_ids(files, per_file):
+    return (files[:, None] * per_file + np.arange(per_file)).ravel()
+
+
+def like_filter(paths, filter_paths, per_file):
+    patterns = [re.compile(fnmatch.translate(f"*{f}*")) for f in filter_paths]
+    files = [i for i, p in enumerate(paths) if any(pat.match(p) for pat in patterns)]
+    return chunk_ids(np.asarray(files, dtype=np.int64), per_file)
+
+
+def indexed_filter(index, filter_paths, per_file):
+    parts, exts = split_filters(filter_paths)
+    postings = [index.get(("path_parts", p)) for p in parts] + [index.get(("extension", e)) for e in exts]
+    postings = [p for p in postings if p is not None]
+    files = np.unique(np.concatenate(postings)) if postings else np.zeros(0, dtype=np.int64)
+    return chunk_ids(files, per_file)
+
+
+def restricted_search(matrix, allowed, q, k):
+    if allowed is None:
+        scores = matrix @ q
+        return np.argpartition(-scores, k)[:k]
+    if not len(allowed):
+        return allowed
+    scores = matrix[allowed] @ q
+    top = np.argpartition(-scores, min(k, len(allowed) - 1))[:k]
+    return allowed[top]
+
+
+def run(fn, matrix, q, k, repeats):
+    """(matched chunks, p50 filter ms, p50 filter + search ms)"""
+    filter_ms, total_ms = [], []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        allowed = fn()
+        t1 = time.perf_counter()
+        restricted_search(matrix, allowed, q, k)
+        t2 = time.perf_counter()
+        filter_ms.append((t1 - t0) * 1000)
+        total_ms.append((t2 - t0) * 1000)
+    matched = len(matrix) if allowed is None else len(allowed)
+    return matched, float(np.median(filter_ms)), float(np.median(total_ms))
+
+
+def p50_ms(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return out, float(np.median(times))
+
+
+def modelled(args):
+    print("modelled (no Weaviate): both where-filters reimplemented in Python, + restricted vector search")
+    print(f"{'chunks':>8} {'filter':<22} {'way':<8} {'matched':>8} {'filter ms':>10} {'total ms':>9}")
+    for n in args.chunks:
+        per_file = args.chunks_per_file
+        paths = build_tree(max(1, n // per_file), args.seed)
+        n = len(paths) * per_file
+        index = build_index(paths)
+        matrix = np.random.default_rng(args.seed).standard_normal((n, args.dims), dtype=np.float32)
+        q = np.random.default_rng(args.seed + 1).standard_normal(args.dims, dtype=np.float32)
+        matched, filter_ms, total_ms = run(lambda: None, matrix, q, args.k, args.repeats)
+        print(f"{n:>8} {'-':<22} {'none':<8} {matched:>8} {filter_ms:>10.3f} {total_ms:>9.2f}")
+        for label, filter_paths in sample_filters(paths).items():
+            ways = {
+                "like": lambda: like_filter(paths, filter_paths, per_file),
+                "indexed": lambda: indexed_filter(index, filter_paths, per_file),
+            }
+            for way, fn in ways.items():
+                matched, filter_ms, total_ms = run(fn, matrix, q, args.k, args.repeats)
+                print(f"{n:>8} {label[:22]:<22} {way:<8} {matched:>8} {filter_ms:>10.3f} {total_ms:>9.2f}")
+
+
+def post_filter(filter_paths):
+    """The predicate the local keyword search applied to every hit before the key index."""
+    parts, exts = map(set, split_filters(filter_paths))
+    return lambda doc: path_extension(doc["path"]) in exts or not parts.isdisjoint(path_parts(doc["path"]))
+
+
+def measured_bm25(args):
+    print(f"measured, local BM25 (db.hybrid.BM25Index): keyword search for a common term, top {args.k}")
+    print(f"{'chunks':>8} {'filter':<22} {'way':<8} {'matched':>8} {'search ms':>10}")
+    rng = random.Random(args.seed)
+    for n in args.bm25_chunks:
+        per_file = args.chunks_per_file
+        paths = build_tree(max(1, n // per_file), args.seed)
+        index = BM25Index(None, keys=lambda doc: path_keys(doc["path"]))
+        index.add_many(
+            {"id": f"{f}-{c}", "path": path, "text": " ".join(rng.choices(WORDS, k=12))}
+            for f, path in enumerate(paths) for c in range(per_file)
+        )
+        query = WORDS[0]
+        hits, ms = p50_ms(lambda: index.search(query, args.k), args.repeats)
+        print(f"{len(index):>8} {'-':<22} {'none':<8} {len(hits):>8} {ms:>10.3f}")
+        for label, filter_paths in sample_filters(paths).items():
+            ways = {
+                "post": lambda: index.search(query, args.k, where=post_filter(filter_paths)),
+                "any_of": lambda: index.search(query, args.k, any_of=filter_keys(filter_paths)),
+            }
+            for way, fn in ways.items():
+                hits, ms = p50_ms(fn, args.repeats)
+                print(f"{len(index):>8} {label[:22]:<22} {way:<8} {len(hits):>8} {ms:>10.3f}")
+
+
+def like_where(filter_paths):
+    """The where-filter rag-service sent before path_parts existed."""
+    return {"operator": "Or", "operands": [
+        {"path": ["path"], "operator": "Like", "valueText": f"*{f}*"} for f in filter_paths
+    ]}
+
+
+def measured_weaviate(args):
+    import weaviate
+
+    client = weaviate.Client(args.weaviate_url)
+    if client.schema.exists(BENCH_CLASS):
+        client.schema.delete_class(BENCH_CLASS)
+    # RagChunk's path properties (rag-service PATH_PROPERTY_SCHEMA), without the vectorizer settings
+    field = {"tokenization": "field", "indexFilterable": True, "indexSearchable": False}
+    client.schema.create_class({
+        "class": BENCH_CLASS,
+        "vectorizer": "none",
+        "properties": [
+            {"name": "path", "dataType": ["string"]},
+            {"name": "path_parts", "dataType": ["text[]"], **field},
+            {"name": "extension", "dataType": ["text"], **field},
+        ],
+    })
+    try:
+        per_file = args.chunks_per_file
+        paths = build_tree(max(1, args.weaviate_chunks // per_file), args.seed)
+        rng = np.random.default_rng(args.seed)
+        client.batch.configure(batch_size=500)
+        with client.batch as batch:
+            for path in paths:
+                props = {"path": path, **path_properties(path)}
+                for vec in rng.standard_normal((per_file, args.dims), dtype=np.float32):
+                    batch.add_data_object(props, BENCH_CLASS, vector=vec.tolist())
+        q = {"vector": rng.standard_normal(args.dims, dtype=np.float32).tolist()}
+
+        def count(where):
+            res = client.query.aggregate(BENCH_CLASS).with_where(where).with_meta_count().do()
+            return res["data"]["Aggregate"][BENCH_CLASS][0]["meta"]["count"]
+
+        def search(where):
+            builder = client.query.get(BENCH_CLASS, ["path"]).with_near_vector(q).with_limit(args.k)
+            return (builder.with_where(where) if where else builder).do()
+
+        print(f"measured, Weaviate at {args.weaviate_url}: near_vector top {args.k} with a where-filter")
+        print(f"{'chunks':>8} {'filter':<22} {'way':<8} {'matched':>8} {'query ms':>10}")
+        n = len(paths) * per_file
+        _, ms = p50_ms(lambda: search(None), args.repeats)
+        print(f"{n:>8} {'-':<22} {'none':<8} {n:>8} {ms:>10.2f}")
+        for label, filter_paths in sample_filters(paths).items():
+            for way, where in (("like", like_where(filter_paths)), ("indexed", path_where(filter_paths))):
+                _, ms = p50_ms(lambda: search(where), args.repeats)
+                print(f"{n:>8} {label[:22]:<22} {way:<8} {count(where):>8} {ms:>10.2f}")
+    finally:
+        client.schema.delete_class(BENCH_CLASS)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chunks", type=int, nargs="*", default=[10000, 100000, 1000000])
+    ap.add_argument("--bm25-chunks", type=int, nargs="*", default=[10000, 100000])
+    ap.add_argument("--weaviate-url", help="also measure both where-filters on this Weaviate (v3 client)")
+    ap.add_argument("--weaviate-chunks", type=int, default=100000)
+    ap.add_argument("--chunks-per-file", type=int, default=20)
+    ap.add_argument("--dims", type=int, default=32, help="vector size (the filter cost does not depend on it)")
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--repeats", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    if args.chunks:
+        modelled(args)
+    if args.bm25_chunks:
+        measured_bm25(args)
+    if args.weaviate_url:
+        measured_weaviate(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+PDF extraction scaling: serial vs. process-pool extraction of a synthetic corpus.
+
+    python benchmarks/bench_pdf_extract.py --files 4 --pages 300
+
+Reports pages/s for each worker count (1, 2, 4, ... up to the core count) and
+checks that every mode returns the same pages in the same order.
+"""
+
+import argparse
+import os
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.corpus import write_corpus  # noqa: E402
+from db.pdf_extract import iter_pdf_files  # noqa: E402
+
+
+def run(paths, workers, pages_per_task):
+    t0 = time.perf_counter()
+    seen = []
+    for path, pages in iter_pdf_files(paths, workers=workers, pages_per_task=pages_per_task):
+        for pg in pages:
+            seen.append((path, pg["page"], len(pg["text"])))
+    return time.perf_counter() - t0, seen
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--files", type=int, default=4)
+    ap.add_argument("--pages", type=int, default=300)
+    ap.add_argument("--pages-per-task", type=int, default=16)
+    ap.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = [str(p) for p in write_corpus(pathlib.Path(tmp), 0, args.files, args.pages)]
+        total_pages = args.files * args.pages
+        counts, w = [], 1
+        while w <= args.max_workers:
+            counts.append(w)
+            w *= 2
+        if counts[-1] != args.max_workers:
+            counts.append(args.max_workers)
+
+        print(f"{args.files} PDFs x {args.pages} pages, {args.pages_per_task} pages/task")
+        print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+        baseline, reference = None, None
+        for workers in counts:
+            elapsed, seen = run(paths, workers, args.pages_per_task)
+            if reference is None:
+                reference = seen
+            elif seen != reference:
+                raise SystemExit(f"workers={workers}: pages differ from serial extraction")
+            baseline = baseline or elapsed
+            print(f"{workers:>8} {elapsed:>9.2f} {total_pages / elapsed:>9.1f} {baseline / elapsed:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Multi-query retrieval: N x /tools/rag_search vs. one /tools/rag_search_batch.
+
+    python benchmarks/bench_rag_batch.py --queries 2 4 8 16 --latency-ms 20 --vectorize-ms 60
+
+Drives the rag-service app in-process against benchmarks.fakes.V3Client.
+A Weaviate round trip costs --latency-ms (plus --vectorize-ms for a query
+Weaviate has to vectorize itself, when the service could not embed it).
+Query embeddings come from a fake embedder that takes --embed-ms per
+request. Every query text is new, so the query cache never answers. Three
+ways to answer N sub-questions are compared:
+    sequential  N rag_search requests one after another (what the agent does today)
+    parallel    N rag_search requests at once
+    batch       one rag_search_batch request: one embeddings request, then
+                concurrent near_vector queries on the Weaviate pool
+Reports wall time, embedding calls and Weaviate requests per way. "parallel"
+also overlaps the round trips, but it still costs one embeddings request per
+query, which is what runs into the requests-per-minute limit when the agent
+fans out.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "backend", "python-services", "rag-service"))
+
+from benchmarks.fakes import fake_embed_matrix, install_v3_module  # noqa: E402
+
+
+class FakeEmbedder:
+    def __init__(self, latency_ms, dims=1536):
+        self.latency_s, self.dims, self.calls = latency_ms / 1000.0, dims, 0
+
+    def embed(self, texts):
+        self.calls += 1
+        time.sleep(self.latency_s)
+        return fake_embed_matrix(texts, self.dims)
+
+
+async def run_way(app, way, queries, mode):
+    import httpx
+
+    async def single(client, q):
+        r = await client.post("/tools/rag_search", json={"name": "rag_search", "parameters": {"query": q, "mode": mode}})
+        r.raise_for_status()
+        return r.json()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://rag") as client:
+        t0 = time.perf_counter()
+        if way == "sequential":
+            for q in queries:
+                await single(client, q)
+        elif way == "parallel":
+            await asyncio.gather(*(single(client, q) for q in queries))
+        else:
+            r = await client.post("/tools/rag_search_batch", json={
+                "name": "rag_search_batch", "parameters": {"queries": queries, "mode": mode}})
+            r.raise_for_status()
+            assert len(r.json()["results"]) == len(queries)
+        return (time.perf_counter() - t0) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--queries", type=int, nargs="+", default=[2, 4, 8, 16])
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="Weaviate round trip")
+    ap.add_argument("--vectorize-ms", type=float, default=60.0, help="Weaviate-side query embedding (near_text)")
+    ap.add_argument("--embed-ms", type=float, default=80.0, help="one batched embeddings request")
+    ap.add_argument("--mode", default="vector", choices=("vector", "hybrid"))
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["EMBED_CACHE_PATH"] = os.path.join(tmp, "embed_cache.sqlite3")
+    os.environ["RAG_KEYWORD_INDEX"] = "weaviate"
+    install_v3_module(args.latency_ms, vectorize_ms=args.vectorize_ms)
+    import main as rag
+
+    embedder = FakeEmbedder(args.embed_ms)
+    rag._query_embedder = embedder
+    client = rag.weaviate_client
+
+    print(f"Weaviate {args.latency_ms:.0f} ms/round trip (+{args.vectorize_ms:.0f} ms to vectorize a query), "
+          f"batch embedding {args.embed_ms:.0f} ms, mode {args.mode}")
+    print(f"{'queries':>7} {'way':<11} {'wall ms':>8} {'embed calls':>12} {'weaviate req':>13} {'vectorized':>11}")
+    asyncio.run(run_way(rag.app, "batch", ["warm-up"], args.mode))   # opens the embedding cache
+    run = 0
+    for n in args.queries:
+        for way in ("sequential", "parallel", "batch"):
+            run += 1
+            queries = [f"sub-question {i} of run {run}" for i in range(n)]   # fresh text: no cache hits
+            calls, requests, vectorized = embedder.calls, client.requests, client.vectorized
+            ms = asyncio.run(run_way(rag.app, way, queries, args.mode))
+            print(f"{n:>7} {way:<11} {ms:>8.0f} {embedder.calls - calls:>12} {client.requests - requests:>13} "
+                  f"{client.vectorized - vectorized:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+rag-service load test: concurrent /tools/rag_search throughput.
+
+    python benchmarks/bench_rag_concurrency.py --requests 400 --latency-ms 20
+
+Drives the real FastAPI app in-process (httpx ASGITransport) with Weaviate
+replaced by benchmarks.fakes.V3Client, whose every query sleeps for a
+simulated round trip. For each client concurrency it reports requests/s and
+p50/p95 latency, first with the Weaviate calls made inline on the event loop
+(how the handlers used to work) and then through WeaviatePool at each
+--pool size. Inline throughput stays at ~1000/latency-ms requests/s whatever
+the concurrency; the pool scales until the concurrency reaches its size.
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "backend", "python-services", "rag-service"))
+
+from benchmarks.fakes import install_v3_module  # noqa: E402
+
+
+async def load(app, n_requests, concurrency, mode, run):
+    import httpx
+
+    slots = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(client, i):
+        async with slots:
+            t0 = time.perf_counter()
+            r = await client.post("/tools/rag_search", json={
+                "name": "rag_search", "parameters": {"query": f"planning question {i} of run {run}", "top_k": 5, "mode": mode},
+            })
+            r.raise_for_status()
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://rag") as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(one(client, i) for i in range(n_requests)))
+        elapsed = time.perf_counter() - t0
+    p50, p95 = np.percentile(latencies, [50, 95])
+    return n_requests / elapsed, p50, p95
+
+
+async def inline(fn, *args, **kwargs):
+    return fn(*args, **kwargs)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--requests", type=int, default=400)
+    ap.add_argument("--latency-ms", type=float, default=20.0, help="simulated Weaviate round trip")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16, 64])
+    ap.add_argument("--pool", type=int, nargs="+", default=[4, 16])
+    ap.add_argument("--mode", default="vector", choices=("vector", "keyword", "hybrid"))
+    args = ap.parse_args()
+
+    os.environ["RAG_KEYWORD_INDEX"] = "weaviate"
+    install_v3_module(args.latency_ms)
+    import main as rag
+    from weaviate_pool import WeaviatePool
+
+    rag._embed_queries = lambda queries: [None] * len(queries)   # Weaviate vectorizes (near_text)
+
+    print(f"{args.requests} requests per run, {args.latency_ms:.0f} ms simulated Weaviate round trip, mode {args.mode}")
+    print(f"{'access':<14} {'clients':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}")
+    setups = [("inline", None)] + [(f"pool {n}", n) for n in args.pool]
+    run = 0
+    for label, size in setups:
+        for concurrency in args.concurrency:
+            run += 1   # fresh query text every run, so the query cache never answers
+            pool = WeaviatePool(size or 1, queue_timeout=60.0)
+            rag.weaviate_pool = pool
+            if size is None:
+                pool.run = inline
+            rps, p50, p95 = asyncio.run(load(rag.app, args.requests, concurrency, args.mode, run))
+            pool.close()
+            print(f"{label:<14} {concurrency:>8} {rps:>8.1f} {p50:>8.1f} {p95:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Time to the first usable hit: /tools/rag_search vs. /tools/rag_search_stream.
+
+    python benchmarks/bench_rag_stream.py --latency-ms 20 100 300 --queries 20
+
+Serves the rag-service app with uvicorn on a local port (an in-process ASGI
+transport would buffer the whole stream) against benchmarks.fakes.V3Client,
+where a Weaviate round trip costs --latency-ms. The local BM25 index
+(RAG_KEYWORD_INDEX=local) holds a few notes, searches are hybrid with
+diversify on, and every query text is new, so the query cache never answers.
+Reports p50 over --queries searches of:
+    rag_search   time to the complete JSON response
+    first hit    time to the first NDJSON event of the stream (the best local
+                 BM25 hit, before the vector query returns)
+    passages     time to the last final passage of the stream
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", "backend", "python-services", "rag-service"))
+
+from benchmarks.fakes import install_v3_module  # noqa: E402
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def measure(url, n, run):
+    import httpx
+
+    plain, first, last = [], [], []
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        for i in range(n):
+            params = {"query": f"planning deadline {run} {i}", "top_k": 5, "mode": "hybrid", "diversify": True}
+            t0 = time.perf_counter()
+            r = await client.post("/tools/rag_search", json={"name": "rag_search", "parameters": params})
+            r.raise_for_status()
+            plain.append((time.perf_counter() - t0) * 1000)
+
+            params["query"] += " streamed"
+            t0, t_first = time.perf_counter(), None
+            async with client.stream("POST", "/tools/rag_search_stream",
+                                     json={"name": "rag_search", "parameters": params}) as r:
+                async for line in r.aiter_lines():
+                    if line and t_first is None:
+                        t_first = (time.perf_counter() - t0) * 1000
+                    if '"event": "passage"' in line:
+                        t_last = (time.perf_counter() - t0) * 1000
+            first.append(t_first)
+            last.append(t_last)
+    return [float(np.percentile(x, 50)) for x in (plain, first, last)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--latency-ms", type=float, nargs="+", default=[20.0, 100.0, 300.0], help="Weaviate round trip")
+    ap.add_argument("--queries", type=int, default=20)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["EMBED_CACHE_PATH"] = os.path.join(tmp, "embed_cache.sqlite3")
+    os.environ["RAG_BM25_PATH"] = os.path.join(tmp, "bm25.jsonl")
+    os.environ["INDEX_GENERATION_DIR"] = os.path.join(tmp, "index_generations")
+    os.environ["RAG_KEYWORD_INDEX"] = "local"
+    install_v3_module(0.0)
+    import httpx
+    import uvicorn
+    import main as rag
+
+    rag._embed_queries = lambda queries: [None] * len(queries)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(rag.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}"
+    for i in range(20):
+        httpx.post(url + "/index/document", json={
+            "path": f"/notes/{i}.md", "text": f"Planning note {i}: the deadline for item {i} moved to week {i % 5}."})
+
+    print(f"{'weaviate ms':>11} {'rag_search':>11} {'first hit':>10} {'passages':>9}")
+    for run, latency in enumerate(args.latency_ms):
+        rag.weaviate_client.latency_s = latency / 1000.0
+        plain, first, last = asyncio.run(measure(url, args.queries, run))
+        print(f"{latency:>11.0f} {plain:>11.1f} {first:>10.1f} {last:>9.1f}")
+    server.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Embedded vector index (db.vector_index): exact float16 matrix vs. HNSW graph.
+
+    python benchmarks/bench_vector_index.py --sizes 2000 20000 --dims 1536 --queries 100
+
+Clustered synthetic vectors (chunks of one document are near each other) are
+added one batch per size to a VectorIndex in a temporary directory, once with
+exact search forced (exact_max above the size) and once with the HNSW graph
+(exact_max=0). Each chunk belongs to one of --folders folders, and the
+filtered searches keep one folder, looked up in the index's path keys as the
+RAG service's filter_paths are (db.path_filters.filter_keys). Reports per
+size and mode:
+    add s      time to add all vectors (for HNSW, building the graph)
+    p50 us     median search time, top 10
+    recall     share of the true top 10 (float32 brute force) returned
+    filt us    median search time with the folder filter
+    filt rec   recall of the filtered search against filtered brute force
+A Weaviate query costs a network round trip on top of its own search time.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from db.path_filters import filter_keys, path_keys  # noqa: E402
+from db.vector_index import VectorIndex  # noqa: E402
+
+
+def clustered(rng, n, dims, clusters):
+    centers = rng.standard_normal((clusters, dims)).astype(np.float32)
+    labels = rng.integers(0, clusters, n)
+    return centers, centers[labels] + rng.standard_normal((n, dims)).astype(np.float32)
+
+
+def run(index, queries, any_of):
+    times, results = [], []
+    for q in queries:
+        t0 = time.perf_counter()
+        results.append([doc_id for doc_id, _ in index.search(q, 10, any_of=any_of)])
+        times.append((time.perf_counter() - t0) * 1e6)
+    return float(np.percentile(times, 50)), results
+
+
+def recall(results, truth):
+    return float(np.mean([len(set(r) & set(t)) / max(len(t), 1) for r, t in zip(results, truth)]))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[2000, 20000])
+    ap.add_argument("--dims", type=int, default=1536)
+    ap.add_argument("--queries", type=int, default=100)
+    ap.add_argument("--folders", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=7)
+    args = ap.parse_args()
+
+    print(f"{args.dims} dims, {args.queries} queries, top 10, filter keeps 1 of {args.folders} folders")
+    print(f"{'vectors':>8} {'mode':<6} {'add s':>7} {'p50 us':>8} {'recall':>7} {'filt us':>8} {'filt rec':>9}")
+    for n in args.sizes:
+        rng = np.random.default_rng(args.seed)
+        centers, X = clustered(rng, n, args.dims, max(n // 50, 10))
+        folders = rng.integers(0, args.folders, n)
+        queries = centers[rng.integers(0, len(centers), args.queries)] + \
+            rng.standard_normal((args.queries, args.dims)).astype(np.float32)
+        docs = [{"id": str(i), "path": f"/notes/folder{folders[i]}/{i}.md"} for i in range(n)]
+        unit = X / np.linalg.norm(X, axis=1, keepdims=True)
+        scores = queries @ unit.T
+        truth = [[str(i) for i in np.argsort(-s)[:10]] for s in scores]
+        keep = np.flatnonzero(folders == 0)
+        truth_filtered = [[str(keep[i]) for i in np.argsort(-s[keep])[:10]] for s in scores]
+        for mode, exact_max in (("exact", n + 1), ("hnsw", 0)):
+            with tempfile.TemporaryDirectory() as tmp:
+                index = VectorIndex(tmp, exact_max=exact_max, keys=lambda doc: path_keys(doc["path"]))
+                t0 = time.perf_counter()
+                index.add_many(zip(docs, X))
+                added = time.perf_counter() - t0
+                assert index.mode == mode
+                index.search(queries[0], 10)   # warm-up (the exact tier loads its float32 copy)
+                p50, results = run(index, queries, None)
+                fp50, fresults = run(index, queries, filter_keys(["folder0"]))
+                print(f"{n:>8} {mode:<6} {added:>7.1f} {p50:>8.0f} {recall(results, truth):>7.3f} "
+                      f"{fp50:>8.0f} {recall(fresults, truth_filtered):>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Peak memory of the ingest pipeline with vectors as Python lists vs. NumPy arrays.
+
+    python benchmarks/bench_vector_memory.py --chunks 100000 --dims 3072
+
+Pushes synthetic chunks through the real parse -> embed -> insert stages of
+db.weaviate_utils (fake embedder, insert into a no-op collection), once per
+vector representation, each in a fresh process:
+
+    list     vectors as List[float] end to end (the old behaviour)
+    float32  NumPy float32 rows, converted to floats per insert batch
+    float16  NumPy float16 rows, converted to floats per insert batch
+
+Reports chunks/s and peak RSS above the post-import baseline.
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+MODES = ("list", "float32", "float16")
+
+
+def rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0   # KiB on Linux
+
+
+def child(mode, n_chunks, dims, chunks_per_file):
+    os.environ["EMBED_VECTOR_DTYPE"] = "float32" if mode == "list" else mode
+    os.environ["INGEST_MANIFEST"] = os.path.join(tempfile.mkdtemp(), "manifest.json")
+    os.environ["INGEST_CHECKPOINT_SECS"] = "1e9"
+
+    import numpy as np
+    import db.weaviate_utils as wu
+    from db.ingest_manifest import load_manifest, text_sha256, chunk_uuid
+    from db.ingest_pipeline import staged
+
+    rng = np.random.default_rng(0)
+
+    def fake_embed(texts):
+        m = rng.standard_normal((len(texts), dims), dtype=np.float32)
+        m /= np.linalg.norm(m, axis=1, keepdims=True)
+        return m.tolist() if mode == "list" else m.astype(mode)
+
+    wu.embed_texts = fake_embed
+
+    def source():
+        for start in range(0, n_chunks, chunks_per_file):
+            src = f"/bench/doc{start // chunks_per_file}.md"
+            ids = []
+            for i in range(start, min(n_chunks, start + chunks_per_file)):
+                text = f"chunk {i} " + "lorem ipsum dolor sit amet " * 30
+                h = text_sha256(text)
+                c = {"text": text, "source_path": src, "anchor": "Bench", "text_hash": h,
+                     "uuid": chunk_uuid(src, None, h)}
+                ids.append({"uuid": c["uuid"], "text_hash": h})
+                yield c
+            yield wu._FileDone(src, "0" * 64, ids, [])
+
+    class NullCollection:
+        def __init__(self):
+            self.data = self
+            self.floats = 0
+
+        def insert_many(self, objs):
+            self.floats += sum(len(o.vector) for o in objs)
+
+    col = NullCollection()
+    progress = lambda counter, n: None
+    base = rss_mb()
+    t0 = time.perf_counter()
+    embedded = staged(source(), [lambda items: wu._embed_stage(items, progress)], maxsize=wu.PIPELINE_QUEUE)
+    written = wu._insert_stage(embedded, col, load_manifest(), progress)
+    elapsed = time.perf_counter() - t0
+    assert written == n_chunks and col.floats == n_chunks * dims
+    print(json.dumps({"mode": mode, "seconds": elapsed, "base_mb": base, "peak_mb": rss_mb()}))
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--chunks", type=int, default=100_000)
+    ap.add_argument("--dims", type=int, default=3072)
+    ap.add_argument("--chunks-per-file", type=int, default=50)
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    ap.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        child(args.child, args.chunks, args.dims, args.chunks_per_file)
+        return
+
+    print(f"{args.chunks} chunks x {args.dims} dims")
+    print(f"{'vectors':>8} {'seconds':>9} {'chunks/s':>9} {'peak MB':>9} {'over base':>10}")
+    for mode in args.modes:
+        out = subprocess.run(
+            [sys.executable, __file__, "--child", mode, "--chunks", str(args.chunks),
+             "--dims", str(args.dims), "--chunks-per-file", str(args.chunks_per_file)],
+            check=True, capture_output=True, text=True,
+        ).stdout.strip().splitlines()[-1]
+        r = json.loads(out)
+        print(f"{mode:>8} {r['seconds']:>9.1f} {args.chunks / r['seconds']:>9.0f} "
+              f"{r['peak_mb']:>9.0f} {r['peak_mb'] - r['base_mb']:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
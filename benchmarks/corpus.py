@@ -0,0 +1,97 @@
+"""
+Synthetic corpora for the ingest benchmarks.
+
+Markdown files get headings, paragraphs and lists; PDFs are written by hand
+(Helvetica text pages, no dependencies) so pypdf has real text to extract.
+Everything is seeded, so the same arguments always produce the same bytes.
+"""
+
+import pathlib
+import random
+from typing import List
+
+WORDS = (
+    "jarvis calendar meeting project deadline travel flight hotel budget review "
+    "notes summary weekly planning research paper draft assignment lecture exam "
+    "grocery recipe workout running sleep focus email reply invoice contract "
+    "design prototype release backlog sprint retro kickoff offsite stockholm"
+).split()
+
+
+def _sentence(rng: random.Random, n_words: int = 12) -> str:
+    words = [rng.choice(WORDS) for _ in range(n_words)]
+    return " ".join(words).capitalize() + "."
+
+
+def _paragraph(rng: random.Random, sentences: int = 5) -> str:
+    return " ".join(_sentence(rng, rng.randint(6, 18)) for _ in range(sentences))
+
+
+def markdown_document(rng: random.Random, sections: int = 8) -> str:
+    out = [f"# {_sentence(rng, 4)[:-1]}", ""]
+    for s in range(sections):
+        out += [f"## Section {s + 1}: {_sentence(rng, 3)[:-1]}", ""]
+        for _ in range(rng.randint(2, 4)):
+            out += [_paragraph(rng, rng.randint(3, 7)), ""]
+        if rng.random() < 0.4:
+            out += [f"- {_sentence(rng, 6)}" for _ in range(rng.randint(2, 5))] + [""]
+    return "\n".join(out)
+
+
+def _pdf_escape(s: str) -> str:
+    return s.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def pdf_bytes(pages: List[List[str]]) -> bytes:
+    """Minimal PDF with one Helvetica text page per entry in `pages` (a list of lines)."""
+    objects: List[bytes] = []
+    n = len(pages)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(n))
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {n} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    for i, lines in enumerate(pages):
+        body = "BT /F1 9 Tf 11 TL 40 760 Td " + " ".join(f"({_pdf_escape(l)}) '" for l in lines) + " ET"
+        stream = body.encode("latin-1", errors="replace")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, obj in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % num + obj + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for off in offsets:
+        out += b"%010d 00000 n \n" % off
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def pdf_document(rng: random.Random, n_pages: int, lines_per_page: int = 60) -> bytes:
+    pages = []
+    for p in range(n_pages):
+        lines = [f"Report page {p + 1}"] + [_sentence(rng, rng.randint(8, 14)) for _ in range(lines_per_page)]
+        pages.append(lines)
+    return pdf_bytes(pages)
+
+
+def write_corpus(root: pathlib.Path, n_markdown: int = 50, n_pdf: int = 5,
+                 pdf_pages: int = 100, seed: int = 42) -> List[pathlib.Path]:
+    """Write n_markdown .md and n_pdf .pdf files under root; return their paths."""
+    rng = random.Random(seed)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_markdown):
+        p = root / f"note_{i:05d}.md"
+        p.write_text(markdown_document(rng), encoding="utf-8")
+        paths.append(p)
+    for i in range(n_pdf):
+        p = root / f"report_{i:04d}.pdf"
+        p.write_bytes(pdf_document(rng, pdf_pages))
+        paths.append(p)
+    return paths
@@ -0,0 +1,110 @@
+"""
+Local fake of the OpenAI embeddings endpoint, for offline throughput benchmarks.
+
+    python benchmarks/fake_openai.py --port 8099 --latency-ms 150 --rpm 600
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=fake python manual_ingest.py
+
+POST /v1/embeddings answers with deterministic vectors after a simulated
+round trip (fixed latency + per-token cost). With --rpm / --tpm set it
+enforces a one-minute sliding window and replies 429 with Retry-After,
+like the real API.
+"""
+
+import argparse
+import asyncio
+import base64
+import collections
+import os
+import struct
+import sys
+import time
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from benchmarks.fakes import fake_embedding  # noqa: E402
+
+
+def create_app(latency_ms: float = 100.0, ms_per_1k_tokens: float = 5.0,
+               rpm: int = 0, tpm: int = 0, default_dims: int = 3072) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI embeddings")
+    window: collections.deque = collections.deque()   # (timestamp, tokens)
+    stats = {"requests": 0, "rate_limited": 0, "inputs": 0}
+
+    def over_budget(tokens: int) -> float:
+        """0 if the request fits the last minute's budget, else seconds until it would."""
+        now = time.monotonic()
+        while window and now - window[0][0] > 60.0:
+            window.popleft()
+        if (rpm and len(window) + 1 > rpm) or (tpm and sum(t for _, t in window) + tokens > tpm):
+            return max(0.1, 60.0 - (now - window[0][0]))
+        window.append((now, tokens))
+        return 0.0
+
+    @app.post("/v1/embeddings")
+    async def embeddings(request: Request):
+        body = await request.json()
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        dims = int(body.get("dimensions") or default_dims)
+        if body.get("encoding_format") == "base64":
+            encode = lambda v: base64.b64encode(struct.pack(f"<{len(v)}f", *v)).decode("ascii")
+        else:
+            encode = lambda v: v
+        tokens = sum(len(t) // 4 + 1 for t in inputs)
+        stats["requests"] += 1
+        wait = over_budget(tokens)
+        if wait:
+            stats["rate_limited"] += 1
+            return JSONResponse(
+                status_code=429,
+                headers={"retry-after": f"{wait:.1f}"},
+                content={"error": {"message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded"}},
+            )
+        stats["inputs"] += len(inputs)
+        await asyncio.sleep((latency_ms + ms_per_1k_tokens * tokens / 1000.0) / 1000.0)
+        return {
+            "object": "list",
+            "model": body.get("model", "text-embedding-3-large"),
+            "data": [
+                {"object": "embedding", "index": i, "embedding": encode(fake_embedding(t, dims))}
+                for i, t in enumerate(inputs)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        }
+
+    @app.get("/stats")
+    def get_stats():
+        return stats
+
+    @app.post("/reset")
+    def reset():
+        window.clear()
+        stats.update(requests=0, rate_limited=0, inputs=0)
+        return stats
+
+    return app
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8099)
+    ap.add_argument("--latency-ms", type=float, default=100.0)
+    ap.add_argument("--ms-per-1k-tokens", type=float, default=5.0)
+    ap.add_argument("--rpm", type=int, default=0)
+    ap.add_argument("--tpm", type=int, default=0)
+    args = ap.parse_args()
+
+    import uvicorn
+    uvicorn.run(
+        create_app(args.latency_ms, args.ms_per_1k_tokens, args.rpm, args.tpm),
+        host=args.host, port=args.port, log_level="warning",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,275 @@
+"""
+Deterministic stand-ins for the paid / networked parts of ingestion.
+
+fake_embedding() maps a text to a unit vector seeded by its SHA-256, so the
+same text always gets the same vector and similar runs are comparable.
+
+InMemoryClient / InMemoryCollection mimic the slice of the Weaviate v4 client
+the repo uses (collections.exists/get/create/delete/list_all, data.insert_many /
+insert / delete_many, query.near_vector / fetch_objects, the Filter classes),
+keeping objects in a dict and searching by brute-force cosine similarity.
+
+V3Client mimics the v3 weaviate.Client the rag-service is written against:
+query builders whose do() sleeps for a simulated round trip (releasing the
+GIL, like real network I/O), plus a vectorizer call when Weaviate has to
+embed the query text itself, and returns canned RagChunk results.
+install_v3_module() puts it in sys.modules as `weaviate`, so the service can
+be imported without a live Weaviate.
+"""
+
+import contextlib
+import fnmatch
+import hashlib
+import sys
+import threading
+import time
+import types
+import uuid as uuid_package
+from types import SimpleNamespace
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def _seed(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8", errors="ignore")).digest()[:8], "little")
+
+
+def fake_embedding(text: str, dims: int = 3072) -> List[float]:
+    return fake_embed_matrix([text], dims)[0].tolist()
+
+
+def fake_embed_matrix(texts: List[str], dims: int = 3072) -> np.ndarray:
+    out = np.empty((len(texts), dims), dtype=np.float32)
+    for i, t in enumerate(texts):
+        out[i] = np.random.default_rng(_seed(t)).standard_normal(dims, dtype=np.float32)
+    out /= np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+    return out
+
+
+def fake_embed_texts(texts: List[str], dims: int = 3072) -> List[List[float]]:
+    return fake_embed_matrix(texts, dims).tolist()
+
+
+def matches(flt, obj: Dict) -> bool:
+    """Evaluate a weaviate.classes.query.Filter against {"uuid", "properties"}."""
+    if flt is None:
+        return True
+    children = getattr(flt, "filters", None)
+    if children is not None:
+        results = (matches(f, obj) for f in children)
+        return all(results) if type(flt).__name__ == "_FilterAnd" else any(results)
+    target = flt.target if isinstance(flt.target, str) else getattr(flt.target, "target", None)
+    value = obj["uuid"] if target == "_id" else obj["properties"].get(target)
+    op, want = flt.operator.value, flt.value
+    have = value if isinstance(value, list) else [value]
+    if op == "Equal":
+        return value == want
+    if op == "NotEqual":
+        return value != want
+    if op == "ContainsAny":
+        return any(v in want for v in have)
+    if op == "ContainsAll":
+        return all(w in have for w in want)
+    if op == "Like":
+        return value is not None and fnmatch.fnmatchcase(str(value), str(want).replace("[", "[[]"))
+    if op == "IsNull":
+        return (value is None) == bool(want)
+    if value is None:
+        return False
+    return {"LessThan": value < want, "LessThanEqual": value <= want,
+            "GreaterThan": value > want, "GreaterThanEqual": value >= want}[op]
+
+
+class _Data:
+    def __init__(self, col: "InMemoryCollection"):
+        self.col = col
+
+    def insert_many(self, objs):
+        time.sleep(self.col.insert_latency_s)
+        uuids = {}
+        with self.col.lock:
+            for i, o in enumerate(objs):
+                key = str(o.uuid or uuid_package.uuid4())
+                vec = None if o.vector is None else np.asarray(o.vector, dtype=np.float32)
+                self.col.objects[key] = {"uuid": key, "properties": dict(o.properties or {}), "vector": vec}
+                uuids[i] = key
+            self.col.stats["insert_requests"] += 1
+        return SimpleNamespace(errors={}, uuids=uuids, has_errors=False, elapsed_seconds=0.0)
+
+    def insert(self, properties, vector=None, uuid=None):
+        key = str(uuid or uuid_package.uuid4())
+        with self.col.lock:
+            self.col.objects[key] = {"uuid": key, "properties": dict(properties),
+                                     "vector": None if vector is None else np.asarray(vector, dtype=np.float32)}
+        return key
+
+    def delete_many(self, where):
+        with self.col.lock:
+            gone = [k for k, o in self.col.objects.items() if matches(where, o)]
+            for k in gone:
+                del self.col.objects[k]
+            self.col.stats["delete_requests"] += 1
+        return SimpleNamespace(matches=len(gone), successful=len(gone), failed=0)
+
+
+class _Query:
+    def __init__(self, col: "InMemoryCollection"):
+        self.col = col
+
+    def _result(self, objs, return_properties, distances=None, include_vector=False):
+        out = []
+        for i, o in enumerate(objs):
+            props = o["properties"] if return_properties is None else \
+                {k: o["properties"].get(k) for k in return_properties}
+            meta = SimpleNamespace(distance=None if distances is None else float(distances[i]), score=None)
+            vector = {"default": o["vector"].tolist()} if include_vector and o["vector"] is not None else {}
+            out.append(SimpleNamespace(uuid=o["uuid"], properties=props, metadata=meta, vector=vector))
+        return SimpleNamespace(objects=out)
+
+    def near_vector(self, near_vector, limit: int = 10, return_properties=None, filters=None,
+                    include_vector=False, **_):
+        with self.col.lock:
+            objs = [o for o in self.col.objects.values() if o["vector"] is not None and matches(filters, o)]
+        if not objs:
+            return SimpleNamespace(objects=[])
+        m = np.stack([o["vector"] for o in objs])
+        q = np.asarray(near_vector, dtype=np.float32)
+        sims = m @ q / (np.linalg.norm(m, axis=1) * (np.linalg.norm(q) or 1.0) + 1e-12)
+        top = np.argsort(-sims)[:limit]
+        return self._result([objs[i] for i in top], return_properties, 1.0 - sims[top], include_vector)
+
+    def fetch_objects(self, limit: int = 10, return_properties=None, filters=None, **_):
+        with self.col.lock:
+            objs = [o for o in self.col.objects.values() if matches(filters, o)][:limit]
+        return self._result(objs, return_properties)
+
+
+class InMemoryCollection:
+    def __init__(self, name: str = "JarvisDocs", insert_latency_ms: float = 0.0):
+        self.name = name
+        self.objects: Dict[str, Dict] = {}
+        self.insert_latency_s = insert_latency_ms / 1000.0
+        self.stats = {"insert_requests": 0, "delete_requests": 0}
+        self.lock = threading.Lock()
+        self.data = _Data(self)
+        self.query = _Query(self)
+
+    def __len__(self) -> int:
+        return len(self.objects)
+
+
+class _Collections:
+    def __init__(self, client: "InMemoryClient"):
+        self.client = client
+
+    def exists(self, name: str) -> bool:
+        return name in self.client.store
+
+    def get(self, name: str) -> InMemoryCollection:
+        return self.client.store.setdefault(name, InMemoryCollection(name, self.client.insert_latency_ms))
+
+    def create(self, name: str, **_) -> InMemoryCollection:
+        return self.get(name)
+
+    def delete(self, name: str) -> None:
+        self.client.store.pop(name, None)
+
+    def list_all(self, simple: bool = True) -> Dict[str, SimpleNamespace]:
+        return {name: SimpleNamespace(name=name) for name in self.client.store}
+
+
+class InMemoryClient:
+    """Shared in-memory store; connect() hands out context-managed handles to it."""
+
+    def __init__(self, insert_latency_ms: float = 0.0):
+        self.store: Dict[str, InMemoryCollection] = {}
+        self.insert_latency_ms = insert_latency_ms
+        self.collections = _Collections(self)
+
+    @contextlib.contextmanager
+    def connect(self):
+        yield self
+
+    def close(self) -> None:
+        pass
+
+    def collection(self, name: Optional[str] = None) -> InMemoryCollection:
+        return self.collections.get(name or "JarvisDocs")
+
+
+class _V3Builder:
+    def __init__(self, client: "V3Client", class_name: str):
+        self.client, self.class_name = client, class_name
+        self.calls: List = []
+        self.limit = 10
+
+    def with_limit(self, limit: int) -> "_V3Builder":
+        self.limit = limit
+        return self
+
+    def with_meta_count(self) -> "_V3Builder":
+        self.calls.append(("with_meta_count",))
+        return self
+
+    def __getattr__(self, name: str):
+        if not name.startswith("with_"):
+            raise AttributeError(name)
+
+        def record(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            return self
+        return record
+
+    def do(self) -> Dict:
+        names = {c[0] for c in self.calls}
+        # near_text / hybrid without a vector: Weaviate embeds the query text first
+        vectorize = "with_near_text" in names or any(
+            c[0] == "with_hybrid" and c[2].get("vector") is None for c in self.calls)
+        self.client.round_trip(vectorize)
+        if ("with_meta_count",) in self.calls:
+            return {"data": {"Aggregate": {self.class_name: [{"meta": {"count": len(self.client.items)}}]}}}
+        return {"data": {"Get": {self.class_name: self.client.items[: self.limit]}}}
+
+
+class V3Client:
+    """Stand-in for weaviate.Client (v3): every do() costs one simulated round trip."""
+
+    def __init__(self, latency_ms: float = 20.0, n_items: int = 20, vectorize_ms: float = 0.0, **_):
+        self.latency_s = latency_ms / 1000.0
+        self.vectorize_s = vectorize_ms / 1000.0
+        self.items = [{
+            "text": f"chunk {i} about planning and deadlines", "path": f"/notes/{i}.md", "anchor": None,
+            "metadata": {}, "_additional": {"id": str(uuid_package.UUID(int=i)), "certainty": 0.9 - i / 100,
+                                            "distance": 0.1 + i / 100, "score": str(1.0 - i / 100)},
+        } for i in range(n_items)]
+        self.requests = 0
+        self.vectorized = 0   # queries Weaviate had to embed itself
+        self._lock = threading.Lock()
+        self.query = SimpleNamespace(get=lambda class_name, props=None: _V3Builder(self, class_name),
+                                     aggregate=lambda class_name: _V3Builder(self, class_name))
+        self.schema = SimpleNamespace(get=lambda: (self.round_trip(), {"classes": [{"class": "RagChunk"}]})[1],
+                                      create_class=lambda schema: self.round_trip())
+        self.data_object = SimpleNamespace(create=lambda data_object, class_name, **_: (
+            self.round_trip(), str(uuid_package.uuid4()))[1])
+
+    def round_trip(self, vectorize: bool = False) -> None:
+        with self._lock:
+            self.requests += 1
+            self.vectorized += vectorize
+        time.sleep(self.latency_s + (self.vectorize_s if vectorize else 0.0))
+
+
+def install_v3_module(latency_ms: float = 20.0, n_items: int = 20, vectorize_ms: float = 0.0) -> types.ModuleType:
+    """Register a fake `weaviate` package whose Client() is a V3Client."""
+    module = types.ModuleType("weaviate")
+    module.Client = lambda **kw: V3Client(latency_ms, n_items, vectorize_ms, **kw)
+    module.AuthApiKey = lambda api_key: SimpleNamespace(api_key=api_key)
+    config = types.ModuleType("weaviate.config")
+    config.Config = lambda **kw: SimpleNamespace(**kw)
+    config.ConnectionConfig = lambda **kw: SimpleNamespace(**kw)
+    gql, get = types.ModuleType("weaviate.gql"), types.ModuleType("weaviate.gql.get")
+    get.HybridFusion = SimpleNamespace(RANKED="rankedFusion", RELATIVE_SCORE="relativeScoreFusion")
+    module.config, module.gql, gql.get = config, gql, get
+    sys.modules.update({"weaviate": module, "weaviate.config": config, "weaviate.gql": gql, "weaviate.gql.get": get})
+    return module
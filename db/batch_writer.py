@@ -0,0 +1,223 @@
+# db/batch_writer.py — byte-sized, pipelined, retrying writes to a Weaviate collection
+# Objects are grouped into insert_many requests of at most WEAVIATE_BATCH_BYTES (estimated
+# payload) / WEAVIATE_BATCH_OBJECTS objects, up to WEAVIATE_BATCH_IN_FLIGHT requests run
+# concurrently, and only the objects a request reports as failed are retried: they wait out a
+# jittered exponential backoff and then ride along in a later request. Objects that still fail
+# (or fail with a non-transient error) are appended to a JSONL dead-letter file instead of
+# aborting the whole ingest.
+import os, re, json, time, heapq, random, logging, threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+from weaviate.classes.data import DataObject
+
+logger = logging.getLogger(__name__)
+
+WEAVIATE_BATCH_BYTES = int(os.getenv("WEAVIATE_BATCH_BYTES", str(4 * 1024 * 1024)))
+WEAVIATE_BATCH_OBJECTS = int(os.getenv("WEAVIATE_BATCH_OBJECTS", "1000"))
+WEAVIATE_BATCH_IN_FLIGHT = int(os.getenv("WEAVIATE_BATCH_IN_FLIGHT", "2"))
+WEAVIATE_BATCH_RETRIES = int(os.getenv("WEAVIATE_BATCH_RETRIES", "5"))
+INGEST_DEAD_LETTER = os.getenv("INGEST_DEAD_LETTER", ".ingest_dead_letter.jsonl")
+
+_TRANSIENT = re.compile(
+    r"timeout|timed out|deadline|unavailable|connection|reset|refused|too many|rate limit|"
+    r"temporar|try again|overloaded|\b(429|500|502|503|504)\b",
+    re.IGNORECASE,
+)
+
+# (sequence no., object, tag, estimated bytes, attempt); tag groups objects, e.g. by source file
+_Entry = Tuple[int, DataObject, Optional[str], int, int]
+
+def payload_bytes(obj: DataObject) -> int:
+    """Rough request size: float32 vector + property values + per-object overhead."""
+    vec = obj.vector
+    n = 4 * len(vec) if vec is not None else 0
+    for v in (obj.properties or {}).values():
+        n += len(v.encode("utf-8")) if isinstance(v, str) else 16
+    return n + 64
+
+def is_transient(message: str) -> bool:
+    return bool(_TRANSIENT.search(message or ""))
+
+class BatchWriter:
+    """
+    add() objects, after() to run a callback once everything added so far has settled
+    (written or dead-lettered), flush()/close() to wait for the rest. Not thread-safe:
+    one producer thread; requests run on an internal pool, callbacks on the producer.
+    """
+
+    def __init__(self, col, progress: Optional[Callable[[str, int], None]] = None,
+                 max_bytes: int = WEAVIATE_BATCH_BYTES, max_objects: int = WEAVIATE_BATCH_OBJECTS,
+                 in_flight: int = WEAVIATE_BATCH_IN_FLIGHT, max_retries: int = WEAVIATE_BATCH_RETRIES,
+                 dead_letter: str = INGEST_DEAD_LETTER, backoff: float = 0.5):
+        self.col = col
+        self.progress = progress or (lambda counter, n: None)
+        self.max_bytes = max_bytes
+        self.max_objects = max_objects
+        self.in_flight = max(1, in_flight)
+        self.max_retries = max_retries
+        self.dead_letter = dead_letter
+        self.backoff = backoff
+        self.failed_tags: set = set()
+        self.stats: Dict[str, float] = {"written": 0, "bytes": 0, "requests": 0, "retries": 0, "dead_lettered": 0}
+        self.started = time.monotonic()
+        self._seq = 0
+        self._unsettled: List[int] = []   # heap of sequence numbers not yet written / dead-lettered
+        self._settled: set = set()
+        self._callbacks: deque = deque()  # (last sequence no. it waits for, fn)
+        self._retries: List[Tuple[float, _Entry]] = []   # heap by earliest retry time
+        self._open: List[_Entry] = []
+        self._open_bytes = 0
+        self._running: set = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.in_flight, thread_name_prefix="weaviate-batch")
+
+    def add(self, obj: DataObject, tag: Optional[str] = None) -> None:
+        entry = (self._seq, obj, tag, payload_bytes(obj), 0)
+        heapq.heappush(self._unsettled, self._seq)
+        self._seq += 1
+        self._enqueue(entry)
+        self._poll()
+
+    def after(self, fn: Callable[[], None]) -> None:
+        """Run fn (on this thread) once every object added so far is written or dead-lettered."""
+        self._callbacks.append((self._seq - 1, fn))
+        self._fire()
+
+    def flush(self) -> None:
+        while True:
+            self._take_due_retries()
+            if self._open:
+                self._submit()
+            if self._running:
+                self._wait(FIRST_COMPLETED)
+            elif self._retries:
+                time.sleep(max(0.0, self._retries[0][0] - time.monotonic()))
+            else:
+                break
+        self._fire()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            self._pool.shutdown(wait=True)
+
+    def __enter__(self) -> "BatchWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if exc[0] is None:
+            self.close()
+        else:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def throughput(self) -> Dict[str, float]:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        with self._lock:
+            s = dict(self.stats)
+        s["seconds"] = elapsed
+        s["objects_per_s"] = s["written"] / elapsed
+        s["mb_per_s"] = s["bytes"] / elapsed / 2**20
+        return s
+
+    def _enqueue(self, entry: _Entry) -> None:
+        if self._open and (self._open_bytes + entry[3] > self.max_bytes or len(self._open) >= self.max_objects):
+            self._submit()
+        self._open.append(entry)
+        self._open_bytes += entry[3]
+
+    def _submit(self) -> None:
+        batch = self._open
+        self._open, self._open_bytes = [], 0
+        self._running.add(self._pool.submit(self._write, batch))
+        while len(self._running) >= self.in_flight + 1:   # back-pressure on the producer
+            self._wait(FIRST_COMPLETED)
+
+    def _poll(self) -> None:
+        done = [f for f in self._running if f.done()]
+        if done:
+            self._finish(done)
+        self._take_due_retries()
+
+    def _wait(self, how) -> None:
+        done, _ = wait(self._running, return_when=how)
+        self._finish(done)
+
+    def _finish(self, done) -> None:
+        for fut in done:
+            self._running.discard(fut)
+            settled, retry = fut.result()
+            self._settled.update(settled)
+            for entry in retry:
+                # failed objects wait out their backoff in a side queue, not in a request slot
+                delay = min(30.0, self.backoff * 2 ** (entry[4] - 1)) * (0.5 + random.random())
+                heapq.heappush(self._retries, (time.monotonic() + delay, entry))
+        self._fire()
+
+    def _take_due_retries(self) -> None:
+        now = time.monotonic()
+        while self._retries and self._retries[0][0] <= now:
+            self._enqueue(heapq.heappop(self._retries)[1])
+
+    def _fire(self) -> None:
+        while self._unsettled and self._unsettled[0] in self._settled:
+            self._settled.discard(heapq.heappop(self._unsettled))
+        low = self._unsettled[0] if self._unsettled else self._seq
+        while self._callbacks and self._callbacks[0][0] < low:
+            self._callbacks.popleft()[1]()
+
+    def _write(self, batch: List[_Entry]) -> Tuple[List[int], List[_Entry]]:
+        """One insert_many attempt: (settled sequence numbers, entries to retry)."""
+        try:
+            res = self.col.data.insert_many([e[1] for e in batch])
+            errors = {i: e.message for i, e in (getattr(res, "errors", None) or {}).items()}
+        except Exception as e:   # the whole request failed: every object is retried
+            errors = {i: f"{type(e).__name__}: {e}" for i in range(len(batch))}
+        ok = [e for i, e in enumerate(batch) if i not in errors]
+        self._count(written=len(ok), bytes=sum(e[3] for e in ok), requests=1)
+        self.progress("chunks_written", len(ok))
+
+        settled = [e[0] for e in ok]
+        retry, dead = [], []
+        for i, message in errors.items():
+            e = batch[i]
+            if e[4] < self.max_retries and is_transient(message):
+                retry.append(e[:4] + (e[4] + 1,))
+            else:
+                dead.append((e, message))
+                settled.append(e[0])
+        if retry:
+            self._count(retries=len(retry))
+            self.progress("write_retries", len(retry))
+            logger.warning(f"{len(retry)} objects failed ({next(iter(errors.values()))}), will retry")
+        if dead:
+            self._dead_letter(dead)
+        return settled, retry
+
+    def _dead_letter(self, dead: List[Tuple[_Entry, str]]) -> None:
+        now = time.time()
+        with self._lock:
+            with open(self.dead_letter, "a", encoding="utf-8") as f:
+                for (_, obj, tag, _, attempts), message in dead:
+                    props = obj.properties or {}
+                    f.write(json.dumps({
+                        "uuid": str(obj.uuid) if obj.uuid else None,
+                        "source_path": props.get("source_path", tag),
+                        "page": props.get("page"),
+                        "error": message,
+                        "attempts": attempts + 1,
+                        "text": props.get("text"),
+                        "time": now,
+                    }) + "\n")
+                    if tag is not None:
+                        self.failed_tags.add(tag)
+            self.stats["dead_lettered"] += len(dead)
+        self.progress("chunks_failed", len(dead))
+        logger.error(f"{len(dead)} objects failed permanently, written to {self.dead_letter}: {dead[0][1]}")
+
+    def _count(self, **inc: float) -> None:
+        with self._lock:
+            for k, v in inc.items():
+                self.stats[k] += v
@@ -0,0 +1,180 @@
+# db/chunking.py — structure-aware, token-sized chunking in a single pass
+# Text is split into blocks (markdown headings, paragraphs, list items, fenced code),
+# blocks into sentences, and sentences are packed greedily into chunks of at most
+# CHUNK_TOKENS tokens. Chunks never straddle a heading, prefer to break between
+# paragraphs, and carry up to CHUNK_OVERLAP_TOKENS of trailing sentences into the
+# next chunk. Each chunk records an anchor: the heading path ("Trip > Flights") or the
+# caller's anchor (e.g. "page 3"). Every character is visited a constant number of
+# times, so run time is linear in the input size.
+import os, re
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional, Tuple
+
+from .embed_client import count_tokens
+
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "250"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "50"))
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_LIST_ITEM = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+")
+_WS = re.compile(r"\s+")
+
+# (text, tokens, separator placed before it when joined)
+Unit = Tuple[str, int, str]
+
+def _blocks(text: str) -> Iterator[Tuple[str, str]]:
+    """Yield ("heading", "## Title") / ("para", text) / ("code", text) blocks line by line."""
+    para: List[str] = []
+    code: Optional[List[str]] = None
+    for line in text.splitlines():
+        if code is not None:
+            code.append(line)
+            if _FENCE.match(line):
+                yield "code", "\n".join(code)
+                code = None
+            continue
+        if _FENCE.match(line):
+            if para:
+                yield "para", " ".join(para)
+                para = []
+            code = [line]
+            continue
+        m = _HEADING.match(line)
+        if m or not line.strip() or _LIST_ITEM.match(line):
+            if para:
+                yield "para", " ".join(para)
+                para = []
+            if m:
+                yield "heading", line.strip()
+            elif line.strip():
+                para.append(line.strip())   # list item starts its own block
+            continue
+        para.append(line.strip())
+    if code is not None:
+        yield "code", "\n".join(code)
+    if para:
+        yield "para", " ".join(para)
+
+def _sentences(block: str) -> Iterator[str]:
+    block = _WS.sub(" ", block).strip()
+    start = 0
+    for m in SENTENCE_END.finditer(block):
+        yield block[start:m.start() + len(m.group(0).rstrip())]
+        start = m.end()
+    if start < len(block):
+        yield block[start:]
+
+def _cut(word: str, max_tokens: int) -> Iterator[str]:
+    """Pieces of a run with no whitespace (URL, base64, CJK) of at most max_tokens each."""
+    start = 0
+    while start < len(word):
+        # guess ~4 chars per token, then shrink in proportion until the tokenizer agrees
+        end = min(len(word), start + max(1, (max_tokens - 1) * 4))
+        n = count_tokens(word[start:end])
+        while n > max_tokens and end - start > 1:
+            end = start + max(1, (end - start) * max_tokens // n)
+            n = count_tokens(word[start:end])
+        yield word[start:end]
+        start = end
+
+def _split_long(unit: str, max_tokens: int, sep: str) -> Iterator[Unit]:
+    """Break a single over-long sentence/line into pieces of at most max_tokens (linear)."""
+    piece: List[str] = []
+    piece_tokens = 0
+    for word in unit.split(" "):
+        n = count_tokens(word)
+        if n > max_tokens:   # no whitespace to break on: cut by tokens
+            if piece:
+                yield " ".join(piece), piece_tokens, sep
+                piece, piece_tokens, sep = [], 0, " "
+            for part in _cut(word, max_tokens):
+                yield part, count_tokens(part), sep
+                sep = " "
+            continue
+        if piece:
+            n += 1
+            if piece_tokens + n > max_tokens:
+                yield " ".join(piece), piece_tokens, sep
+                piece, piece_tokens, sep = [], 0, " "
+                n -= 1
+        piece.append(word)
+        piece_tokens += n
+    if piece:
+        yield " ".join(piece), piece_tokens, sep
+
+def _units(kind: str, block: str, max_tokens: int) -> List[Unit]:
+    if kind == "code":
+        raw = [(line, "\n") for line in block.split("\n")]
+        raw[0] = (raw[0][0], "\n\n")
+    else:
+        raw = [(s, " ") for s in _sentences(block)]
+        if raw:
+            raw[0] = (raw[0][0], "\n\n")
+    out: List[Unit] = []
+    for s, sep in raw:
+        n = count_tokens(s)
+        if n > max_tokens:
+            out.extend(_split_long(s, max_tokens, sep))
+        else:
+            out.append((s, n, sep))
+    return out
+
+def iter_chunks(text: str, max_tokens: int = CHUNK_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS,
+                anchor: Optional[str] = None) -> Iterator[Dict]:
+    """Yield {"text", "anchor", "tokens"} chunks of at most max_tokens tokens."""
+    overlap_tokens = min(overlap_tokens, max_tokens // 2)
+    headings: List[Tuple[int, str]] = []   # (level, title) of the enclosing headings
+    cur: Deque[Unit] = deque()
+    cur_tokens = 0
+    fresh = 0   # units in `cur` not carried over from the previous chunk
+
+    def current_anchor() -> Optional[str]:
+        return " > ".join(title for _, title in headings) if headings else anchor
+
+    def emit(carry: bool) -> Iterator[Dict]:
+        nonlocal cur, cur_tokens, fresh
+        if fresh:
+            body = "".join((sep if i else "") + t for i, (t, _, sep) in enumerate(cur)).strip()
+            yield {"text": body, "anchor": current_anchor(), "tokens": cur_tokens}
+        tail: Deque[Unit] = deque()
+        tail_tokens = 0
+        if carry:
+            while cur and tail_tokens + cur[-1][1] <= overlap_tokens:
+                u = cur.pop()
+                tail.appendleft(u)
+                tail_tokens += u[1]
+        cur, cur_tokens, fresh = tail, tail_tokens, 0
+
+    def add(u: Unit) -> Iterator[Dict]:
+        nonlocal cur_tokens, fresh
+        if cur_tokens + u[1] > max_tokens:
+            if fresh:
+                yield from emit(carry=True)
+            while cur and cur_tokens + u[1] > max_tokens:   # overlap must leave room for progress
+                cur_tokens -= cur.popleft()[1]
+        cur.append(u)
+        cur_tokens += u[1]
+        fresh += 1
+
+    for kind, block in _blocks(text):
+        if kind == "heading":
+            yield from emit(carry=False)
+            m = _HEADING.match(block)
+            level = len(m.group(1))
+            while headings and headings[-1][0] >= level:
+                headings.pop()
+            headings.append((level, m.group(2)))
+            u = (block, count_tokens(block), "\n\n")
+            cur.append(u)
+            cur_tokens += u[1]
+            continue
+        units = _units(kind, block, max_tokens)
+        block_tokens = sum(u[1] for u in units)
+        if fresh and cur_tokens + block_tokens > max_tokens and block_tokens <= max_tokens:
+            # the paragraph fits in a chunk of its own: break before it, not inside it
+            yield from emit(carry=True)
+        for u in units:
+            yield from add(u)
+    yield from emit(carry=False)
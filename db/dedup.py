@@ -0,0 +1,109 @@
+# db/dedup.py — near-duplicate chunk detection and PDF boilerplate stripping
+# Chunks get a 64-bit SimHash over 4-word shingles; two chunks whose hashes differ in at
+# most INGEST_DEDUP_DISTANCE bits are treated as the same text, and only the first is
+# embedded and stored. Lookups split the hash into DISTANCE+1 blocks and probe each block
+# exactly (pigeonhole: a near match agrees on at least one block), so they cost O(1)
+# expected rather than a scan. Boilerplate is lines repeated at the top/bottom of many
+# pages of one PDF (running headers, footers, "Page 3 of 12").
+import os, re, hashlib
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+INGEST_DEDUP = os.getenv("INGEST_DEDUP", "1") != "0"
+INGEST_DEDUP_DISTANCE = int(os.getenv("INGEST_DEDUP_DISTANCE", "3"))
+SHINGLE_WORDS = 4
+BOILERPLATE_EDGE_LINES = 3        # lines checked at the top and bottom of each page
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_MIN_FRACTION = 0.5    # of the file's pages a line must repeat on
+
+_WORD = re.compile(r"\w+")
+_DIGITS = re.compile(r"\d+")
+_BITS = np.arange(64, dtype=np.uint64)
+
+def simhash(text: str) -> int:
+    words = _WORD.findall(text.lower())
+    if not words:
+        return 0
+    shingles = [" ".join(words[i:i + SHINGLE_WORDS]) for i in range(max(1, len(words) - SHINGLE_WORDS + 1))]
+    hashes = np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles),
+        dtype=np.uint64, count=len(shingles),
+    )
+    ones = ((hashes[:, None] >> _BITS) & np.uint64(1)).sum(axis=0)
+    bits = (ones * 2 > len(shingles)).astype(np.uint8)
+    return int.from_bytes(np.packbits(bits, bitorder="little").tobytes(), "little")
+
+class SimHashIndex:
+    """SimHash -> key lookup within max_distance bits."""
+
+    def __init__(self, max_distance: int = INGEST_DEDUP_DISTANCE):
+        self.max_distance = max_distance
+        n = max_distance + 1
+        width = -(-64 // n)
+        self._slices = [(i * width, min(64, (i + 1) * width)) for i in range(n) if i * width < 64]
+        self._tables: List[Dict[int, Set[str]]] = [{} for _ in self._slices]
+        self._hashes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _blocks(self, h: int):
+        for table, (lo, hi) in zip(self._tables, self._slices):
+            yield table, (h >> lo) & ((1 << (hi - lo)) - 1)
+
+    def add(self, h: int, key: str) -> None:
+        if key in self._hashes:
+            self.remove(key)
+        self._hashes[key] = h
+        for table, block in self._blocks(h):
+            table.setdefault(block, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        h = self._hashes.pop(key, None)
+        if h is None:
+            return
+        for table, block in self._blocks(h):
+            keys = table.get(block)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del table[block]
+
+    def find(self, h: int) -> Optional[str]:
+        for table, block in self._blocks(h):
+            for key in table.get(block, ()):
+                if bin(self._hashes[key] ^ h).count("1") <= self.max_distance:
+                    return key
+        return None
+
+def _line_key(line: str) -> str:
+    # page numbers and dates differ from page to page; the rest of a footer doesn't
+    return _DIGITS.sub("#", " ".join(line.lower().split()))
+
+def _edges(lines: List[str]) -> List[int]:
+    idx = [i for i, line in enumerate(lines) if line.strip()]
+    n = min(BOILERPLATE_EDGE_LINES, len(idx) // 3)   # short pages: only the very first/last lines
+    return sorted(set(idx[:n] + idx[len(idx) - n:])) if n else []
+
+def strip_boilerplate(pages: List[Dict]) -> Tuple[List[Dict], int]:
+    """Drop header/footer lines repeated across the pages of one PDF; returns (pages, lines removed)."""
+    if len(pages) < BOILERPLATE_MIN_PAGES:
+        return pages, 0
+    split = [pg["text"].splitlines() for pg in pages]
+    counts: Counter = Counter()
+    for lines in split:
+        counts.update({_line_key(lines[i]) for i in _edges(lines)})
+    threshold = max(2, BOILERPLATE_MIN_FRACTION * len(pages))
+    repeated = {k for k, n in counts.items() if n >= threshold and k}
+    if not repeated:
+        return pages, 0
+    out, removed = [], 0
+    for pg, lines in zip(pages, split):
+        drop = {i for i in _edges(lines) if _line_key(lines[i]) in repeated}
+        removed += len(drop)
+        text = "\n".join(line for i, line in enumerate(lines) if i not in drop)
+        if text.strip():
+            out.append({**pg, "text": text})
+    return out, removed
@@ -0,0 +1,119 @@
+# db/diversify.py — post-retrieval diversification of search hits
+# Consecutive chunks of a document share CHUNK_OVERLAP_TOKENS of text, so a plain top-k
+# often returns the same passage two or three times. diversify() runs on an over-fetched
+# candidate list (RAG_DIVERSIFY_FETCH x top_k):
+#   1. merge_overlapping() joins hits from the same source (and page) whose texts overlap
+#      (one's tail is the other's head) or contain one another into a single passage;
+#      the passage keeps the best score and the mean of the member vectors
+#   2. mmr_select() picks top_k passages by maximal marginal relevance:
+#      lambda * relevance - (1 - lambda) * max cosine similarity to the passages already picked,
+#      using the stored chunk vectors; relevance is the hit's retrieval score
+# Hits are dicts with "text", "score" and optionally "vector"; a hit without a vector is never
+# penalized as redundant. Everything else on the hit is passed through.
+import os
+from typing import Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+RAG_DIVERSIFY = os.getenv("RAG_DIVERSIFY", "true").lower() in ("1", "true", "yes")
+RAG_DIVERSIFY_FETCH = int(os.getenv("RAG_DIVERSIFY_FETCH", "4"))   # candidates per requested hit
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))         # 1 = relevance only
+RAG_MERGE_MIN_OVERLAP = int(os.getenv("RAG_MERGE_MIN_OVERLAP", "20"))   # characters
+RAG_MERGE_MAX_CHARS = int(os.getenv("RAG_MERGE_MAX_CHARS", "4000"))    # longest merged passage
+
+def text_overlap(a: str, b: str, min_overlap: int = RAG_MERGE_MIN_OVERLAP) -> int:
+    """Length of the longest suffix of `a` that is a prefix of `b` (0 if shorter than min_overlap)."""
+    if min(len(a), len(b)) < min_overlap:
+        return 0
+    head = b[:min_overlap]
+    pos = a.find(head, max(0, len(a) - len(b)))
+    while pos != -1:
+        if b.startswith(a[pos:]):
+            return len(a) - pos
+        pos = a.find(head, pos + 1)
+    return 0
+
+def merge_texts(a: str, b: str, min_overlap: int = RAG_MERGE_MIN_OVERLAP) -> Optional[str]:
+    """One text covering both if they overlap or one contains the other, else None."""
+    if b in a:
+        return a
+    if a in b:
+        return b
+    n = text_overlap(a, b, min_overlap)
+    if n:
+        return a + b[n:]
+    n = text_overlap(b, a, min_overlap)
+    if n:
+        return b + a[n:]
+    return None
+
+def _unit(v) -> Optional[np.ndarray]:
+    if v is None:
+        return None
+    v = np.asarray(v, dtype=np.float32).ravel()
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else None
+
+def merge_overlapping(hits: Sequence[Dict], key: Callable[[Dict], Hashable],
+                      min_overlap: int = RAG_MERGE_MIN_OVERLAP, max_chars: int = RAG_MERGE_MAX_CHARS) -> List[Dict]:
+    """Merge hits with the same key(hit) whose texts overlap (up to max_chars); keeps the best-first order."""
+    passages: List[Dict] = []
+    groups: Dict[Hashable, List[Dict]] = {}
+    for hit in hits:
+        p = {**hit, "vector": _unit(hit.get("vector")), "merged": 1}
+        group = groups.setdefault(key(hit), [])
+        merged = True
+        while merged:   # a merged passage can bridge two earlier ones
+            merged = False
+            for other in group:
+                text = merge_texts(other["text"], p["text"], min_overlap)
+                if text is None or (len(text) > max_chars and text not in (other["text"], p["text"])):
+                    continue
+                first = other if other["score"] >= p["score"] else p
+                vectors = [v for v in (other["vector"], p["vector"]) if v is not None]
+                p = {**first, "text": text, "score": first["score"], "merged": other["merged"] + p["merged"],
+                     "vector": _unit(np.mean(vectors, axis=0)) if vectors else None}
+                group.remove(other)
+                passages.remove(other)
+                merged = True
+                break
+        group.append(p)
+        passages.append(p)
+    passages.sort(key=lambda p: -p["score"])
+    return passages
+
+def mmr_select(scores: Sequence[float], vectors: Sequence[Optional[np.ndarray]], k: int,
+               lambda_: float = RAG_MMR_LAMBDA) -> List[int]:
+    """Indices of k items chosen by maximal marginal relevance, in pick order."""
+    n = len(scores)
+    if n <= 1 or k <= 0:
+        return list(range(min(n, max(k, 0))))
+    dims = next((len(v) for v in vectors if v is not None), 0)
+    m = np.zeros((n, dims), dtype=np.float32)
+    for i, v in enumerate(vectors):
+        if v is not None and len(v) == dims:
+            m[i] = v
+    rel = np.asarray(scores, dtype=np.float32)
+    max_sim = np.zeros(n, dtype=np.float32)
+    available = np.ones(n, dtype=bool)
+    picked: List[int] = []
+    for _ in range(min(k, n)):
+        mmr = np.where(available, lambda_ * rel - (1.0 - lambda_) * max_sim, -np.inf)
+        i = int(np.argmax(mmr))
+        picked.append(i)
+        available[i] = False
+        if dims:
+            max_sim = np.maximum(max_sim, m @ m[i])
+    return picked
+
+def diversify(hits: Sequence[Dict], k: int, key: Callable[[Dict], Hashable],
+              lambda_: float = RAG_MMR_LAMBDA, min_overlap: int = RAG_MERGE_MIN_OVERLAP) -> List[Dict]:
+    """Merge overlapping hits, then pick k by MMR. Returned hits carry "merged" (chunk count), no vector."""
+    passages = merge_overlapping(hits, key, min_overlap)
+    picked = mmr_select([p["score"] for p in passages], [p["vector"] for p in passages], k, lambda_)
+    out = []
+    for i in picked:
+        p = dict(passages[i])
+        p.pop("vector", None)
+        out.append(p)
+    return out
@@ -0,0 +1,171 @@
+# db/embed_cache.py — persistent embedding cache shared by every embedding call site
+# SQLite on disk, keyed by (model, dimensions, sha256(text)), vectors stored as packed
+# float32 or float16 blobs, with a small in-memory LRU in front and size-based eviction
+# (least recently used rows go first once the file passes EMBED_CACHE_MAX_BYTES).
+import os, time, sqlite3, hashlib, threading
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+try:   # also loaded top-level by memory_bank
+    from db.vectors import EMBED_VECTOR_DTYPE
+except Exception:
+    from vectors import EMBED_VECTOR_DTYPE
+
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", ".embed_cache.sqlite3")
+EMBED_CACHE_DTYPE = os.getenv("EMBED_CACHE_DTYPE", "float32")          # float32 | float16
+EMBED_CACHE_MAX_BYTES = int(os.getenv("EMBED_CACHE_MAX_BYTES", str(1024 ** 3)))
+EMBED_CACHE_MEMORY_ITEMS = int(os.getenv("EMBED_CACHE_MEMORY_ITEMS", "4096"))
+
+def text_key(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+def pack_vector(vec: np.ndarray, dtype: str) -> bytes:
+    return np.asarray(vec, dtype="<f2" if dtype == "float16" else "<f4").tobytes()
+
+def unpack_vector(blob: bytes, dtype: str) -> np.ndarray:
+    return np.frombuffer(blob, dtype="<f2" if dtype == "float16" else "<f4")
+
+class EmbeddingCache:
+    def __init__(self, path: str = EMBED_CACHE_PATH, dtype: str = EMBED_CACHE_DTYPE,
+                 max_bytes: int = EMBED_CACHE_MAX_BYTES, memory_items: int = EMBED_CACHE_MEMORY_ITEMS):
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported EMBED_CACHE_DTYPE: {dtype}")
+        self.dtype = dtype
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._mem: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS embeddings (
+                   model TEXT NOT NULL, dims INTEGER NOT NULL, text_sha TEXT NOT NULL,
+                   dtype TEXT NOT NULL, vec BLOB NOT NULL, atime REAL NOT NULL,
+                   PRIMARY KEY (model, dims, text_sha))"""
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_atime ON embeddings (atime)")
+        self._bytes = self._db.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM embeddings").fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model: str, dims: int, shas: List[str]) -> Dict[str, np.ndarray]:
+        found: Dict[str, np.ndarray] = {}
+        with self._lock:
+            need = []
+            for sha in shas:
+                vec = self._mem.get((model, dims, sha))
+                if vec is not None:
+                    self._mem.move_to_end((model, dims, sha))
+                    found[sha] = vec
+                else:
+                    need.append(sha)
+            now = time.time()
+            for i in range(0, len(need), 500):
+                part = need[i:i+500]
+                rows = self._db.execute(
+                    f"SELECT text_sha, dtype, vec FROM embeddings WHERE model=? AND dims=? "
+                    f"AND text_sha IN ({','.join('?' * len(part))})",
+                    [model, dims, *part],
+                ).fetchall()
+                for sha, dtype, blob in rows:
+                    found[sha] = unpack_vector(blob, dtype)
+                    self._remember((model, dims, sha), found[sha])
+                if rows:
+                    self._db.executemany(
+                        "UPDATE embeddings SET atime=? WHERE model=? AND dims=? AND text_sha=?",
+                        [(now, model, dims, r[0]) for r in rows],
+                    )
+        return found
+
+    def put_many(self, model: str, dims: int, items: Dict[str, np.ndarray]) -> None:
+        if not items:
+            return
+        now = time.time()
+        rows = [(model, dims, sha, self.dtype, pack_vector(vec, self.dtype), now) for sha, vec in items.items()]
+        with self._lock:
+            self._db.execute("BEGIN")
+            replaced = self._stored_bytes(model, dims, list(items))   # INSERT OR REPLACE frees these
+            self._db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?, ?)", rows)
+            self._db.execute("COMMIT")
+            self._bytes += sum(len(r[4]) for r in rows) - replaced
+            for sha, row in zip(items, rows):
+                self._remember((model, dims, sha), unpack_vector(row[4], self.dtype))
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def get_or_embed(self, texts: List[str], embed_fn: Callable[[List[str]], np.ndarray],
+                     model: str, dims: Optional[int] = None, out_dtype: str = EMBED_VECTOR_DTYPE) -> np.ndarray:
+        """(len(texts), dims) array of vectors, calling embed_fn only for texts not cached (each once)."""
+        dims = dims or 0
+        shas = [text_key(t) for t in texts]
+        found = self.get_many(model, dims, list(dict.fromkeys(shas)))
+        missing: Dict[str, str] = {}
+        for sha, t in zip(shas, texts):
+            if sha not in found and sha not in missing:
+                missing[sha] = t
+        self.hits += len(texts) - sum(1 for s in shas if s in missing)
+        self.misses += len(missing)
+        if missing:
+            vecs = embed_fn(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vecs))
+            self.put_many(model, dims, fresh)
+            found.update(fresh)
+        if not shas:
+            return np.empty((0, 0), dtype=out_dtype)
+        out = np.empty((len(shas), len(found[shas[0]])), dtype=out_dtype)
+        for i, sha in enumerate(shas):
+            out[i] = found[sha]
+        return out
+
+    def stats(self) -> Dict:
+        return {"hits": self.hits, "misses": self.misses, "bytes": self._bytes,
+                "memory_items": len(self._mem), "dtype": self.dtype}
+
+    def _stored_bytes(self, model: str, dims: int, shas: List[str]) -> int:
+        total = 0
+        for i in range(0, len(shas), 500):
+            part = shas[i:i+500]
+            total += self._db.execute(
+                f"SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM embeddings WHERE model=? AND dims=? "
+                f"AND text_sha IN ({','.join('?' * len(part))})",
+                [model, dims, *part],
+            ).fetchone()[0]
+        return total
+
+    def _remember(self, key: tuple, vec: np.ndarray) -> None:
+        self._mem[key] = vec
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_items:
+            self._mem.popitem(last=False)
+
+    def _evict(self) -> None:
+        # drop least recently used rows until we're back under 90% of the budget
+        target = int(self.max_bytes * 0.9)
+        while self._bytes > target:
+            rows = self._db.execute(
+                "SELECT rowid, LENGTH(vec) FROM embeddings ORDER BY atime LIMIT 1000"
+            ).fetchall()
+            if not rows:
+                self._bytes = 0
+                break
+            drop, freed = [], 0
+            for rowid, n in rows:
+                drop.append((rowid,))
+                freed += n
+                if self._bytes - freed <= target:
+                    break
+            self._db.executemany("DELETE FROM embeddings WHERE rowid=?", drop)
+            self._bytes -= freed
+
+_cache: Optional[EmbeddingCache] = None
+_cache_lock = threading.Lock()
+
+def get_embed_cache() -> EmbeddingCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = EmbeddingCache()
+        return _cache
@@ -0,0 +1,186 @@
+# db/embed_client.py — concurrent, rate-limit-aware OpenAI embeddings client
+# Inputs are packed into requests by token count (tiktoken cl100k_base, or a ~4 chars/token
+# estimate when it is not installed) rather than a fixed item count; several
+# requests are kept in flight on a thread pool, requests-per-minute and tokens-per-minute
+# budgets are enforced with token buckets, and 429s / 5xx are retried with backoff
+# (honouring Retry-After). Vectors are requested base64-encoded and decoded straight into
+# NumPy arrays (see vectors.py). Point OPENAI_BASE_URL at benchmarks/fake_openai.py to run offline.
+import os, time, random, logging, threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import openai
+from openai import OpenAI
+
+try:   # also loaded top-level by memory_bank
+    from db.vectors import EMBED_VECTOR_DTYPE, decode_embedding
+except Exception:
+    from vectors import EMBED_VECTOR_DTYPE, decode_embedding
+
+try:
+    import tiktoken
+    _ENC = tiktoken.get_encoding("cl100k_base")   # fetched once, then cached by tiktoken
+except Exception:   # optional: fall back to a ~4 chars/token estimate
+    _ENC = None
+
+logger = logging.getLogger(__name__)
+
+if _ENC is None:
+    logger.warning("tiktoken unavailable: token counts (embedding batches, TPM limit, chunk sizes, "
+                   "context budget) are estimated as len(text) // 4 + 1")
+
+EMBED_MODEL = os.getenv("EMBED_MODEL", "text-embedding-3-large")
+EMBED_DIMENSIONS = int(os.getenv("EMBED_DIMENSIONS", "0")) or None   # None = model default
+EMBED_MAX_IN_FLIGHT = int(os.getenv("EMBED_MAX_IN_FLIGHT", "4"))
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "8192"))
+EMBED_BATCH_ITEMS = int(os.getenv("EMBED_BATCH_ITEMS", "2048"))
+EMBED_RPM = int(os.getenv("EMBED_RPM", "3000"))          # 0 = no limit
+EMBED_TPM = int(os.getenv("EMBED_TPM", "1000000"))       # 0 = no limit
+EMBED_MAX_RETRIES = int(os.getenv("EMBED_MAX_RETRIES", "6"))
+MAX_INPUT_TOKENS = 8191
+
+def count_tokens(text: str) -> int:
+    """cl100k_base tokens with tiktoken; otherwise an estimate that undercounts non-ASCII text."""
+    if _ENC is not None:
+        return len(_ENC.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+class TokenBucket:
+    """
+    Refills `per_minute` units per minute up to `per_minute`; acquire() blocks until enough are available.
+    A rate of 0 (or less) means unlimited.
+    """
+
+    def __init__(self, per_minute: float):
+        self.unlimited = per_minute <= 0
+        self.capacity = float(max(per_minute, 0))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, n: float = 1.0) -> None:
+        if self.unlimited:
+            return
+        n = min(float(n), self.capacity)   # an oversized request just waits for a full bucket
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                wait = (n - self.tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def drain(self) -> None:
+        """Empty the bucket (after a 429 the server says we're over budget)."""
+        with self._lock:
+            self.tokens = 0.0
+            self.updated = time.monotonic()
+
+class EmbeddingClient:
+    def __init__(self, model: str = EMBED_MODEL, dimensions: Optional[int] = EMBED_DIMENSIONS,
+                 max_in_flight: int = EMBED_MAX_IN_FLIGHT, batch_tokens: int = EMBED_BATCH_TOKENS,
+                 batch_items: int = EMBED_BATCH_ITEMS, rpm: int = EMBED_RPM, tpm: int = EMBED_TPM,
+                 max_retries: int = EMBED_MAX_RETRIES, client: Optional[OpenAI] = None,
+                 dtype: str = EMBED_VECTOR_DTYPE):
+        self.model = model
+        self.dtype = dtype
+        self.dimensions = dimensions
+        self.batch_tokens = batch_tokens
+        self.batch_items = batch_items
+        self.max_retries = max_retries
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        # we own retries/backoff, so the SDK's own retry loop is turned off
+        self.client = client or OpenAI(max_retries=0)
+        self.pool = ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="embed")
+        self._stats_lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "retries": 0, "rate_limited": 0, "tokens": 0, "inputs": 0}
+
+    def batches(self, texts: Sequence[str]) -> List[List[int]]:
+        """Group text indices into requests of at most batch_tokens tokens / batch_items inputs."""
+        out: List[List[int]] = []
+        cur: List[int] = []
+        cur_tokens = 0
+        for i, t in enumerate(texts):
+            n = min(count_tokens(t), MAX_INPUT_TOKENS)
+            if cur and (cur_tokens + n > self.batch_tokens or len(cur) >= self.batch_items):
+                out.append(cur)
+                cur, cur_tokens = [], 0
+            cur.append(i)
+            cur_tokens += n
+        if cur:
+            out.append(cur)
+        return out
+
+    def submit(self, texts: Sequence[str]) -> List[Future]:
+        """Start embedding; one future per request batch, each resolving to (indices, (n, dims) array)."""
+        futures = []
+        for idx in self.batches(texts):
+            batch = [texts[i] for i in idx]
+            futures.append(self.pool.submit(self._request_with_retry, idx, batch))
+        return futures
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), dims) array, rows in input order."""
+        out: Optional[np.ndarray] = None
+        for fut in self.submit(texts):
+            idx, vecs = fut.result()
+            if out is None:
+                out = np.empty((len(texts), vecs.shape[1]), dtype=self.dtype)
+            out[idx] = vecs
+        return out if out is not None else np.empty((0, 0), dtype=self.dtype)
+
+    def _request_with_retry(self, idx: List[int], batch: List[str]):
+        n_tokens = sum(min(count_tokens(t), MAX_INPUT_TOKENS) for t in batch)
+        extra = {"dimensions": self.dimensions} if self.dimensions else {}
+        attempt = 0
+        while True:
+            self.requests.acquire(1)
+            self.tokens.acquire(n_tokens)
+            try:
+                res = self.client.embeddings.create(
+                    model=self.model, input=batch, encoding_format="base64", **extra
+                )
+                self._count(requests=1, tokens=n_tokens, inputs=len(batch))
+                data = sorted(res.data, key=lambda d: d.index)
+                return idx, np.stack([decode_embedding(d.embedding, self.dtype) for d in data])
+            except (openai.RateLimitError, openai.APIConnectionError, openai.InternalServerError) as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                delay = self._retry_after(e) or min(60.0, 0.5 * 2 ** (attempt - 1)) * (0.5 + random.random())
+                if isinstance(e, openai.RateLimitError):
+                    self._count(rate_limited=1)
+                    self.requests.drain()
+                self._count(retries=1)
+                logger.warning(f"Embedding request failed ({type(e).__name__}), retry {attempt} in {delay:.1f}s")
+                time.sleep(delay)
+
+    @staticmethod
+    def _retry_after(e: Exception) -> Optional[float]:
+        resp = getattr(e, "response", None)
+        value = resp.headers.get("retry-after") if resp is not None else None
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+
+    def _count(self, **inc: int) -> None:
+        with self._stats_lock:
+            for k, v in inc.items():
+                self.stats[k] = self.stats.get(k, 0) + v
+
+_client: Optional[EmbeddingClient] = None
+_client_lock = threading.Lock()
+
+def get_embed_client() -> EmbeddingClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = EmbeddingClient()
+        return _client
@@ -0,0 +1,271 @@
+# db/hybrid.py — keyword (BM25) retrieval and score fusion for hybrid search
+# BM25Index is a small in-process inverted index over chunk text, persisted as an append-only
+# JSONL log (RAG_BM25_PATH) and replayed on load, so keyword search keeps working without a
+# Weaviate instance. fuse() combines a vector result list with a keyword one, either by
+# weighted reciprocal-rank fusion ("rrf") or by blending min-max normalized scores
+# ("relative", the same as Weaviate's relativeScoreFusion). alpha weighs the vector side:
+# 1.0 is pure vector search, 0.0 pure keyword search.
+# Path filters are a second inverted index over keys(doc) (db.path_filters.path_keys), so a
+# filtered search only scores the postings of documents under the requested folders / types.
+import os, re, json, math, pathlib, threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from .path_filters import path_keys
+
+RAG_BM25_PATH = os.getenv("RAG_BM25_PATH", ".rag_bm25.jsonl")
+RAG_HYBRID_ALPHA = float(os.getenv("RAG_HYBRID_ALPHA", "0.5"))
+RAG_HYBRID_FUSION = os.getenv("RAG_HYBRID_FUSION", "relative")   # relative | rrf
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+FUSIONS = ("rrf", "relative")
+
+_TOKEN = re.compile(r"[^\W_]+")   # Unicode letters and digits
+
+# (id, score), best first
+Hits = List[Tuple[str, float]]
+
+def tokenize(text: str) -> List[str]:
+    """Casefolded runs of letters and digits in any script, split like Weaviate's "word" tokenization."""
+    return _TOKEN.findall((text or "").casefold())
+
+class BM25Index:
+    """
+    Documents are {"id", "text", "path"?, "anchor"?, "metadata"?}; ids are the Weaviate object
+    ids so keyword hits line up with vector hits. `keys(doc)` gives the terms of the filter
+    index that `search(any_of=...)` looks up. Thread-safe; `generation` changes on every
+    add/remove, for callers that cache results.
+    """
+
+    def __init__(self, path: Optional[str] = RAG_BM25_PATH, k1: float = BM25_K1, b: float = BM25_B,
+                 keys: Optional[Callable[[Dict], Iterable[str]]] = None):
+        self.path = pathlib.Path(path) if path else None
+        self.k1, self.b = k1, b
+        self.keys = keys
+        self.generation = 0
+        self._docs: List[Optional[Dict]] = []       # slot -> document (None once removed)
+        self._lengths = np.zeros(1024, dtype=np.float32)   # slot -> token count (grown by doubling)
+        self._slots: Dict[str, int] = {}            # id -> slot
+        self._postings: Dict[str, Dict[int, int]] = {}   # term -> {slot: term frequency}
+        self._key_postings: Dict[str, Set[int]] = {}     # filter key -> live slots
+        self._total_len = 0
+        self._lock = threading.RLock()
+        if self.path and self.path.exists():
+            self._replay()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        with self._lock:
+            slot = self._slots.get(doc_id)
+            return self._docs[slot] if slot is not None else None
+
+    def add(self, doc: Dict, persist: bool = True) -> None:
+        """Add or replace one document."""
+        with self._lock:
+            self._add(doc)
+            if persist:
+                self._append({"op": "add", **doc})
+
+    def add_many(self, docs: Iterable[Dict], persist: bool = True) -> int:
+        with self._lock:
+            docs = list(docs)
+            for d in docs:
+                self._add(d)
+            if persist:
+                self._append(*({"op": "add", **d} for d in docs))
+            return len(docs)
+
+    def remove(self, doc_id: str, persist: bool = True) -> bool:
+        with self._lock:
+            if not self._remove(doc_id):
+                return False
+            if persist:
+                self._append({"op": "del", "id": doc_id})
+            return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._docs, self._slots, self._postings, self._key_postings = [], {}, {}, {}
+            self._lengths = np.zeros(1024, dtype=np.float32)
+            self._total_len = 0
+            self.generation += 1
+
+    def save(self) -> None:
+        """Rewrite the log as one "add" per live document (compaction)."""
+        if not self.path:
+            return
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                for d in self._docs:
+                    if d is not None:
+                        f.write(json.dumps({"op": "add", **d}) + "\n")
+            os.replace(tmp, self.path)
+
+    def search(self, query: str, k: int = 10, where: Optional[Callable[[Dict], bool]] = None,
+               any_of: Optional[Iterable[str]] = None) -> Hits:
+        """
+        Top-k (id, BM25 score) for the query. `any_of` keeps documents with at least one of
+        those keys (an index lookup); `where` filters on the stored document.
+        """
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self._slots)
+            if not n or not terms:
+                return []
+            allowed = None
+            if any_of is not None:
+                found = [self._key_postings.get(key, ()) for key in any_of]
+                allowed = found[0] if len(found) == 1 else set().union(*found)
+                if not allowed:
+                    return []
+            avgdl = self._total_len / n
+            lengths = self._lengths
+            slots, contrib = [], []
+            for term in terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                # idf stays corpus-wide, so a filter doesn't change the scores of what it keeps
+                idf = math.log(1.0 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                if allowed is not None and 8 * len(allowed) < len(posting):
+                    # selective filter: only score the allowed slots' postings
+                    posting = {s: posting[s] for s in allowed if s in posting}
+                    if not posting:
+                        continue
+                s = np.fromiter(posting.keys(), dtype=np.int64, count=len(posting))
+                tf = np.fromiter(posting.values(), dtype=np.float32, count=len(posting))
+                norm = self.k1 * (1.0 - self.b + self.b * lengths[s] / avgdl)
+                slots.append(s)
+                contrib.append(idf * tf * (self.k1 + 1.0) / (tf + norm))
+            if not slots:
+                return []
+            uniq, inv = np.unique(np.concatenate(slots), return_inverse=True)
+            scores = np.bincount(inv, weights=np.concatenate(contrib))
+            order = np.argsort(-scores, kind="stable")
+            hits: Hits = []
+            for i in order:
+                slot = int(uniq[i])
+                if allowed is not None and slot not in allowed:
+                    continue
+                doc = self._docs[slot]
+                if where is None or where(doc):
+                    hits.append((doc["id"], float(scores[i])))
+                    if len(hits) >= k:
+                        break
+            return hits
+
+    def _add(self, doc: Dict) -> None:
+        self._remove(doc["id"])
+        counts: Dict[str, int] = {}
+        tokens = tokenize(doc.get("text", ""))
+        for t in tokens:
+            counts[t] = counts.get(t, 0) + 1
+        slot = len(self._docs)
+        self._docs.append({k: v for k, v in doc.items() if k != "op"})
+        if slot >= len(self._lengths):
+            self._lengths = np.concatenate([self._lengths, np.zeros_like(self._lengths)])
+        self._lengths[slot] = len(tokens)
+        self._slots[doc["id"]] = slot
+        self._total_len += len(tokens)
+        for t, c in counts.items():
+            self._postings.setdefault(t, {})[slot] = c
+        for key in (self.keys(doc) if self.keys else ()):
+            self._key_postings.setdefault(key, set()).add(slot)
+        self.generation += 1
+
+    def _remove(self, doc_id: str) -> bool:
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return False
+        for t in set(tokenize(self._docs[slot].get("text", ""))):
+            posting = self._postings.get(t)
+            if posting is not None:
+                posting.pop(slot, None)
+                if not posting:
+                    del self._postings[t]
+        for key in (self.keys(self._docs[slot]) if self.keys else ()):
+            slots = self._key_postings.get(key)
+            if slots is not None:
+                slots.discard(slot)
+                if not slots:
+                    del self._key_postings[key]
+        self._total_len -= int(self._lengths[slot])
+        self._docs[slot], self._lengths[slot] = None, 0
+        self.generation += 1
+        return True
+
+    def _append(self, *records: Dict) -> None:
+        if not self.path or not records:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r) + "\n" for r in records))
+
+    def _replay(self) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:   # torn last line after a crash
+                    continue
+                if rec.get("op") == "del":
+                    self._remove(rec["id"])
+                elif rec.get("id"):
+                    self._add(rec)
+        if len(self._docs) > 2 * max(len(self._slots), 1000):   # mostly tombstones: compact
+            live = [d for d in self._docs if d is not None]
+            self.clear()
+            for d in live:
+                self._add(d)
+            self.save()
+
+def rrf_fuse(vector_hits: Hits, keyword_hits: Hits, alpha: float = RAG_HYBRID_ALPHA, k: int = RAG_RRF_K) -> Hits:
+    """Weighted reciprocal-rank fusion, scaled so a document ranked first in both lists scores 1.0."""
+    scores: Dict[str, float] = {}
+    for weight, hits in ((alpha, vector_hits), (1.0 - alpha, keyword_hits)):
+        for rank, (doc_id, _) in enumerate(hits, 1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * (k + 1) / (k + rank)
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+def _min_max(hits: Hits) -> Dict[str, float]:
+    if not hits:
+        return {}
+    lo, hi = min(s for _, s in hits), max(s for _, s in hits)
+    span = hi - lo
+    return {doc_id: (s - lo) / span if span > 0 else 1.0 for doc_id, s in hits}
+
+def relative_score_fuse(vector_hits: Hits, keyword_hits: Hits, alpha: float = RAG_HYBRID_ALPHA) -> Hits:
+    """alpha * normalized vector score + (1 - alpha) * normalized BM25 score, each min-max scaled to [0, 1]."""
+    scores: Dict[str, float] = {}
+    for weight, norm in ((alpha, _min_max(vector_hits)), (1.0 - alpha, _min_max(keyword_hits))):
+        for doc_id, s in norm.items():
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight * s
+    return sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+
+def fuse(vector_hits: Hits, keyword_hits: Hits, alpha: float = RAG_HYBRID_ALPHA,
+         fusion: str = RAG_HYBRID_FUSION) -> Hits:
+    if fusion == "rrf":
+        return rrf_fuse(vector_hits, keyword_hits, alpha)
+    if fusion == "relative":
+        return relative_score_fuse(vector_hits, keyword_hits, alpha)
+    raise ValueError(f"unknown fusion {fusion!r}, expected one of {FUSIONS}")
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+def get_bm25_index() -> BM25Index:
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = BM25Index(keys=lambda doc: path_keys(doc.get("path") or ""))
+        return _index
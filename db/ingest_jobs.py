@@ -0,0 +1,109 @@
+# db/ingest_jobs.py — background ingest queue so uploads never block the event loop
+# Upload handlers enqueue a job and return its id; a small pool of workers runs the
+# (synchronous) ingest in threads and records progress that /upload/jobs/{id} reports.
+import os, time, uuid, asyncio, logging, threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from .weaviate_utils import ingest_paths
+
+logger = logging.getLogger(__name__)
+
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "100"))
+MAX_FINISHED_JOBS = 500
+
+class QueueFull(RuntimeError):
+    pass
+
+@dataclass
+class IngestJob:
+    paths: List[str]
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = "queued"            # queued | running | done | failed
+    progress: Dict[str, int] = field(default_factory=lambda: {
+        "files": 0, "files_skipped": 0, "pages": 0,
+        "chunks_embedded": 0, "chunks_written": 0, "chunks_deleted": 0,
+        "chunks_deduplicated": 0, "dedup_bytes": 0, "boilerplate_lines": 0,
+        "write_retries": 0, "chunks_failed": 0,
+    })
+    ingested_chunks: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    # pipeline stages run on several threads and all report through bump()
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def bump(self, counter: str, n: int) -> None:
+        with self._lock:
+            self.progress[counter] = self.progress.get(counter, 0) + n
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            progress = dict(self.progress)
+        return {
+            "id": self.id,
+            "status": self.status,
+            "paths": self.paths,
+            "files_total": len(self.paths),
+            "progress": progress,
+            "ingested_chunks": self.ingested_chunks,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+class IngestQueue:
+    """Bounded FIFO of ingest jobs drained by `workers` concurrent workers."""
+
+    def __init__(self, workers: int = INGEST_WORKERS, maxsize: int = INGEST_QUEUE_SIZE):
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    def _ensure_workers(self) -> asyncio.Queue:
+        # started lazily on first submit so the router needs no startup hook
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+            self._tasks = [asyncio.create_task(self._worker(i)) for i in range(self.workers)]
+        return self._queue
+
+    def submit(self, paths: List[str]) -> IngestJob:
+        queue = self._ensure_workers()
+        job = IngestJob(paths=list(paths))
+        try:
+            queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(f"Ingest queue is full ({self.maxsize} jobs waiting)")
+        self.jobs[job.id] = job
+        self._trim()
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
+
+    async def _worker(self, idx: int) -> None:
+        while True:
+            job = await self._queue.get()
+            job.status, job.started_at = "running", time.time()
+            try:
+                job.ingested_chunks = await asyncio.to_thread(ingest_paths, job.paths, job.bump)
+                job.status = "done"
+            except Exception as e:
+                logger.exception(f"Ingest job {job.id} failed")
+                job.status, job.error = "failed", f"{type(e).__name__}: {e}"
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+    def _trim(self) -> None:
+        finished = [j for j in self.jobs.values() if j.status in ("done", "failed")]
+        for j in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[j.id]
+
+ingest_queue = IngestQueue()
@@ -0,0 +1,195 @@
+# db/ingest_manifest.py — per-file / per-chunk content hashes for incremental ingest
+# Keeps a JSON manifest of what is already in the doc collection:
+#   {"version": 1, "files": {source_path: {"sha256", "size", "mtime_ns", "chunks": {uuid: text_sha256},
+#                                          "simhash": {uuid: int}, "dups": {uuid: canonical uuid}}}}
+# "chunks" is what is stored in the collection; "dups" are near-duplicates that were not
+# stored because an equivalent chunk (possibly in another file) already was.
+# Chunk UUIDs are deterministic (source_path, page, text hash, occurrence), so re-inserting
+# an unchanged chunk overwrites itself instead of duplicating, and a changed file only
+# needs its new chunks embedded and its stale chunk ids deleted.
+# The upload API, the watcher and manual_ingest all save the same file: save() takes an
+# exclusive lock on <manifest>.lock, re-reads what other processes saved and writes the
+# merge, where only the entries this process changed since it last loaded override theirs.
+import os, json, uuid, hashlib, pathlib, threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+try:
+    import fcntl
+except ImportError:   # not on Windows: saves still merge, just without the lock
+    fcntl = None
+
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST", ".ingest_manifest.json")
+CHUNK_NAMESPACE = uuid.UUID("6f1b8f0e-3c1d-5b7a-9e4f-2a6c0d8b7e31")
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest()
+
+def file_sha256(path: str, block: int = 1024 * 1024) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(block), b""):
+            h.update(buf)
+    return h.hexdigest()
+
+def chunk_uuid(source_path: str, page: Optional[int], text_hash: str, occurrence: int = 0) -> str:
+    return str(uuid.uuid5(CHUNK_NAMESPACE, f"{source_path}|{page or 0}|{text_hash}|{occurrence}"))
+
+def iter_chunk_ids(chunks: Iterable[Dict]) -> Iterator[Dict]:
+    """Add "uuid" and "text_hash" to each chunk ({text, source_path, page?}) as it passes."""
+    seen: Dict[Tuple, int] = {}
+    for c in chunks:
+        h = text_sha256(c["text"])
+        k = (c.get("source_path"), c.get("page"), h)
+        occ = seen.get(k, 0)
+        seen[k] = occ + 1
+        c["text_hash"] = h
+        c["uuid"] = chunk_uuid(c.get("source_path") or "", c.get("page"), h, occ)
+        yield c
+
+class Manifest:
+    def __init__(self, path: str = MANIFEST_PATH):
+        self.path = pathlib.Path(path)
+        self._lock = threading.RLock()
+        self.files: Dict[str, Dict] = {}
+        self._dirty: Set[str] = set()       # paths changed (or forgotten) here since the last load/save
+        self._loaded_mtime: Optional[int] = None
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Re-read the file if another process saved it since we last loaded or saved it."""
+        with self._lock:
+            self._merge_saved()
+
+    def _merge_saved(self, force: bool = False) -> None:
+        # other processes' entries win except for the paths this process changed
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except OSError:
+            return
+        if mtime == self._loaded_mtime and not force:
+            return
+        try:
+            files = json.loads(self.path.read_text(encoding="utf-8")).get("files", {})
+        except (OSError, ValueError):
+            files = {}
+        for path in self._dirty:
+            if path in self.files:
+                files[path] = self.files[path]
+            else:
+                files.pop(path, None)
+        self.files = files
+        self._loaded_mtime = mtime
+
+    def check_file(self, source_path: str) -> Tuple[bool, str]:
+        """(unchanged?, sha256). Size+mtime match skips hashing; a touched-but-identical file is refreshed."""
+        st = os.stat(source_path)
+        with self._lock:
+            entry = self.files.get(source_path)
+        if entry and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns:
+            return True, entry["sha256"]
+        sha = file_sha256(source_path)
+        if entry and entry.get("sha256") == sha:
+            with self._lock:
+                entry["size"], entry["mtime_ns"] = st.st_size, st.st_mtime_ns
+                self._dirty.add(source_path)
+            return True, sha
+        return False, sha
+
+    def known_ids(self, source_path: str) -> set:
+        with self._lock:
+            return set((self.files.get(source_path) or {}).get("chunks", {}))
+
+    def record(self, source_path: str, sha256: str, chunks: List[Dict]) -> None:
+        """chunks: [{uuid, text_hash, simhash?, dup_of?}]; dup_of marks a chunk that was not stored."""
+        try:
+            st = os.stat(source_path)
+            size, mtime_ns = st.st_size, st.st_mtime_ns
+        except OSError:
+            size, mtime_ns = None, None
+        entry = {
+            "sha256": sha256,
+            "size": size,
+            "mtime_ns": mtime_ns,
+            "chunks": {c["uuid"]: c["text_hash"] for c in chunks if not c.get("dup_of")},
+        }
+        simhashes = {c["uuid"]: c["simhash"] for c in chunks if c.get("simhash") is not None and not c.get("dup_of")}
+        dups = {c["uuid"]: c["dup_of"] for c in chunks if c.get("dup_of")}
+        if simhashes:
+            entry["simhash"] = simhashes
+        if dups:
+            entry["dups"] = dups
+        with self._lock:
+            old = set((self.files.get(source_path) or {}).get("chunks", {}))
+            self.files[source_path] = entry
+            self._dirty.add(source_path)
+            self._invalidate_dups_of(old - set(entry["chunks"]), source_path)
+
+    def forget(self, source_path: str) -> None:
+        with self._lock:
+            old = self.files.pop(source_path, None)
+            self._dirty.add(source_path)
+            if old:
+                self._invalidate_dups_of(set(old.get("chunks", {})), source_path)
+
+    def _invalidate_dups_of(self, removed: set, source_path: str) -> None:
+        # files whose chunks were skipped as duplicates of `removed` must be re-ingested
+        if not removed:
+            return
+        for path, entry in self.files.items():
+            if path != source_path and any(c in removed for c in entry.get("dups", {}).values()):
+                entry["sha256"], entry["size"] = None, None
+                self._dirty.add(path)
+
+    def simhashes(self) -> Iterator[Tuple[str, int, str]]:
+        """(source_path, simhash, chunk uuid) of every stored chunk with a known SimHash."""
+        with self._lock:
+            items = [(p, h, u) for p, e in self.files.items() for u, h in e.get("simhash", {}).items()]
+        return iter(items)
+
+    def missing_under(self, root: str, present: Iterable[str]) -> List[str]:
+        """Manifest entries below `root` whose files are no longer on disk."""
+        prefix = str(pathlib.Path(root)).rstrip(os.sep) + os.sep
+        present = set(present)
+        with self._lock:
+            return [p for p in self.files if p.startswith(prefix) and p not in present and not os.path.exists(p)]
+
+    def save(self) -> None:
+        """Merge with what other processes saved meanwhile and write the result atomically."""
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with self._file_lock():
+                # always re-read: two saves within one timestamp tick leave the mtime unchanged
+                self._merge_saved(force=True)
+                tmp = self.path.with_name(self.path.name + f".{os.getpid()}.tmp")
+                tmp.write_text(json.dumps({"version": 1, "files": self.files}), encoding="utf-8")
+                os.replace(tmp, self.path)
+                self._loaded_mtime = self.path.stat().st_mtime_ns
+                self._dirty.clear()
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(self.path.with_name(self.path.name + ".lock"), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def chunk_ids(self, source_path: str) -> List[str]:
+        with self._lock:
+            return list((self.files.get(source_path) or {}).get("chunks", {}))
+
+_manifests: Dict[str, Manifest] = {}
+_manifests_lock = threading.Lock()
+
+def load_manifest(path: str = MANIFEST_PATH) -> Manifest:
+    """Process-wide Manifest per path, so concurrent ingest workers share one view."""
+    key = str(pathlib.Path(path).resolve())
+    with _manifests_lock:
+        if key not in _manifests:
+            _manifests[key] = Manifest(path)
+        return _manifests[key]
@@ -0,0 +1,68 @@
+# db/ingest_pipeline.py — run generator stages concurrently, connected by bounded queues
+# staged(source, [stage1, stage2]) runs the source and every stage in its own thread and
+# returns an iterator over the last stage's output. Each stage is a function
+# Iterator -> Iterator. Bounded queues give back-pressure, so memory stays proportional
+# to the queue sizes rather than to how much input there is.
+import queue, threading
+from typing import Callable, Iterable, Iterator, Sequence
+
+Stage = Callable[[Iterator], Iterator]
+
+_END = object()
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+def _drain(q: queue.Queue, stop: threading.Event) -> Iterator:
+    while True:
+        try:
+            item = q.get(timeout=0.1)
+        except queue.Empty:
+            if stop.is_set():
+                return
+            continue
+        if item is _END:
+            return
+        if isinstance(item, _Failure):
+            raise item.exc
+        yield item
+
+def _pump(produce: Callable[[], Iterable], out: queue.Queue, stop: threading.Event) -> None:
+    try:
+        for item in produce():
+            if not _put(out, item, stop):
+                return
+    except BaseException as e:
+        # hand the error downstream; the consumer re-raises it
+        _put(out, _Failure(e), stop)
+        return
+    _put(out, _END, stop)
+
+def staged(source: Iterable, stages: Sequence[Stage], maxsize: int = 256) -> Iterator:
+    """Iterate the output of source -> stages[0] -> ... with every step in its own thread."""
+    stop = threading.Event()
+    q: queue.Queue = queue.Queue(maxsize)
+    threads = [threading.Thread(target=_pump, args=(lambda: source, q, stop), daemon=True)]
+    for stage in stages:
+        nq: queue.Queue = queue.Queue(maxsize)
+        produce = lambda s=stage, inq=q: s(_drain(inq, stop))
+        threads.append(threading.Thread(target=_pump, args=(produce, nq, stop), daemon=True))
+        q = nq
+    for t in threads:
+        t.start()
+    try:
+        yield from _drain(q, stop)
+    finally:
+        stop.set()
+        for t in threads:
+            t.join(timeout=5)
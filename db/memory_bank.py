@@ -5,6 +5,15 @@ from dotenv import load_dotenv
 from openai import OpenAI
 import weaviate
 
+try:
+    from db.embed_cache import get_embed_cache
+    from db.embed_client import get_embed_client, EMBED_MODEL, EMBED_DIMENSIONS
+    from db.vectors import to_client
+except Exception:
+    from embed_cache import get_embed_cache
+    from embed_client import get_embed_client, EMBED_MODEL, EMBED_DIMENSIONS
+    from vectors import to_client
+
 load_dotenv()
 OAI = OpenAI()
 
@@ -27,8 +36,7 @@ def _connect():
 
 def _ensure_bank_collection(client: weaviate.WeaviateClient):
     from weaviate.classes.config import Property, DataType, Configure
-    names = [c.name for c in client.collections.list_all()]
-    if BANK_COLLECTION in names:
+    if client.collections.exists(BANK_COLLECTION):
         return client.collections.get(BANK_COLLECTION)
     return client.collections.create(
         name=BANK_COLLECTION,
@@ -42,12 +50,11 @@ def _ensure_bank_collection(client: weaviate.WeaviateClient):
         ],
     )
 
-def _embed(texts: List[str]) -> List[List[float]]:
-    res = OAI.embeddings.create(model="text-embedding-3-large", input=texts)
-    return [d.embedding for d in res.data]
+def _embed(texts: List[str]):   # (len(texts), dims) NumPy array
+    return get_embed_cache().get_or_embed(texts, get_embed_client().embed, EMBED_MODEL, EMBED_DIMENSIONS)
 
 def _search_semantic(query: str, top_k_each: int = 12) -> List[Dict]:
-    qv = _embed([query])[0]
+    qv = to_client(_embed([query])[0])
     out: List[Dict] = []
     with _connect() as client:
         # docs
@@ -111,7 +118,7 @@ def update_memory(category: str, top_k: int = 24) -> Dict:
     # write summary back into BANK collection
     from datetime import datetime, timezone
     now_iso = datetime.now(timezone.utc).isoformat()
-    vec = _embed([summary])[0]
+    vec = to_client(_embed([summary])[0])
     with _connect() as client:
         banks = _ensure_bank_collection(client)
         banks.data.insert(
@@ -0,0 +1,81 @@
+# db/path_filters.py — indexed path filtering for chunk search
+# A Like "*docs/api*" filter has a leading wildcard, so Weaviate cannot use the inverted index
+# for it and checks every stored path on each query. Instead, each chunk stores its path
+# components as filterable properties at ingest time (path_properties), and filter_paths turn
+# into Equal / ContainsAny filters on them (path_where), which are plain index lookups:
+#   path_parts  every run of consecutive components of the normalized path, so a folder
+#               ("docs", "docs/api", "api"), a file name ("auth.md") and the whole path match
+#   extension   "md", "pdf", ... matched by a ".md" or "*.md" filter
+# In-process indexes store the same values as path_keys() terms and look up filter_keys().
+# Paths are normalized the same way on both sides: lowercase, "/" separators, no empty or
+# "." components. A filter only matches whole components ("api" no longer matches "rapid").
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+PATH_PROPERTIES = ("path_parts", "extension")
+MAX_PATH_DEPTH = 16   # deeper paths only index runs that start or end at either end
+
+_EXT = re.compile(r"^\*?\.([0-9a-z_+-]+)$")
+
+def path_components(path: str) -> List[str]:
+    p = (path or "").strip().lower().replace("\\", "/")
+    return [c for c in p.split("/") if c and c != "."]
+
+def normalize_path(path: str) -> str:
+    return "/".join(path_components(path))
+
+def path_parts(path: str) -> List[str]:
+    comps = path_components(path)
+    n = len(comps)
+    if n > MAX_PATH_DEPTH:
+        runs = {(0, j) for j in range(1, n + 1)} | {(i, n) for i in range(n)}
+    else:
+        runs = {(i, j) for i in range(n) for j in range(i + 1, n + 1)}
+    return sorted({"/".join(comps[i:j]) for i, j in runs})
+
+def path_extension(path: str) -> str:
+    comps = path_components(path)
+    name = comps[-1] if comps else ""
+    stem, dot, ext = name.rpartition(".")
+    return ext if dot and stem else ""
+
+def path_properties(path: str) -> Dict[str, Any]:
+    """Filterable properties to store next to a chunk's path."""
+    return {"path_parts": path_parts(path), "extension": path_extension(path)}
+
+def split_filters(filter_paths: Iterable[str]) -> Tuple[List[str], List[str]]:
+    """(normalized path_parts values, extensions) a list of filter_paths asks for."""
+    parts, exts = set(), set()
+    for f in filter_paths or []:
+        m = _EXT.match((f or "").strip().lower())
+        if m:
+            exts.add(m.group(1))
+        elif normalize_path(f):
+            parts.add(normalize_path(f))
+    return sorted(parts), sorted(exts)
+
+def path_keys(path: str) -> List[str]:
+    """path_properties() as inverted index terms: "part:<run>" per path_parts value and "ext:<extension>"."""
+    ext = path_extension(path)
+    return [f"part:{p}" for p in path_parts(path)] + ([f"ext:{ext}"] if ext else [])
+
+def filter_keys(filter_paths: Iterable[str]) -> Optional[List[str]]:
+    """path_keys() terms a chunk matching filter_paths has at least one of (None = no filter)."""
+    parts, exts = split_filters(filter_paths)
+    if not parts and not exts:
+        return None
+    return [f"part:{p}" for p in parts] + [f"ext:{e}" for e in exts]
+
+def path_where(filter_paths: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """v3 `where` filter matching chunks under any of the given files / folders / extensions."""
+    parts, exts = split_filters(filter_paths)
+    operands = []
+    if parts:
+        operands.append({"path": ["path_parts"], "operator": "Equal", "valueText": parts[0]} if len(parts) == 1
+                        else {"path": ["path_parts"], "operator": "ContainsAny", "valueText": parts})
+    if exts:
+        operands.append({"path": ["extension"], "operator": "Equal", "valueText": exts[0]} if len(exts) == 1
+                        else {"path": ["extension"], "operator": "ContainsAny", "valueText": exts})
+    if not operands:
+        return None
+    return operands[0] if len(operands) == 1 else {"operator": "Or", "operands": operands}
@@ -0,0 +1,84 @@
+# db/pdf_extract.py — PDF text extraction spread across a process pool
+# pypdf's extract_text is pure-Python and CPU bound, so one core does all the work in a
+# plain loop. Here each file is split into page ranges, the ranges run in worker processes,
+# and results are handed back strictly in (file, page) order as they complete, with a
+# bounded number of ranges in flight. PDF_WORKERS=1 keeps everything in-process.
+import os, multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from pypdf import PdfReader
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "16"))
+
+def page_count(path: str) -> int:
+    return len(PdfReader(path).pages)
+
+def extract_range(path: str, start: int, end: int) -> List[Dict]:
+    """[{text, page}] for non-empty pages start..end-1 (page numbers are 1-based)."""
+    reader = PdfReader(path)
+    out = []
+    for idx in range(start, min(end, len(reader.pages))):
+        txt = reader.pages[idx].extract_text() or ""
+        if txt.strip():
+            out.append({"text": txt, "page": idx + 1})
+    return out
+
+def _tasks(paths: Iterable[str], pages_per_task: int) -> Iterator[Tuple[str, int, int, bool]]:
+    for path in paths:
+        n = page_count(path)
+        if n == 0:
+            yield path, 0, 0, True
+        for start in range(0, n, pages_per_task):
+            end = min(n, start + pages_per_task)
+            yield path, start, end, end >= n
+
+def iter_pdf_files(
+    paths: Iterable[str], workers: int = PDF_WORKERS, pages_per_task: int = PDF_PAGES_PER_TASK
+) -> Iterator[Tuple[str, Iterator[Dict]]]:
+    """
+    Yield (path, pages) per file, in input order; `pages` streams that file's non-empty
+    pages in order. Consume each file's pages before moving on to the next file.
+    """
+    if workers <= 1:
+        for path in paths:
+            yield path, iter(extract_range(path, 0, page_count(path)))
+        return
+
+    ctx = multiprocessing.get_context("spawn")   # safe from threaded callers
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        tasks = _tasks(paths, pages_per_task)
+        window: deque = deque()
+        max_pending = workers * 2
+
+        def fill():
+            while len(window) < max_pending:
+                t = next(tasks, None)
+                if t is None:
+                    return
+                path, start, end, last = t
+                window.append((path, pool.submit(extract_range, path, start, end), last))
+
+        def file_pages() -> Iterator[Dict]:
+            while True:
+                _, fut, last = window.popleft()
+                fill()
+                yield from fut.result()
+                if last:
+                    return
+
+        fill()
+        while window:
+            pages = file_pages()
+            yield window[0][0], pages
+            for _ in pages:   # drain whatever the caller didn't read
+                pass
+
+def iter_pdf_pages(path: str, workers: int = PDF_WORKERS, pages_per_task: int = PDF_PAGES_PER_TASK) -> Iterator[Dict]:
+    """Pages of one PDF; large files are split across the pool."""
+    if workers > 1 and page_count(path) <= pages_per_task:
+        workers = 1   # not worth a pool
+    for _, pages in iter_pdf_files([path], workers, pages_per_task):
+        yield from pages
@@ -0,0 +1,171 @@
+# db/query_cache.py — two-tier cache for search results, invalidated when the index changes
+# Tier 1 is an exact-match LRU keyed on the normalized query text plus the search filters.
+# Tier 2 is semantic: a query whose embedding has cosine >= RAG_QUERY_CACHE_SIMILARITY to a
+# cached query's embedding (same filters) reuses that query's results. Both tiers are
+# dropped whenever the index generation changes. The generation is the mtime of a small
+# marker file that every writer bumps after changing chunks, so writes from other processes
+# invalidate too. There is one marker per index under INDEX_GENERATION_DIR: the doc ingest
+# (upload jobs, the watcher, manual_ingest) bumps "JarvisDocs", which weaviate_utils.search
+# reads; rag-service bumps and reads "RagChunk". A relative INDEX_GENERATION_DIR is taken
+# from the repo root, so processes started in different directories share the markers.
+import os, re, copy, json, pathlib, threading, time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Optional, Tuple
+
+import numpy as np
+
+RAG_QUERY_CACHE_ITEMS = int(os.getenv("RAG_QUERY_CACHE_ITEMS", "1024"))
+RAG_QUERY_CACHE_SIMILARITY = float(os.getenv("RAG_QUERY_CACHE_SIMILARITY", "0.95"))   # > 1 disables tier 2
+INDEX_GENERATION_DIR = str(pathlib.Path(__file__).resolve().parent.parent
+                           / os.getenv("INDEX_GENERATION_DIR", ".index_generations"))
+
+def generation_marker(index: str) -> str:
+    return os.path.join(INDEX_GENERATION_DIR, index)
+
+def bump_index_generation(index: str) -> None:
+    """Mark `index` (a collection / class name) as changed; the marker's mtime only ever moves forward."""
+    p = pathlib.Path(generation_marker(index))
+    try:
+        old = p.stat().st_mtime_ns
+    except FileNotFoundError:
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.touch()
+        old = 0
+    new = max(time.time_ns(), old + 1)
+    os.utime(p, ns=(new, new))
+
+def index_generation(index: str) -> int:
+    try:
+        return os.stat(generation_marker(index)).st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+def normalize_query(query: str) -> str:
+    """Case, surrounding whitespace / trailing punctuation and runs of spaces don't change results."""
+    return re.sub(r"\s+", " ", (query or "").strip().lower()).rstrip("?!.,; ")
+
+class QueryCache:
+    """
+    get_exact() before doing anything, get_similar() once the query is embedded, put() after
+    searching, passing the generation() read before the search so results that raced an
+    ingest are not stored. `terms` (optional) must also match for a semantic hit; callers pass the keyword
+    tokens when results depend on exact terms (BM25 / hybrid), so "ERR4821" never gets the
+    answer cached for "ERR4822". Results are copied in and out.
+    """
+
+    def __init__(self, generation: Callable[[], Any], max_items: int = RAG_QUERY_CACHE_ITEMS,
+                 similarity: float = RAG_QUERY_CACHE_SIMILARITY):
+        self.max_items = max(1, max_items)
+        self.similarity = similarity
+        self.generation = generation
+        self._entries: "OrderedDict[Tuple[str, str], Dict]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None   # slot -> unit query vector
+        self._slot_keys: list = [None] * self.max_items   # slot -> entry key
+        self._free = list(range(self.max_items - 1, -1, -1))
+        self._generation = None
+        self._lock = threading.Lock()
+        self.counts: Dict[str, int] = {"lookups": 0, "exact_hits": 0, "semantic_hits": 0, "invalidations": 0}
+
+    @staticmethod
+    def filter_key(filters: Optional[Dict[str, Any]]) -> str:
+        return json.dumps(filters or {}, sort_keys=True, default=str)
+
+    def get_exact(self, query: str, filters: Optional[Dict[str, Any]] = None) -> Optional[Any]:
+        key = (normalize_query(query), self.filter_key(filters))
+        with self._lock:
+            self._check_generation()
+            self.counts["lookups"] += 1
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.counts["exact_hits"] += 1
+            return copy.deepcopy(entry["results"])
+
+    def get_similar(self, vector, filters: Optional[Dict[str, Any]] = None,
+                    terms: Optional[FrozenSet[str]] = None) -> Optional[Any]:
+        fkey = self.filter_key(filters)
+        q = self._unit(vector)
+        with self._lock:
+            self._check_generation()
+            if self._vectors is None or q is None or q.shape[0] != self._vectors.shape[1] or self.similarity > 1:
+                return None
+            sims = self._vectors @ q
+            for slot in np.flatnonzero(sims >= self.similarity)[np.argsort(-sims[sims >= self.similarity])]:
+                key = self._slot_keys[slot]
+                entry = self._entries.get(key) if key is not None else None
+                if entry is not None and key[1] == fkey and entry["terms"] == terms:
+                    self._entries.move_to_end(key)
+                    self.counts["semantic_hits"] += 1
+                    return copy.deepcopy(entry["results"])
+            return None
+
+    def put(self, query: str, filters: Optional[Dict[str, Any]], results: Any, vector=None,
+            terms: Optional[FrozenSet[str]] = None, generation: Any = None) -> None:
+        key = (normalize_query(query), self.filter_key(filters))
+        q = self._unit(vector)
+        with self._lock:
+            self._check_generation()
+            if generation is not None and generation != self._generation:
+                return
+            self._drop(key)
+            while len(self._entries) >= self.max_items:
+                self._drop(next(iter(self._entries)))
+            slot = None
+            if q is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_items, q.shape[0]), dtype=np.float32)
+                if q.shape[0] == self._vectors.shape[1]:
+                    slot = self._free.pop()
+                    self._vectors[slot] = q
+                    self._slot_keys[slot] = key
+            self._entries[key] = {"results": copy.deepcopy(results), "slot": slot, "terms": terms}
+
+    def clear(self) -> None:
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            c = dict(self.counts)
+            c["items"] = len(self._entries)
+        c["misses"] = c["lookups"] - c["exact_hits"] - c["semantic_hits"]
+        return c
+
+    def _drop(self, key) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None and entry["slot"] is not None:
+            self._vectors[entry["slot"]] = 0.0
+            self._slot_keys[entry["slot"]] = None
+            self._free.append(entry["slot"])
+
+    def _check_generation(self) -> None:
+        g = self.generation()
+        if g != self._generation:
+            if self._entries:
+                self.counts["invalidations"] += 1
+            for key in list(self._entries):
+                self._drop(key)
+            self._generation = g
+
+    @staticmethod
+    def _unit(vector) -> Optional[np.ndarray]:
+        if vector is None:
+            return None
+        v = np.asarray(vector, dtype=np.float32).ravel()
+        n = float(np.linalg.norm(v))
+        return v / n if n > 0 else None
+
+_caches: Dict[str, QueryCache] = {}
+_caches_lock = threading.Lock()
+
+def get_query_cache(name: str, index: str) -> QueryCache:
+    """Process-wide cache per call site (each has its own filter space), invalidated with `index`."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = QueryCache(generation=lambda: index_generation(index))
+        return _caches[name]
@@ -1,11 +1,12 @@
 # db/upload_api.py — file upload + ingest (lives in db/)
 import os
 import pathlib
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi import APIRouter, UploadFile, File, Header, HTTPException
 
-from .weaviate_utils import ingest_paths  # same package, clean import
+from .ingest_jobs import ingest_queue, QueueFull  # same package, clean import
+from .upload_store import store_stream, iter_upload_file, UploadTooLarge
 
 router = APIRouter(prefix="/upload", tags=["upload"])
 
@@ -15,22 +16,52 @@ pathlib.Path(UPLOADS_DIR).mkdir(parents=True, exist_ok=True)
 ALLOWED_EXTS = {".pdf", ".md"}
 
 @router.post("/files")
-async def upload_files(files: List[UploadFile] = File(...)):
+async def upload_files(
+    files: List[UploadFile] = File(...),
+    x_content_sha256: Optional[str] = Header(None),
+):
     """
-    Upload one or more .pdf/.md files, save to disk, then ingest into Weaviate.
-    Returns saved paths and count of ingested chunks.
+    Upload one or more .pdf/.md files, stream them to content-addressed storage,
+    then queue the ones we haven't seen before for background ingest into Weaviate.
+    Returns saved paths, per-file upload info and the ingest job id (poll /upload/jobs/{id}).
+    X-Content-SHA256 (single-file uploads) lets a known file short-circuit entirely.
     """
     if not files:
         raise HTTPException(status_code=400, detail="No files provided.")
 
-    saved: List[str] = []
     for f in files:
-        ext = pathlib.Path(f.filename).suffix.lower()
+        ext = pathlib.Path(f.filename or "").suffix.lower()
         if ext not in ALLOWED_EXTS:
             raise HTTPException(status_code=400, detail=f"Unsupported file type: {ext}")
-        out_path = pathlib.Path(UPLOADS_DIR) / f.filename
-        out_path.write_bytes(await f.read())
-        saved.append(str(out_path))
 
-    ingested = ingest_paths(saved)
-    return {"saved": saved, "ingested_chunks": ingested}
+    expected = x_content_sha256 if len(files) == 1 else None
+    uploads = []
+    for f in files:
+        try:
+            uploads.append(await store_stream(iter_upload_file(f), f.filename, UPLOADS_DIR, expected_sha256=expected))
+        except UploadTooLarge as e:
+            raise HTTPException(status_code=413, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    fresh = [u["path"] for u in uploads if not u["duplicate"]]
+    job_id = None
+    if fresh:
+        try:
+            job_id = ingest_queue.submit(fresh).id
+        except QueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+    return {
+        "saved": [u["path"] for u in uploads],
+        "uploads": uploads,
+        "job_id": job_id,
+        "status_url": f"/upload/jobs/{job_id}" if job_id else None,
+    }
+
+@router.get("/jobs/{job_id}")
+def ingest_job_status(job_id: str):
+    """Progress (files, pages, chunks embedded/written) and errors for one ingest job."""
+    job = ingest_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job: {job_id}")
+    return job.to_dict()
@@ -0,0 +1,113 @@
+# db/upload_store.py — streaming, content-addressed storage for uploads
+# Files land at <root>/<sha256>/<original filename>, so identical content is
+# stored once no matter what it was called, and the human filename survives
+# into source_path for search results.
+import os, re, errno, shutil, hashlib, pathlib, tempfile, asyncio
+from typing import AsyncIterator, Dict, Optional, Union
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+CHUNK_SIZE = 1024 * 1024
+
+class UploadTooLarge(ValueError):
+    pass
+
+def safe_filename(name: Optional[str]) -> str:
+    """Strip any client-supplied directories so uploads can't escape the root."""
+    base = pathlib.PurePosixPath((name or "").replace("\\", "/")).name
+    return base if base not in ("", ".", "..") else "upload"
+
+def find_blob(root: Union[str, pathlib.Path], sha256: str) -> Optional[pathlib.Path]:
+    """Return the stored file for this content hash, if we already have it."""
+    if not re.fullmatch(r"[0-9a-fA-F]{64}", sha256 or ""):
+        return None
+    d = pathlib.Path(root) / sha256.lower()
+    if not d.is_dir():
+        return None
+    for p in d.iterdir():
+        if p.is_file():
+            return p
+    return None
+
+def _result(path: pathlib.Path, filename: str, sha256: str, size: int, duplicate: bool) -> Dict:
+    return {"filename": filename, "path": str(path), "sha256": sha256, "size": size, "duplicate": duplicate}
+
+async def iter_upload_file(f, chunk_size: int = CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """Yield a FastAPI UploadFile in chunks instead of reading it whole."""
+    while True:
+        chunk = await f.read(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+async def store_stream(
+    chunks: AsyncIterator[bytes],
+    filename: Optional[str],
+    root: Union[str, pathlib.Path],
+    max_bytes: int = MAX_UPLOAD_BYTES,
+    expected_sha256: Optional[str] = None,
+) -> Dict:
+    """
+    Write chunks to disk as they arrive, hashing along the way, then move the
+    file to its content address. Raises UploadTooLarge past max_bytes.
+
+    The body is only skipped when the client sends the hash (expected_sha256)
+    and we already have that blob; otherwise a duplicate is still streamed to
+    a temp file and discarded once its hash is known. Placement is atomic, so
+    of several concurrent uploads of the same content exactly one stores it
+    and the rest come back as duplicates.
+    Returns {filename, path, sha256, size, duplicate}.
+    """
+    root = pathlib.Path(root)
+    name = safe_filename(filename)
+    if expected_sha256:
+        existing = find_blob(root, expected_sha256)
+        if existing is not None:
+            return _result(existing, name, expected_sha256.lower(), existing.stat().st_size, True)
+
+    root.mkdir(parents=True, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp = tempfile.mkstemp(dir=root, prefix=".upload-", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"{name} exceeds the {max_bytes} byte upload limit")
+                h.update(chunk)
+                await asyncio.to_thread(out.write, chunk)
+        sha = h.hexdigest()
+        if expected_sha256 and expected_sha256.lower() != sha:
+            raise ValueError(f"{name}: content hash {sha} does not match expected {expected_sha256}")
+
+        existing = find_blob(root, sha)
+        if existing is not None:
+            os.unlink(tmp)
+            return _result(existing, name, sha, size, True)
+        return _place(root, tmp, name, sha, size)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+def _place(root: pathlib.Path, tmp: str, name: str, sha: str, size: int) -> Dict:
+    """
+    Move tmp to <root>/<sha>/<name>. The blob directory is assembled under a temporary
+    name and renamed onto <sha> in one step; a rename that finds <sha> already filled
+    means a concurrent upload of the same content won, and this one is a duplicate.
+    """
+    staging = pathlib.Path(tempfile.mkdtemp(dir=root, prefix=".upload-", suffix=".d"))
+    try:
+        os.replace(tmp, staging / name)
+        try:
+            os.rename(staging, root / sha)
+        except OSError as e:
+            if e.errno not in (errno.EEXIST, errno.ENOTEMPTY):
+                raise
+            existing = find_blob(root, sha)
+            if existing is None:
+                raise
+            return _result(existing, name, sha, size, True)
+        return _result(root / sha / name, name, sha, size, False)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
@@ -0,0 +1,198 @@
+# db/upload_watcher.py — keep the doc index in sync with files dropped into UPLOADS_DIR
+# Run as a daemon:  python -m db.upload_watcher [dir]
+# Filesystem events come from watchdog (inotify on Linux) when it is installed, otherwise
+# from polling the tree every WATCH_POLL_SECS. Events are debounced per path (a file is
+# handed over only after WATCH_DEBOUNCE_SECS without further changes, so half-copied files
+# are not ingested) and bursts are coalesced into batches for the incremental ingest in
+# weaviate_utils.ingest_paths, which skips anything the manifest says is unchanged and
+# drops chunks of deleted files. Files go in at most WATCH_FILES_PER_MIN and chunks at
+# most WATCH_CHUNKS_PER_MIN, and the process runs at lower CPU priority (WATCH_NICE), so a
+# large copy does not starve the live services.
+import os, re, sys, time, logging, pathlib, threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .embed_client import TokenBucket
+from .ingest_manifest import load_manifest
+from .weaviate_utils import ingest_paths
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:   # optional: fall back to polling
+    Observer = None
+    FileSystemEventHandler = object
+
+logger = logging.getLogger(__name__)
+
+UPLOADS_DIR = os.getenv("UPLOADS_DIR", "uploads")
+WATCH_DEBOUNCE_SECS = float(os.getenv("WATCH_DEBOUNCE_SECS", "3"))
+WATCH_POLL_SECS = float(os.getenv("WATCH_POLL_SECS", "5"))
+WATCH_BATCH_FILES = int(os.getenv("WATCH_BATCH_FILES", "50"))
+WATCH_FILES_PER_MIN = int(os.getenv("WATCH_FILES_PER_MIN", "120"))
+WATCH_CHUNKS_PER_MIN = int(os.getenv("WATCH_CHUNKS_PER_MIN", "3000"))
+WATCH_RETRY_SECS = float(os.getenv("WATCH_RETRY_SECS", "60"))
+WATCH_NICE = int(os.getenv("WATCH_NICE", "10"))
+WATCH_FORCE_POLLING = os.getenv("WATCH_FORCE_POLLING", "0") == "1"
+
+EXTS = (".md", ".pdf")
+_SHA_DIR = re.compile(r"^[0-9a-f]{64}$")
+
+def wanted(path: str) -> bool:
+    """.md/.pdf outside hidden/temp names and outside the upload API's content-addressed dirs."""
+    p = pathlib.Path(path)
+    if p.suffix.lower() not in EXTS or p.name.startswith("."):
+        return False
+    # <root>/<sha256>/<name> is written by upload_store and ingested by the upload API's job queue
+    return not _SHA_DIR.match(p.parent.name)
+
+def scan(root: str) -> Dict[str, Tuple[int, int]]:
+    """{path: (size, mtime_ns)} of every wanted file under root."""
+    out: Dict[str, Tuple[int, int]] = {}
+    stack = [root]
+    while stack:
+        try:
+            entries = list(os.scandir(stack.pop()))
+        except OSError:
+            continue
+        for e in entries:
+            try:
+                if e.is_dir(follow_symlinks=False):
+                    stack.append(e.path)
+                elif wanted(e.path):
+                    st = e.stat()
+                    out[e.path] = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                continue
+    return out
+
+class _Events(FileSystemEventHandler):
+    def __init__(self, watcher: "UploadWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event) -> None:
+        paths = [getattr(event, "src_path", None), getattr(event, "dest_path", None)]
+        for path in filter(None, paths):
+            if event.is_directory:
+                # a directory moved in arrives as one event; its files don't get their own
+                if os.path.isdir(path):
+                    self.watcher.touch(scan(path))
+            else:
+                self.watcher.touch([path])
+
+class UploadWatcher:
+    def __init__(self, root: str = UPLOADS_DIR, debounce: float = WATCH_DEBOUNCE_SECS,
+                 poll: float = WATCH_POLL_SECS, batch_files: int = WATCH_BATCH_FILES,
+                 files_per_min: int = WATCH_FILES_PER_MIN, chunks_per_min: int = WATCH_CHUNKS_PER_MIN,
+                 force_polling: bool = WATCH_FORCE_POLLING):
+        self.root = str(pathlib.Path(root))
+        self.debounce = debounce
+        self.poll = poll
+        self.batch_files = max(1, batch_files)
+        self.files = TokenBucket(files_per_min)
+        self.chunks = TokenBucket(chunks_per_min)
+        self.polling = force_polling or Observer is None
+        if self.polling:   # a file still being copied must show up changed in at least one more poll
+            self.debounce = max(debounce, poll * 1.5)
+        self.pending: Dict[str, float] = {}   # path -> time of its last event
+        self.stats: Dict[str, int] = {"events": 0, "batches": 0, "files": 0, "chunks_written": 0, "errors": 0}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def touch(self, paths: Iterable[str], at: Optional[float] = None) -> None:
+        now = time.monotonic() if at is None else at
+        with self._lock:
+            for p in paths:
+                if wanted(p):
+                    self.pending[p] = now
+                    self.stats["events"] += 1
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        pathlib.Path(self.root).mkdir(parents=True, exist_ok=True)
+        observer = None
+        if not self.polling:
+            observer = Observer()
+            observer.schedule(_Events(self), self.root, recursive=True)
+            observer.start()
+        logger.info(f"Watching {self.root} ({'polling' if self.polling else 'inotify'}), "
+                    f"debounce {self.debounce}s")
+        # catch up on whatever changed while we weren't running (unchanged files are skipped cheaply)
+        self._snapshot = scan(self.root)
+        self.touch(list(self._snapshot) + self._deleted_since_last_run(), at=0.0)
+        next_poll = time.monotonic() + self.poll
+        try:
+            while not self._stop.is_set():
+                if self.polling and time.monotonic() >= next_poll:
+                    self._poll_once()
+                    next_poll = time.monotonic() + self.poll
+                ready = self._take_ready()
+                if ready:
+                    self._ingest(ready)
+                else:
+                    self._stop.wait(min(1.0, self.debounce / 2))
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def _deleted_since_last_run(self) -> List[str]:
+        return load_manifest().missing_under(self.root, self._snapshot)
+
+    def _poll_once(self) -> None:
+        current = scan(self.root)
+        changed = [p for p, sig in current.items() if self._snapshot.get(p) != sig]
+        changed += [p for p in self._snapshot if p not in current]
+        self._snapshot = current
+        if changed:
+            self.touch(changed)
+
+    def _take_ready(self) -> List[str]:
+        """Up to batch_files paths that have been quiet for `debounce` seconds."""
+        cutoff = time.monotonic() - self.debounce
+        with self._lock:
+            ready = [p for p, t in self.pending.items() if t <= cutoff][: self.batch_files]
+            for p in ready:
+                del self.pending[p]
+        return ready
+
+    def _progress(self, counter: str, n: int) -> None:
+        if counter == "chunks_embedded" and n:
+            self.chunks.acquire(n)   # blocks the embed stage; back-pressure does the rest
+        elif counter == "chunks_written":
+            with self._lock:
+                self.stats["chunks_written"] += n
+
+    def _ingest(self, paths: List[str]) -> None:
+        self.files.acquire(len(paths))
+        t0 = time.monotonic()
+        before = self.stats["chunks_written"]
+        try:
+            load_manifest().refresh()   # pick up ingests done by other processes
+            ingest_paths(paths, self._progress)
+        except Exception:
+            self.stats["errors"] += 1
+            logger.exception(f"Ingest of {len(paths)} files failed; retrying in {WATCH_RETRY_SECS:.0f}s")
+            self.touch(paths, at=time.monotonic() + WATCH_RETRY_SECS - self.debounce)
+            return
+        self.stats["batches"] += 1
+        self.stats["files"] += len(paths)
+        written = self.stats["chunks_written"] - before
+        elapsed = max(time.monotonic() - t0, 1e-9)
+        logger.info(f"Indexed batch of {len(paths)} files: {written} chunks in {elapsed:.1f}s "
+                    f"({written / elapsed:.1f} chunks/s), {len(self.pending)} pending")
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if WATCH_NICE and hasattr(os, "nice"):
+        os.nice(WATCH_NICE)
+    watcher = UploadWatcher(sys.argv[1] if len(sys.argv) > 1 else UPLOADS_DIR)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,636 @@
+# db/vector_index.py — embedded vector index: no Weaviate round trip, works offline
+# VectorIndex keeps unit-normalized vectors in a memory-mapped float16 matrix
+# (RAG_VECTOR_INDEX_PATH/vectors.f16, one row per slot, grown by doubling) and the documents in
+# an append-only JSONL log (docs.jsonl, replayed on load, like db.hybrid.BM25Index). Search is
+# cosine similarity:
+#   - up to RAG_VECTOR_EXACT_MAX live vectors: exact, one matrix-vector product over a float32
+#     copy of the matrix held in memory (NumPy has no fast float16 product); microseconds for a
+#     few thousand chunks
+#   - above it: an HNSW graph (hierarchical navigable small world; Malkov & Yashunin) whose
+#     distance computations read rows straight from the float16 memory map. It is built once
+#     when the index crosses the threshold, then updated on every add, and saved as graph.npz
+# Adds and deletes are incremental. A deleted slot stays in the graph as a tombstone that
+# routes searches but is never returned; save() compacts once tombstones outnumber live rows,
+# into a matrix and graph under new file names. The log's first line names the files it goes
+# with, so replacing the log switches all three at once and a failed compaction leaves the
+# previous index on disk untouched.
+# Filters: `any_of` looks keys up in an inverted index over keys(doc) (db.path_filters.path_keys
+# for the RAG service's filter_paths); a filter that leaves at most RAG_VECTOR_SCAN_MAX
+# documents is scored exactly, a wider one widens the graph search until k pass. `where` is
+# any predicate on the stored document, checked on candidates in score order.
+import os, json, math, heapq, pathlib, threading, uuid
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+from .path_filters import path_keys
+
+RAG_VECTOR_INDEX_PATH = os.getenv("RAG_VECTOR_INDEX_PATH", ".rag_vectors")   # a directory
+RAG_VECTOR_EXACT_MAX = int(os.getenv("RAG_VECTOR_EXACT_MAX", "20000"))   # live vectors searched exactly
+RAG_HNSW_M = int(os.getenv("RAG_HNSW_M", "16"))                          # links per node (2x on level 0)
+RAG_HNSW_EF_CONSTRUCTION = int(os.getenv("RAG_HNSW_EF_CONSTRUCTION", "64"))
+RAG_HNSW_EF_SEARCH = int(os.getenv("RAG_HNSW_EF_SEARCH", "64"))
+# a filter leaving at most this many documents is scored exactly instead of through the graph
+RAG_VECTOR_SCAN_MAX = int(os.getenv("RAG_VECTOR_SCAN_MAX", "4096"))
+
+# (id, cosine similarity), best first
+Hits = List[Tuple[str, float]]
+
+def _unit(vector) -> np.ndarray:
+    v = np.asarray(vector, dtype=np.float32).ravel()
+    n = float(np.linalg.norm(v))
+    return v / n if n > 0 else v
+
+class _ReadWriteLock:
+    """Any number of readers or one writer. A waiting writer holds off new readers. Not re-entrant."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writing = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writing or self._writers_waiting:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writing or self._readers:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+
+class HNSW:
+    """
+    HNSW graph over integer slots. `rows(slots)` returns their unit vectors as float32, so the
+    vectors live wherever the caller keeps them. Level 0 links are a (capacity, 2m) int32 array
+    with the similarity of every link beside it; the few nodes on upper levels use dicts.
+    """
+
+    def __init__(self, rows: Callable[[np.ndarray], np.ndarray], m: int = RAG_HNSW_M,
+                 ef_construction: int = RAG_HNSW_EF_CONSTRUCTION, seed: int = 0):
+        self.rows = rows
+        self.m, self.m0 = m, 2 * m
+        self.ef_construction = ef_construction
+        self._ml = 1.0 / math.log(max(m, 2))
+        self._rng = np.random.default_rng(seed)
+        self.levels = np.full(1024, -1, dtype=np.int8)           # slot -> top level (-1: not in graph)
+        self.links = np.full((1024, self.m0), -1, dtype=np.int32)
+        self.sims = np.full((1024, self.m0), -np.inf, dtype=np.float32)
+        self.upper: List[Dict[int, Tuple[List[int], List[float]]]] = []   # level - 1 -> slot -> (links, sims)
+        self.entry = -1
+        self.nodes = 0
+
+    def __contains__(self, slot: int) -> bool:
+        return slot < len(self.levels) and self.levels[slot] >= 0
+
+    def neighbours(self, slot: int, level: int) -> List[int]:
+        if level == 0:
+            row = self.links[slot]
+            return row[row >= 0].tolist()
+        return self.upper[level - 1][slot][0]
+
+    def insert(self, slot: int, vector: np.ndarray) -> None:
+        level = int(-math.log(1.0 - self._rng.random()) * self._ml)
+        self._grow(slot + 1)
+        self.levels[slot] = level
+        while len(self.upper) < level:
+            self.upper.append({})
+        for lc in range(1, level + 1):
+            self.upper[lc - 1][slot] = ([], [])
+        self.nodes += 1
+        if self.entry < 0:
+            self.entry = slot
+            return
+        top = int(self.levels[self.entry])
+        entries = [self.entry]
+        for lc in range(top, level, -1):   # greedy descent to the new node's top level
+            entries = [self.search_layer(vector, entries, 1, lc)[0][1]]
+        for lc in range(min(level, top), -1, -1):
+            found = self.search_layer(vector, entries, self.ef_construction, lc)
+            for sim, other in self._select(found, self.m):
+                self._link(slot, other, sim, lc)
+                self._link(other, slot, sim, lc)
+            entries = [s for _, s in found]
+        if level > top:
+            self.entry = slot
+
+    def search_layer(self, q: np.ndarray, entries: Sequence[int], ef: int, level: int) -> List[Tuple[float, int]]:
+        """The ef nodes most similar to q reachable from entries on one level: [(sim, slot)], best first."""
+        visited = set(entries)
+        sims = self.rows(np.asarray(entries)) @ q
+        candidates = [(-s, e) for s, e in zip(sims.tolist(), entries)]
+        heapq.heapify(candidates)
+        results = [(s, e) for s, e in zip(sims.tolist(), entries)]   # min-heap: worst kept result on top
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+        while candidates:
+            neg, c = heapq.heappop(candidates)
+            if len(results) >= ef and -neg < results[0][0]:
+                break
+            fresh = [n for n in self.neighbours(c, level) if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for s, n in zip((self.rows(np.asarray(fresh)) @ q).tolist(), fresh):
+                if len(results) < ef or s > results[0][0]:
+                    heapq.heappush(candidates, (-s, n))
+                    heapq.heappush(results, (s, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted(results, reverse=True)
+
+    def search(self, q: np.ndarray, ef: int) -> List[Tuple[float, int]]:
+        if self.entry < 0:
+            return []
+        entries = [self.entry]
+        for lc in range(int(self.levels[self.entry]), 0, -1):
+            entries = [self.search_layer(q, entries, 1, lc)[0][1]]
+        return self.search_layer(q, entries, ef, 0)
+
+    def _select(self, found: List[Tuple[float, int]], m: int) -> List[Tuple[float, int]]:
+        """
+        Neighbour heuristic: keep a candidate only if it is closer to the new node than to
+        every neighbour already kept, so links point in different directions; top up with the
+        closest of the rest.
+        """
+        if len(found) <= m:
+            return found
+        slots = np.asarray([s for _, s in found])
+        v = self.rows(slots)
+        pair = v @ v.T
+        kept: List[int] = []
+        for i, (sim, _) in enumerate(found):
+            if len(kept) >= m:
+                break
+            if not kept or pair[i, kept].max() < sim:
+                kept.append(i)
+        for i in range(len(found)):
+            if len(kept) >= m:
+                break
+            if i not in kept:
+                kept.append(i)
+        return [found[i] for i in kept]
+
+    def _link(self, a: int, b: int, sim: float, level: int) -> None:
+        """Add b to a's links; a full list drops its least similar link if b is closer."""
+        if level == 0:
+            row, sims = self.links[a], self.sims[a]
+            free = np.flatnonzero(row < 0)
+            i = int(free[0]) if len(free) else int(np.argmin(sims))
+            if len(free) or sims[i] < sim:
+                row[i], sims[i] = b, sim
+            return
+        links, sims = self.upper[level - 1][a]
+        if len(links) < self.m:
+            links.append(b)
+            sims.append(sim)
+            return
+        i = int(np.argmin(sims))
+        if sims[i] < sim:
+            links[i], sims[i] = b, sim
+
+    def _grow(self, n: int) -> None:
+        cap = len(self.levels)
+        if n <= cap:
+            return
+        while cap < n:
+            cap *= 2
+        grow = cap - len(self.levels)
+        self.levels = np.concatenate([self.levels, np.full(grow, -1, dtype=np.int8)])
+        self.links = np.concatenate([self.links, np.full((grow, self.m0), -1, dtype=np.int32)])
+        self.sims = np.concatenate([self.sims, np.full((grow, self.m0), -np.inf, dtype=np.float32)])
+
+    def save(self, path: pathlib.Path) -> None:
+        nodes = [(lc + 1, s) for lc, layer in enumerate(self.upper) for s in layer]
+        counts = [len(self.upper[lc - 1][s][0]) for lc, s in nodes]
+        tmp = path.with_name(path.name + ".tmp.npz")
+        np.savez(tmp, levels=self.levels, links=self.links, sims=self.sims,
+                 meta=np.asarray([self.m, self.ef_construction, self.entry, self.nodes], dtype=np.int64),
+                 upper_nodes=np.asarray(nodes, dtype=np.int64).reshape(-1, 2),
+                 upper_counts=np.asarray(counts, dtype=np.int64),
+                 upper_links=np.asarray([b for lc, s in nodes for b in self.upper[lc - 1][s][0]], dtype=np.int64),
+                 upper_sims=np.asarray([x for lc, s in nodes for x in self.upper[lc - 1][s][1]], dtype=np.float32))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: pathlib.Path, rows: Callable[[np.ndarray], np.ndarray]) -> "HNSW":
+        with np.load(path) as f:
+            m, ef_construction, entry, nodes = (int(x) for x in f["meta"])
+            graph = cls(rows, m, ef_construction)
+            graph.levels, graph.links, graph.sims = f["levels"], f["links"], f["sims"]
+            graph.entry, graph.nodes = entry, nodes
+            pos = 0
+            links, sims = f["upper_links"].tolist(), f["upper_sims"].tolist()
+            for (level, slot), n in zip(f["upper_nodes"].tolist(), f["upper_counts"].tolist()):
+                while len(graph.upper) < level:
+                    graph.upper.append({})
+                graph.upper[level - 1][slot] = (links[pos:pos + n], sims[pos:pos + n])
+                pos += n
+        return graph
+
+class VectorIndex:
+    """
+    Documents are {"id", ...properties}; vectors any length-`dims` sequence (normalized here).
+    Ids are the same object ids Weaviate or the BM25 index use, so hits line up across them.
+    `keys(doc)` gives the terms of a small inverted index that `search(any_of=...)` looks up
+    (e.g. db.path_filters.path_keys on the path). Thread-safe: searches run side by side,
+    while add, remove, save and clear run alone. `generation` changes on every add/remove,
+    for callers that cache results.
+    """
+
+    def __init__(self, path: Optional[str] = RAG_VECTOR_INDEX_PATH, exact_max: int = RAG_VECTOR_EXACT_MAX,
+                 m: int = RAG_HNSW_M, ef_construction: int = RAG_HNSW_EF_CONSTRUCTION,
+                 ef_search: int = RAG_HNSW_EF_SEARCH, keys: Optional[Callable[[Dict], Iterable[str]]] = None):
+        self.path = pathlib.Path(path) if path else None
+        self.exact_max, self.m, self.ef_construction, self.ef_search = exact_max, m, ef_construction, ef_search
+        self.keys = keys
+        self.generation = 0
+        self.dims = 0
+        self._matrix: Optional[np.ndarray] = None   # (capacity, dims) float16, memory-mapped when path is set
+        self._exact: Optional[np.ndarray] = None    # float32 copy of the matrix, while searching exactly
+        self._docs: List[Optional[Dict]] = []       # slot -> document (None once removed)
+        self._slots: Dict[str, int] = {}            # id -> slot
+        self._postings: Dict[str, Set[int]] = {}    # key -> live slots
+        self._graph: Optional[HNSW] = None
+        self._vectors_file, self._graph_file = "vectors.f16", "graph.npz"   # named by the log's meta line
+        self._lock = _ReadWriteLock()
+        self._exact_lock = threading.Lock()   # concurrent exact searches build the float32 copy once
+        if self.path and (self.path / "docs.jsonl").exists():
+            self._replay()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._slots
+
+    @property
+    def mode(self) -> str:
+        return "hnsw" if self._graph is not None and len(self._slots) > self.exact_max else "exact"
+
+    def get(self, doc_id: str) -> Optional[Dict]:
+        with self._lock.read():
+            slot = self._slots.get(doc_id)
+            return self._docs[slot] if slot is not None else None
+
+    def documents(self) -> List[Dict]:
+        with self._lock.read():
+            return [d for d in self._docs if d is not None]
+
+    def vector(self, doc_id: str) -> Optional[np.ndarray]:
+        with self._lock.read():
+            slot = self._slots.get(doc_id)
+            return self._matrix[slot].astype(np.float32) if slot is not None else None
+
+    def add(self, doc: Dict, vector, persist: bool = True) -> None:
+        """Add or replace one document and its vector."""
+        self.add_many([(doc, vector)], persist)
+
+    def add_many(self, items: Iterable[Tuple[Dict, Sequence[float]]], persist: bool = True) -> int:
+        with self._lock.write():
+            records = []
+            for doc, vector in items:
+                records.append(self._add(doc, _unit(vector)))
+            if persist and records:
+                self._matrix_flush()   # rows first: every logged slot has its vector
+                self._append(*records)
+            return len(records)
+
+    def remove(self, doc_id: str, persist: bool = True) -> bool:
+        with self._lock.write():
+            if not self._remove(doc_id):
+                return False
+            if persist:
+                self._append({"op": "del", "id": doc_id})
+            return True
+
+    def search(self, vector, k: int = 10, where: Optional[Callable[[Dict], bool]] = None,
+               any_of: Optional[Iterable[str]] = None, ef: Optional[int] = None) -> Hits:
+        """
+        Top-k (id, cosine similarity) for the query vector. `any_of` keeps documents with at
+        least one of those keys (an index lookup); `where` filters on the stored document.
+        """
+        q = _unit(vector)
+        with self._lock.read():
+            if not self._slots or k <= 0:
+                return []
+            if len(q) != self.dims:
+                raise ValueError(f"query has {len(q)} dimensions, the index {self.dims}")
+            allowed = None
+            if any_of is not None:
+                found = set().union(*(self._postings.get(key, ()) for key in any_of))
+                if not found:
+                    return []
+                allowed = np.fromiter(sorted(found), dtype=np.int64, count=len(found))
+            if self.mode == "exact":
+                return self._exact_search(q, k, where, allowed)
+            return self._graph_search(q, k, where, allowed, ef or self.ef_search)
+
+    def stats(self) -> Dict:
+        with self._lock.read():
+            return {"documents": len(self._slots), "slots": len(self._docs), "dims": self.dims, "mode": self.mode,
+                    "graph_nodes": self._graph.nodes if self._graph is not None else 0}
+
+    def clear(self) -> None:
+        with self._lock.write():
+            self._close_matrix()
+            self._docs, self._slots, self._postings, self._graph, self._exact, self.dims = [], {}, {}, None, None, 0
+            if self.path:
+                for name in ("docs.jsonl", self._vectors_file, self._graph_file):   # the log first
+                    (self.path / name).unlink(missing_ok=True)
+            self._vectors_file, self._graph_file = "vectors.f16", "graph.npz"
+            self.generation += 1
+
+    def save(self) -> None:
+        """Flush the matrix, compact if mostly tombstones, rewrite the log and persist the graph."""
+        if not self.path:
+            return
+        with self._lock.write():
+            self.path.mkdir(parents=True, exist_ok=True)
+            if len(self._docs) > 2 * max(len(self._slots), 1000):
+                self._compact()
+                return
+            self._matrix_flush()
+            self._write_log(self._docs, self._vectors_file, self._graph_file)
+            if self._graph is not None:
+                self._graph.save(self.path / self._graph_file)
+
+    # --- search
+
+    def _exact_search(self, q: np.ndarray, k: int, where, allowed: Optional[np.ndarray]) -> Hits:
+        n = len(self._docs)
+        with self._exact_lock:
+            if self._exact is None:
+                self._exact = self._matrix.astype(np.float32)
+            exact = self._exact
+        if allowed is None:
+            return self._best(exact[:n] @ q, np.arange(n), k, where)
+        if 4 * len(allowed) < n:   # few rows: score just those
+            return self._best(exact[allowed] @ q, allowed, k, where)
+        return self._best((exact[:n] @ q)[allowed], allowed, k, where)
+
+    def _scan(self, q: np.ndarray, slots: np.ndarray, k: int, where) -> Hits:
+        """Exact scores for the given slots, read from the float16 matrix in blocks."""
+        if not len(slots):
+            return []
+        scores = np.concatenate([self._rows(slots[i:i + 4096]) @ q for i in range(0, len(slots), 4096)])
+        return self._best(scores, slots, k, where)
+
+    def _best(self, scores: np.ndarray, slots: np.ndarray, k: int, where) -> Hits:
+        """Live documents passing `where` in descending score order, checking the top few first."""
+        hits: Hits = []
+        n = len(scores)
+        first = min(n, 4 * k + 16)
+        top = np.argpartition(-scores, first - 1)[:first] if first < n else np.arange(n)
+        for order in (top[np.argsort(-scores[top], kind="stable")], None):
+            if order is None:   # not enough among the top: go through the rest
+                if first >= n:
+                    break
+                seen = set(top.tolist())
+                order = [i for i in np.argsort(-scores, kind="stable").tolist() if i not in seen]
+            for i in order:
+                doc = self._docs[int(slots[i])]
+                if doc is not None and (where is None or where(doc)):
+                    hits.append((doc["id"], float(scores[i])))
+                    if len(hits) >= k:
+                        return hits
+        return hits
+
+    def _graph_search(self, q: np.ndarray, k: int, where, allowed: Optional[np.ndarray], ef: int) -> Hits:
+        if allowed is not None and len(allowed) <= RAG_VECTOR_SCAN_MAX:
+            return self._scan(q, allowed, k, where)   # cheaper than a graph search wide enough to find them
+        allowed_set = set(allowed.tolist()) if allowed is not None else None
+        # the graph finds about ef * (share of documents allowed) candidates that pass
+        ef = max(ef, k) * (min(8, -(-len(self._slots) // len(allowed))) if allowed is not None else 1)
+        while True:
+            hits: Hits = []
+            for sim, slot in self._graph.search(q, ef):
+                doc = self._docs[slot]
+                if doc is not None and (allowed_set is None or slot in allowed_set) and (where is None or where(doc)):
+                    hits.append((doc["id"], float(sim)))
+                    if len(hits) >= k:
+                        return hits
+            if ef >= 8 * max(self.ef_search, k) or ef >= self._graph.nodes:
+                break
+            ef *= 4
+        # a selective `where`: score exactly the documents that pass it
+        slots = allowed if allowed is not None else np.fromiter(sorted(self._slots.values()), dtype=np.int64)
+        slots = np.asarray([s for s in slots.tolist() if where is None or where(self._docs[s])], dtype=np.int64)
+        return self._scan(q, slots, k, None)
+
+    # --- storage
+
+    def _rows(self, slots: np.ndarray) -> np.ndarray:
+        return self._matrix[slots].astype(np.float32)
+
+    def _add(self, doc: Dict, v: np.ndarray) -> Dict:
+        if not self.dims:
+            self.dims = len(v)
+        elif len(v) != self.dims:
+            raise ValueError(f"vector has {len(v)} dimensions, the index {self.dims}")
+        self._remove(doc["id"])
+        slot = len(self._docs)
+        self._ensure_capacity(slot + 1)
+        self._matrix[slot] = v
+        if self._exact is not None:
+            self._exact[slot] = self._matrix[slot]   # same float16 rounding as the stored row
+        doc = self._place(slot, doc)
+        self._index_slot(slot)
+        return {"op": "add", "slot": slot, **doc}
+
+    def _place(self, slot: int, doc: Dict) -> Dict:
+        doc = {key: value for key, value in doc.items() if key not in ("op", "slot")}
+        self._docs.extend([None] * (slot + 1 - len(self._docs)))
+        self._docs[slot] = doc
+        self._slots[doc["id"]] = slot
+        for key in (self.keys(doc) if self.keys else ()):
+            self._postings.setdefault(key, set()).add(slot)
+        self.generation += 1
+        return doc
+
+    def _remove(self, doc_id: str) -> bool:
+        slot = self._slots.pop(doc_id, None)
+        if slot is None:
+            return False
+        for key in (self.keys(self._docs[slot]) if self.keys else ()):
+            posting = self._postings.get(key)
+            if posting is not None:
+                posting.discard(slot)
+                if not posting:
+                    del self._postings[key]
+        self._docs[slot] = None   # the row stays (graph routing) until compaction
+        self.generation += 1
+        return True
+
+    def _index_slot(self, slot: int) -> None:
+        """Keep the graph in step; build it the first time the index outgrows exact search."""
+        if self._graph is None:
+            if len(self._slots) <= self.exact_max:
+                return
+            self._graph = HNSW(self._rows, self.m, self.ef_construction)
+            for s, d in enumerate(self._docs):
+                if d is not None:
+                    self._graph.insert(s, self._rows(np.asarray([s]))[0])
+            self._exact = None   # searches go through the graph from here on
+            return
+        if slot not in self._graph:
+            self._graph.insert(slot, self._rows(np.asarray([slot]))[0])
+
+    def _ensure_capacity(self, n: int) -> None:
+        cap = len(self._matrix) if self._matrix is not None else 0
+        if n <= cap:
+            return
+        new_cap = max(1024, cap)
+        while new_cap < n:
+            new_cap *= 2
+        self._exact = None   # rebuilt at the new size by the next exact search
+        if not self.path:
+            grown = np.zeros((new_cap, self.dims), dtype=np.float16)
+            if cap:
+                grown[:cap] = self._matrix
+            self._matrix = grown
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        file = self.path / self._vectors_file
+        self._close_matrix()
+        with open(file, "ab") as f:
+            f.truncate(new_cap * self.dims * 2)
+        self._matrix = np.memmap(file, dtype=np.float16, mode="r+", shape=(new_cap, self.dims))
+
+    def _matrix_flush(self) -> None:
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+
+    def _close_matrix(self) -> None:
+        if isinstance(self._matrix, np.memmap):
+            self._matrix.flush()
+        self._matrix = None
+
+    def _compact(self) -> None:
+        """
+        Save the live documents into new slots: the matrix and graph go to files under fresh
+        names, then the log naming them replaces the old one. Only after that does this index
+        switch to the new state and delete the old files, so a crash or I/O error on the way
+        leaves the saved index as it was.
+        """
+        fresh = VectorIndex(None, self.exact_max, self.m, self.ef_construction, self.ef_search, self.keys)
+        for s, d in enumerate(self._docs):
+            if d is not None:
+                fresh._add(d, self._matrix[s].astype(np.float32))
+        token = uuid.uuid4().hex[:12]
+        vectors, graph = f"vectors-{token}.f16", f"graph-{token}.npz"
+        if fresh._matrix is not None:
+            fresh._matrix.tofile(self.path / vectors)
+        if fresh._graph is not None:
+            fresh._graph.save(self.path / graph)
+        self._write_log(fresh._docs, vectors, graph)   # the switch
+
+        stale = (self._vectors_file, self._graph_file)
+        self._close_matrix()
+        self._vectors_file, self._graph_file = vectors, graph
+        if fresh._matrix is not None:
+            self._matrix = np.memmap(self.path / vectors, dtype=np.float16, mode="r+", shape=fresh._matrix.shape)
+        self._docs, self._slots, self._postings, self._exact = fresh._docs, fresh._slots, fresh._postings, None
+        self._graph = fresh._graph
+        if self._graph is not None:
+            self._graph.rows = self._rows   # read the memory map, not the in-memory copy
+        self.generation += 1
+        for name in stale:
+            (self.path / name).unlink(missing_ok=True)
+
+    def _meta(self, vectors: str, graph: str) -> str:
+        return json.dumps({"op": "meta", "dims": self.dims, "vectors": vectors, "graph": graph}) + "\n"
+
+    def _write_log(self, docs: List[Optional[Dict]], vectors: str, graph: str) -> None:
+        """Replace the log with one add per live slot, under a meta line naming the matrix and graph."""
+        tmp = self.path / "docs.jsonl.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self._meta(vectors, graph))
+            for slot, d in enumerate(docs):
+                if d is not None:
+                    f.write(json.dumps({"op": "add", "slot": slot, **d}) + "\n")
+        os.replace(tmp, self.path / "docs.jsonl")
+
+    def _append(self, *records: Dict) -> None:
+        if not self.path or not records:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        log = self.path / "docs.jsonl"
+        header = "" if log.exists() else self._meta(self._vectors_file, self._graph_file)
+        with open(log, "a", encoding="utf-8") as f:
+            f.write(header + "".join(json.dumps(r) + "\n" for r in records))
+
+    def _replay(self) -> None:
+        """
+        Rebuild ids and documents from the log over the matrix file it names (vectors are
+        written before their log line, so every logged slot has its row), then load the
+        saved graph and insert the slots added since. Files left by an unfinished
+        compaction are deleted.
+        """
+        records = []
+        with open(self.path / "docs.jsonl", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:   # torn last line after a crash
+                    continue
+        meta = next((r for r in records if r.get("op") == "meta"), {})
+        self.dims = meta.get("dims", 0)
+        # logs written before compaction renamed files have no names: the fixed ones
+        self._vectors_file = meta.get("vectors", "vectors.f16")
+        self._graph_file = meta.get("graph", "graph.npz")
+        for stale in (*self.path.glob("vectors*.f16"), *self.path.glob("graph*.npz")):
+            if stale.name not in (self._vectors_file, self._graph_file):
+                stale.unlink(missing_ok=True)
+        file = self.path / self._vectors_file
+        if not self.dims or not file.exists():
+            return
+        self._matrix = np.memmap(file, dtype=np.float16, mode="r+", shape=(file.stat().st_size // (2 * self.dims), self.dims))
+        for rec in records:
+            if rec.get("op") == "del":
+                self._remove(rec["id"])
+            elif rec.get("op") == "add" and rec.get("slot", len(self._matrix)) < len(self._matrix):
+                self._remove(rec["id"])
+                self._place(rec["slot"], rec)
+        graph = self.path / self._graph_file
+        if len(self._slots) > self.exact_max:
+            if graph.exists():
+                self._graph = HNSW.load(graph, self._rows)
+                for s, d in enumerate(self._docs):
+                    if d is not None and s not in self._graph:
+                        self._graph.insert(s, self._rows(np.asarray([s]))[0])
+            else:
+                self._index_slot(len(self._docs) - 1)
+
+_index: Optional[VectorIndex] = None
+_index_lock = threading.Lock()
+
+def get_vector_index() -> VectorIndex:
+    """The RAG service's index: documents carry a "path", indexed for filter_paths."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = VectorIndex(keys=lambda doc: path_keys(doc.get("path") or ""))
+        return _index
@@ -0,0 +1,34 @@
+# db/vectors.py — embedding vectors as contiguous NumPy arrays
+# A batch of embeddings is one (n, dims) float32 (or float16) matrix from the moment the
+# API response is decoded until the Weaviate client needs it. A 3072-dim vector takes
+# 12 KB as float32 (6 KB as float16) instead of ~100 KB as a list of Python floats.
+# Lists are only built at the client boundary, one insert batch at a time (to_client).
+import os, base64
+from typing import List, Sequence
+
+import numpy as np
+
+EMBED_VECTOR_DTYPE = os.getenv("EMBED_VECTOR_DTYPE", "float32")   # float32 | float16
+
+if EMBED_VECTOR_DTYPE not in ("float32", "float16"):
+    raise ValueError(f"Unsupported EMBED_VECTOR_DTYPE: {EMBED_VECTOR_DTYPE}")
+
+def decode_embedding(data, dtype: str = EMBED_VECTOR_DTYPE) -> np.ndarray:
+    """One embedding from an API response: base64 little-endian float32, or a plain list."""
+    if isinstance(data, str):
+        return np.frombuffer(base64.b64decode(data), dtype="<f4").astype(dtype, copy=False)
+    return np.asarray(data, dtype=dtype)
+
+def as_matrix(vectors: Sequence, dtype: str = EMBED_VECTOR_DTYPE) -> np.ndarray:
+    """Stack vectors into one contiguous (n, dims) array."""
+    if isinstance(vectors, np.ndarray) and vectors.ndim == 2:
+        return np.ascontiguousarray(vectors, dtype=dtype)
+    if len(vectors) == 0:
+        return np.empty((0, 0), dtype=dtype)
+    return np.stack([np.asarray(v, dtype=dtype) for v in vectors])
+
+def to_client(vec) -> List[float]:
+    """The Weaviate client wants plain floats; float16 is widened to float32 first."""
+    if isinstance(vec, np.ndarray):
+        return vec.astype(np.float32, copy=False).tolist()
+    return list(vec)
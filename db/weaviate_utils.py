@@ -1,13 +1,28 @@
-import os, re, pathlib
-from typing import List, Dict, Iterable
-from pypdf import PdfReader
-from openai import OpenAI
+import os, time, logging, pathlib
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Callable, Optional
+import numpy as np
 import weaviate
-from weaviate.classes.config import Property, DataType, Configure
+from weaviate.classes.config import Property, DataType, Configure, Tokenization
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import Filter, MetadataQuery
 from dotenv import load_dotenv
 
+from .ingest_manifest import Manifest, load_manifest, iter_chunk_ids
+from .ingest_pipeline import staged
+from .pdf_extract import iter_pdf_files, iter_pdf_pages
+from .chunking import iter_chunks
+from .dedup import INGEST_DEDUP, SimHashIndex, simhash, strip_boilerplate
+from .embed_cache import get_embed_cache
+from .embed_client import get_embed_client, EMBED_MODEL, EMBED_DIMENSIONS, EMBED_MAX_IN_FLIGHT
+from .vectors import to_client
+from .batch_writer import BatchWriter
+from .query_cache import bump_index_generation, get_query_cache
+from .diversify import diversify, RAG_DIVERSIFY, RAG_DIVERSIFY_FETCH
+
 load_dotenv()
-OAI = OpenAI()
+logger = logging.getLogger(__name__)
 
 COLLECTION = os.getenv("DOC_COLLECTION", "JarvisDocs")
 
@@ -25,108 +40,342 @@ def connect_weaviate():
     return weaviate.connect_to_local(host=url)  # e.g., http://localhost:8080
 
 def ensure_collection(client: weaviate.WeaviateClient):
-    names = [c.name for c in client.collections.list_all()]
-    if COLLECTION in names:
-        return client.collections.get(COLLECTION)
+    if client.collections.exists(COLLECTION):
+        col = client.collections.get(COLLECTION)
+        check_collection_schema(col)
+        return col
     return client.collections.create(
         name=COLLECTION,
         vectorizer_config=Configure.Vectorizer.none(),  # BYO vectors
         properties=[
             Property(name="text",        data_type=DataType.TEXT),
-            Property(name="source_path", data_type=DataType.TEXT),
+            # field tokenization so equality filters on the path are exact
+            Property(name="source_path", data_type=DataType.TEXT, tokenization=Tokenization.FIELD),
             Property(name="page",        data_type=DataType.INT),
+            Property(name="anchor",      data_type=DataType.TEXT),   # heading path or "page N"
         ],
     )
 
-def chunk_text(text: str, size: int = 1000, overlap: int = 200) -> List[str]:
-    text = re.sub(r"\s+", " ", text).strip()
-    chunks, i = [], 0
-    while i < len(text):
-        end = min(len(text), i + size)
-        chunks.append(text[i:end])
-        i = max(0, end - overlap)
-    return chunks
+def check_collection_schema(col) -> None:
+    """
+    Bring a collection created before chunks carried anchors and source_path was
+    field-tokenized as close to the current schema as Weaviate allows: add the missing
+    anchor property, and warn about what only a rebuild (reindex) fixes.
+    """
+    try:
+        props = {p.name: p for p in col.config.get().properties}
+    except Exception as e:   # no schema access; searches and ingest still work
+        logger.debug(f"Could not read the schema of {col.name}: {e}")
+        return
+    if "anchor" not in props:
+        col.config.add_property(Property(name="anchor", data_type=DataType.TEXT))
+        logger.warning(f"{col.name}: added the anchor property; chunks stored before it have no anchor "
+                       f"until they are re-ingested (python manual_ingest.py --reindex)")
+    source = props.get("source_path")
+    if source is not None and source.tokenization != Tokenization.FIELD:
+        # tokenization can't be changed on an existing property
+        logger.warning(f"{col.name}: source_path uses {getattr(source.tokenization, 'value', None)} tokenization, "
+                       f"so path filters on it are not exact; rebuild with python manual_ingest.py --reindex")
 
 def read_markdown(path: str) -> str:
     return pathlib.Path(path).read_text(encoding="utf-8", errors="ignore")
 
+def iter_pdf(path: str) -> Iterator[Dict]:
+    return iter_pdf_pages(path)
+
 def read_pdf(path: str) -> List[Dict]:
-    reader = PdfReader(path)
-    out = []
-    for idx, page in enumerate(reader.pages, start=1):
-        txt = page.extract_text() or ""
-        if txt.strip():
-            out.append({"text": txt, "page": idx})
-    return out
-
-def embed_texts(texts: List[str]) -> List[List[float]]:
-    vecs: List[List[float]] = []
-    B = 64
-    for i in range(0, len(texts), B):
-        batch = texts[i:i+B]
-        res = OAI.embeddings.create(model="text-embedding-3-large", input=batch)
-        vecs.extend([d.embedding for d in res.data])
-    return vecs
-
-def ingest_paths(paths: Iterable[str]) -> int:
-    """Ingest .md and .pdf into Weaviate with OpenAI embeddings."""
-    count = 0
+    """Non-empty pages with repeated headers/footers removed."""
+    return strip_boilerplate(list(iter_pdf(path)))[0]
+
+def _embed_uncached(texts: List[str]) -> np.ndarray:
+    # token-sized requests, several in flight, RPM/TPM limited (see embed_client)
+    return get_embed_client().embed(texts)
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """Embed texts into a (len(texts), dims) array, serving repeats from the shared on-disk cache."""
+    return get_embed_cache().get_or_embed(texts, _embed_uncached, EMBED_MODEL, EMBED_DIMENSIONS)
+
+# progress(counter, n): counters are "files", "files_skipped", "pages",
+# "chunks_embedded", "chunks_written", "chunks_deleted", "chunks_deduplicated",
+# "dedup_bytes" (text of the skipped duplicates), "boilerplate_lines", "write_retries"
+# and "chunks_failed" (dead-lettered)
+Progress = Callable[[str, int], None]
+
+def _no_progress(counter: str, n: int) -> None:
+    pass
+
+def delete_source_chunks(col, source_path: str, ids: List[str]) -> int:
+    """Batch-delete the given chunk ids of one source file."""
+    B = 500
+    for i in range(0, len(ids), B):
+        col.data.delete_many(
+            where=Filter.by_property("source_path").equal(source_path)
+            & Filter.by_id().contains_any(ids[i:i+B])
+        )
+    bump_index_generation(COLLECTION)   # cached search results may include them
+    return len(ids)
+
+EMBED_BATCH = int(os.getenv("INGEST_EMBED_BATCH", "64"))
+PIPELINE_QUEUE = int(os.getenv("INGEST_PIPELINE_QUEUE", "256"))
+CHECKPOINT_SECS = float(os.getenv("INGEST_CHECKPOINT_SECS", "10"))
+
+class _FileDone:
+    """Marker that follows a file's last chunk down the pipeline."""
+    __slots__ = ("source_path", "sha256", "chunk_ids", "stale")
+
+    def __init__(self, source_path: str, sha256: Optional[str], chunk_ids: List[Dict], stale: List[str]):
+        self.source_path, self.sha256, self.chunk_ids, self.stale = source_path, sha256, chunk_ids, stale
+
+def ingest_paths(paths: Iterable[str], progress: Optional[Progress] = None) -> int:
+    """
+    Incrementally ingest .md and .pdf into Weaviate with OpenAI embeddings.
+    Parsing, embedding and inserting run as concurrent stages joined by bounded queues,
+    so they overlap and memory does not grow with the corpus. Unchanged files (per the
+    manifest) are skipped, changed files only embed their new chunks, and chunks of
+    changed or deleted files are removed. Returns chunks written.
+
+    The manifest is checkpointed every CHECKPOINT_SECS and on the way out (also on
+    errors), so a crashed or interrupted run resumes after the last fully written file.
+    """
+    progress = progress or _no_progress
+    manifest = load_manifest()
+    try:
+        with connect_weaviate() as client:
+            col = ensure_collection(client)
+            embedded = staged(
+                _parse_stage(paths, manifest, progress),
+                [lambda items: _embed_stage(items, progress)],
+                maxsize=PIPELINE_QUEUE,
+            )
+            return _insert_stage(embedded, col, manifest, progress)
+    finally:
+        manifest.save()
+
+def reindex(paths: Iterable[str], progress: Optional[Progress] = None) -> int:
+    """
+    Rebuild the collection with the current schema: drop it, forget every file in the
+    manifest and ingest paths from scratch. Anything ingested from outside paths is gone
+    afterwards. Returns chunks written.
+    """
+    manifest = load_manifest()
     with connect_weaviate() as client:
-        col = ensure_collection(client)
-        to_insert: List[Dict] = []
-
-        for raw in paths:
-            p = pathlib.Path(raw)
-            if p.is_dir():
-                for sub in p.rglob("*"):
-                    if sub.suffix.lower() in [".md", ".pdf"]:
-                        count += _prepare_file(sub, to_insert)
-            else:
-                count += _prepare_file(p, to_insert)
-
-        if to_insert:
-            embeds = embed_texts([item["text"] for item in to_insert])
-            B = 128
-            for i in range(0, len(to_insert), B):
-                batch_objs = to_insert[i:i+B]
-                batch_vecs = embeds[i:i+B]
-                props = []
-                for obj in batch_objs:
-                    d = {"text": obj["text"], "source_path": obj["source_path"]}
-                    if "page" in obj and obj["page"] is not None:
-                        d["page"] = obj["page"]
-                    props.append(d)
-                col.data.insert_many(properties=props, vectors=batch_vecs)
-    return count
-
-def _prepare_file(p: pathlib.Path, out_objs: List[Dict]) -> int:
-    added = 0
-    if p.suffix.lower() == ".md":
-        text = read_markdown(str(p))
-        for ch in chunk_text(text):
-            out_objs.append({"text": ch, "source_path": str(p)})
-            added += 1
-    elif p.suffix.lower() == ".pdf":
-        pages = read_pdf(str(p))
-        for pg in pages:
-            for ch in chunk_text(pg["text"]):
-                out_objs.append({"text": ch, "source_path": str(p), "page": pg["page"]})
-                added += 1
-    return added
+        if client.collections.exists(COLLECTION):
+            client.collections.delete(COLLECTION)
+    bump_index_generation(COLLECTION)
+    for source_path in list(manifest.files):
+        manifest.forget(source_path)
+    manifest.save()
+    return ingest_paths(paths, progress)
+
+def _dedup_index(manifest: Manifest) -> Optional[SimHashIndex]:
+    """Near-duplicate index over every stored chunk the manifest has a SimHash for."""
+    if not INGEST_DEDUP:
+        return None
+    index = SimHashIndex()
+    for _, h, chunk_id in manifest.simhashes():
+        index.add(h, chunk_id)
+    return index
+
+def _parse_stage(paths: Iterable[str], manifest: Manifest, progress: Progress) -> Iterator:
+    """Yield new chunk dicts file by file, each file followed by its _FileDone marker."""
+    index = _dedup_index(manifest)
+
+    def gone_markers(gone: List[str]) -> List[_FileDone]:
+        # deleted files can't serve as the original of a duplicate
+        markers = [_FileDone(g, None, [], manifest.chunk_ids(g)) for g in gone]
+        if index is not None:
+            for m in markers:
+                for chunk_id in m.stale:
+                    index.remove(chunk_id)
+        return markers
+
+    for raw in paths:
+        p = pathlib.Path(raw)
+        if p.is_dir():
+            files = [sub for sub in p.rglob("*") if sub.suffix.lower() in [".md", ".pdf"]]
+            gone = gone_markers(manifest.missing_under(str(p), (str(f) for f in files)))
+            yield from _parse_files(files, manifest, progress, index)
+            yield from gone
+        elif p.exists():
+            yield from _parse_files([p], manifest, progress, index)
+        elif manifest.chunk_ids(str(p)):
+            yield from gone_markers([str(p)])
+
+def _parse_files(files: List[pathlib.Path], manifest: Manifest, progress: Progress,
+                 index: Optional[SimHashIndex] = None) -> Iterator:
+    changed: Dict[str, str] = {}
+    for f in files:
+        unchanged, sha = manifest.check_file(str(f))
+        if unchanged:
+            progress("files_skipped", 1)
+        else:
+            changed[str(f)] = sha
+
+    for src, sha in changed.items():
+        if src.lower().endswith(".md"):
+            chunks = (
+                {"text": ch["text"], "source_path": src, "anchor": ch["anchor"]}
+                for ch in iter_chunks(read_markdown(src))
+            )
+            yield from _parse_file(src, sha, chunks, manifest, progress, index)
+
+    # PDFs: pages of all changed files are extracted across the process pool, in order
+    pdfs = [src for src in changed if src.lower().endswith(".pdf")]
+    for src, pages in iter_pdf_files(pdfs):
+        yield from _parse_file(src, changed[src], _pdf_chunks(src, pages, progress), manifest, progress, index)
+
+def _pdf_chunks(src: str, pages: Iterable[Dict], progress: Progress) -> Iterator[Dict]:
+    # boilerplate is only recognisable across the whole file, so its page texts are buffered
+    pages, removed = strip_boilerplate(list(pages))
+    progress("boilerplate_lines", removed)
+    for pg in pages:
+        for ch in iter_chunks(pg["text"], anchor=f"page {pg['page']}"):
+            yield {"text": ch["text"], "source_path": src, "page": pg["page"], "anchor": ch["anchor"]}
+        progress("pages", 1)
+
+def _parse_file(src: str, sha: str, chunks: Iterable[Dict], manifest: Manifest, progress: Progress,
+                index: Optional[SimHashIndex] = None) -> Iterator:
+    """Yield the file's chunks that need embedding: not stored already and not a near-duplicate."""
+    known = manifest.known_ids(src)
+    if index is not None:
+        for chunk_id in known:   # never a duplicate of this file's own previous version
+            index.remove(chunk_id)
+    ids: List[Dict] = []
+    for c in iter_chunk_ids(chunks):
+        entry = {"uuid": c["uuid"], "text_hash": c["text_hash"]}
+        ids.append(entry)
+        if index is not None:
+            h = entry["simhash"] = simhash(c["text"])
+            original = None if c["uuid"] in known else index.find(h)
+            if original is not None:
+                entry["dup_of"] = original
+                progress("chunks_deduplicated", 1)
+                progress("dedup_bytes", len(c["text"].encode("utf-8")))
+                continue
+            index.add(h, c["uuid"])
+        if c["uuid"] not in known:
+            yield c
+    current = {c["uuid"] for c in ids if not c.get("dup_of")}
+    progress("files", 1)
+    yield _FileDone(src, sha, ids, sorted(known - current))
+
+def _embed_stage(items: Iterator, progress: Progress) -> Iterator:
+    """
+    Embed chunks EMBED_BATCH at a time with up to EMBED_MAX_IN_FLIGHT batches outstanding,
+    emitting them (and the markers between them) in their original order.
+    """
+    window: deque = deque()
+    pool = ThreadPoolExecutor(max_workers=max(1, EMBED_MAX_IN_FLIGHT), thread_name_prefix="embed-stage")
+
+    def submit(pending: List):
+        chunks = [it for it in pending if not isinstance(it, _FileDone)]
+        fut = pool.submit(embed_texts, [c["text"] for c in chunks]) if chunks else None
+        window.append((pending, chunks, fut))
+
+    def emit_oldest() -> Iterator:
+        pending, chunks, fut = window.popleft()
+        if fut is not None:
+            for c, vec in zip(chunks, fut.result()):
+                c["vector"] = vec
+            progress("chunks_embedded", len(chunks))
+        yield from pending
+
+    try:
+        pending: List = []
+        n_chunks = 0
+        for item in items:
+            pending.append(item)
+            if not isinstance(item, _FileDone):
+                n_chunks += 1
+            if n_chunks >= EMBED_BATCH:
+                submit(pending)
+                pending, n_chunks = [], 0
+                while len(window) > EMBED_MAX_IN_FLIGHT:
+                    yield from emit_oldest()
+        submit(pending)
+        while window:
+            yield from emit_oldest()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+def _insert_stage(items: Iterable, col, manifest: Manifest, progress: Progress) -> int:
+    """
+    Write embedded chunks through a BatchWriter; record a file in the manifest once all its
+    chunks are written. A file with dead-lettered chunks is left unrecorded, so the next
+    run retries it.
+    """
+    last_checkpoint = time.monotonic()
+
+    def settle(done: _FileDone) -> None:
+        nonlocal last_checkpoint
+        bump_index_generation(COLLECTION)   # the file's chunks are searchable now
+        if done.source_path in writer.failed_tags:
+            logger.warning(f"Not recording {done.source_path}: some chunks failed, it will be retried")
+        elif done.sha256 is None:
+            manifest.forget(done.source_path)
+        else:
+            manifest.record(done.source_path, done.sha256, done.chunk_ids)
+        if time.monotonic() - last_checkpoint >= CHECKPOINT_SECS:
+            manifest.save()
+            last_checkpoint = time.monotonic()
+
+    with BatchWriter(col, progress) as writer:
+        for item in items:
+            if isinstance(item, _FileDone):
+                if item.stale:
+                    delete_source_chunks(col, item.source_path, item.stale)
+                    progress("chunks_deleted", len(item.stale))
+                writer.after(lambda done=item: settle(done))
+                continue
+            props = {"text": item["text"], "source_path": item["source_path"]}
+            for key in ("page", "anchor"):
+                if item.get(key) is not None:
+                    props[key] = item[key]
+            # vectors stay NumPy rows until here; plain floats only for the batches being sent
+            writer.add(DataObject(properties=props, vector=to_client(item["vector"]), uuid=item["uuid"]),
+                       tag=item["source_path"])
+    t = writer.throughput()
+    logger.info(f"Wrote {t['written']:.0f} chunks in {t['requests']:.0f} requests: {t['objects_per_s']:.1f} "
+                f"chunks/s, {t['mb_per_s']:.2f} MB/s, {t['retries']:.0f} retried, {t['dead_lettered']:.0f} dead-lettered")
+    return int(t["written"])
+
+def _object_vector(o) -> Optional[List[float]]:
+    v = getattr(o, "vector", None)
+    return v.get("default") if isinstance(v, dict) else v
 
 def search(query: str, top_k: int = 6) -> List[Dict]:
-    """Return [{text, source_path, page}] most similar to the query."""
+    """
+    Return [{text, source_path, page}] most similar to the query (repeats served from the query cache).
+    With RAG_DIVERSIFY, overlapping chunks of one file / page come back merged and the top_k are
+    picked by MMR from RAG_DIVERSIFY_FETCH x top_k candidates.
+    """
+    cache = get_query_cache("weaviate_utils.search", COLLECTION)
+    filters = {"collection": COLLECTION, "top_k": top_k, "diversify": RAG_DIVERSIFY}
+    hits = cache.get_exact(query, filters)
+    if hits is not None:
+        return hits
+    generation = cache.generation()
     q_vec = embed_texts([query])[0]
+    hits = cache.get_similar(q_vec, filters)
+    if hits is not None:
+        return hits
     with connect_weaviate() as client:
         try:
             col = client.collections.get(COLLECTION)
         except Exception:
             return []
         res = col.query.near_vector(
-            near_vector=q_vec, limit=top_k, return_properties=["text", "source_path", "page"]
+            near_vector=to_client(q_vec), limit=top_k * RAG_DIVERSIFY_FETCH if RAG_DIVERSIFY else top_k,
+            return_properties=["text", "source_path", "page"],
+            return_metadata=MetadataQuery(distance=True), include_vector=RAG_DIVERSIFY
         )
-        hits: List[Dict] = []
+        hits = []
         for o in (res.objects or []):
             p = o.properties
-            hits.append({"text": p.get("text", ""), "source_path": p.get("source_path"), "page": p.get("page")})
-        return hits
+            hits.append({"text": p.get("text", ""), "source_path": p.get("source_path"), "page": p.get("page"),
+                         "score": 1.0 - (o.metadata.distance or 0.0), "vector": _object_vector(o)})
+    if RAG_DIVERSIFY:
+        hits = diversify(hits, top_k, key=lambda h: (h["source_path"], h["page"]))
+    hits = [{"text": h["text"], "source_path": h["source_path"], "page": h["page"]} for h in hits[:top_k]]
+    cache.put(query, filters, hits, vector=q_vec, generation=generation)
+    return hits
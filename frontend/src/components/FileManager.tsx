@@ -130,8 +130,12 @@ export function FileManager() {
           throw new Error(`Upload failed: ${res.status} ${text}`);
         }
         const data = await res.json();
-        console.log("✅ Upload OK:", data); // { saved: [...], ingested_chunks: N }
-        alert(`Ingested ${data.ingested_chunks} chunks into Weaviate`);
+        console.log("✅ Upload OK:", data); // { saved: [...], uploads: [...], job_id, status_url }
+        alert(
+          data.job_id
+            ? `Uploaded ${data.saved.length} file(s); ingest job ${data.job_id} queued`
+            : `Uploaded ${data.saved.length} file(s); already indexed`
+        );
       } catch (err) {
         console.error("❌ Upload error:", err);
         alert("Upload failed. Check server logs/CORS.");
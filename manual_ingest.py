@@ -1,16 +1,24 @@
 # manual_ingest.py — ensure schema + ingest uploads/ by default
-import os, re, sys, pathlib
-from typing import List, Dict
+import os, sys, time, pathlib, threading
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
-from openai import OpenAI
 import weaviate
-from weaviate.classes.config import Property, DataType, Configure
-from pypdf import PdfReader
+from weaviate.classes.config import Property, DataType, Configure, Tokenization
+from weaviate.classes.data import DataObject
+
+from db.ingest_manifest import load_manifest
+from db.weaviate_utils import (  # cached embeddings
+    check_collection_schema, delete_source_chunks, embed_texts, ingest_paths, reindex,
+)
+from db.chunking import iter_chunks
+from db.vectors import to_client
+from db.batch_writer import BatchWriter, INGEST_DEAD_LETTER
+from db.embed_client import EMBED_DIMENSIONS
+from db.query_cache import bump_index_generation
 
 load_dotenv()
 
 # === Config ===
-OAI = OpenAI()
 COLLECTION = os.getenv("DOC_COLLECTION", "JarvisDocs")
 UPLOADS_DIR = pathlib.Path(os.getenv("UPLOADS_DIR", "uploads"))
 
@@ -30,115 +38,120 @@ def connect():
     return weaviate.connect_to_local(host=url)
 
 def ensure_collection(client: weaviate.WeaviateClient):
-    names = [c.name for c in client.collections.list_all()]
-    if COLLECTION in names:
-        return client.collections.get(COLLECTION)
+    if client.collections.exists(COLLECTION):
+        col = client.collections.get(COLLECTION)
+        check_collection_schema(col)
+        return col
     print(f"[setup] Creating collection {COLLECTION} with BYO vectors...")
     return client.collections.create(
         name=COLLECTION,
         vectorizer_config=Configure.Vectorizer.none(),  # BYO vectors
         properties=[
             Property(name="text", data_type=DataType.TEXT),
-            Property(name="source_path", data_type=DataType.TEXT),
+            Property(name="source_path", data_type=DataType.TEXT, tokenization=Tokenization.FIELD),
             Property(name="page", data_type=DataType.INT),
+            Property(name="anchor", data_type=DataType.TEXT),
         ],
     )
 
 # === Helpers ===
-def chunk_text(text: str, size: int = 1000, overlap: int = 200) -> List[str]:
-    text = re.sub(r"\s+", " ", text).strip()
-    out, i = [], 0
-    while i < len(text):
-        end = min(len(text), i + size)
-        out.append(text[i:end])
-        i = max(0, end - overlap)
-    return out
-
-def embed_texts(texts: List[str]) -> List[List[float]]:
-    vecs: List[List[float]] = []
-    B = 64
-    for i in range(0, len(texts), B):
-        batch = texts[i:i+B]
-        res = OAI.embeddings.create(model="text-embedding-3-large", input=batch)
-        vecs.extend([d.embedding for d in res.data])
-    return vecs
-
-def read_md(path: str) -> str:
-    return pathlib.Path(path).read_text(encoding="utf-8", errors="ignore")
-
-def read_pdf_pages(path: str) -> List[Dict]:
-    reader = PdfReader(path)
-    out = []
-    for idx, page in enumerate(reader.pages, start=1):
-        txt = page.extract_text() or ""
-        if txt.strip():
-            out.append({"text": txt, "page": idx})
-    return out
-
-def insert_chunks(chunks: List[Dict]) -> int:
-    """Insert [{text, source_path, page?}] with BYO vectors into COLLECTION."""
-    if not chunks:
+def insert_chunks(chunks: List[Dict], stale: Optional[Dict[str, List[str]]] = None) -> int:
+    """
+    Insert [{text, source_path, page?, uuid?}] with BYO vectors into COLLECTION.
+    `stale` maps source_path -> chunk ids to delete first (same connection).
+    """
+    if not chunks and not stale:
         return 0
     texts = [c["text"] for c in chunks]
-    vectors = embed_texts(texts)
+    vectors = embed_texts(texts)   # (n, dims) array
     with connect() as client:
         col = ensure_collection(client)
-        B = 128
-        total = 0
-        for i in range(0, len(chunks), B):
-            batch = chunks[i:i+B]
-            props_batch = []
-            for c in batch:
+        for source_path, ids in (stale or {}).items():
+            if ids:
+                delete_source_chunks(col, source_path, ids)
+                print(f"[delete] {len(ids)} stale chunks from {source_path}")
+        if not chunks:
+            return 0
+        with BatchWriter(col) as writer:   # byte-sized batches, failed objects retried / dead-lettered
+            for c, vec in zip(chunks, vectors):
                 props = {"text": c["text"], "source_path": c.get("source_path")}
-                if c.get("page") is not None:
-                    props["page"] = c["page"]
-                props_batch.append(props)
-            col.data.insert_many(properties=props_batch, vectors=vectors[i:i+B])
-            total += len(props_batch)
-
-        # quick sample fetch to verify visibility
-        try:
-            res = col.query.near_text(
-                query="test",
-                limit=1,
-                return_properties=["text", "source_path", "page"]
-            )
-            if res.objects:
-                p = res.objects[0].properties
-                print(f"[verify] sample object: source={p.get('source_path')} page={p.get('page')}")
-        except Exception:
-            pass
-
+                for key in ("page", "anchor"):
+                    if c.get(key) is not None:
+                        props[key] = c[key]
+                writer.add(DataObject(properties=props, vector=to_client(vec), uuid=c.get("uuid")))
+        bump_index_generation(COLLECTION)   # invalidate cached search results
+        t = writer.throughput()
+        total = int(t["written"])
+        print(f"[write] {total} chunks, {t['objects_per_s']:.1f} chunks/s, {t['dead_lettered']:.0f} failed")
         return total
 
 def ingest_text(text: str, source_path: str = "manual://input", page: int | None = None) -> int:
-    chunks = [{"text": t, "source_path": source_path, "page": page} for t in chunk_text(text)]
+    anchor = f"page {page}" if page is not None else None
+    chunks = [
+        {"text": ch["text"], "source_path": source_path, "page": page, "anchor": ch["anchor"]}
+        for ch in iter_chunks(text, anchor=anchor)
+    ]
     return insert_chunks(chunks)
 
+class BulkProgress:
+    """Thread-safe progress counters for ingest_paths, printed at most every `every` seconds."""
+
+    def __init__(self, every: float = 2.0):
+        self.every = every
+        self.counts: Dict[str, int] = {}
+        self.started = self.last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __call__(self, counter: str, n: int) -> None:
+        with self._lock:
+            self.counts[counter] = self.counts.get(counter, 0) + n
+            now = time.monotonic()
+            if now - self.last < self.every:
+                return
+            self.last = now
+        self.report()
+
+    def report(self) -> None:
+        with self._lock:
+            c = dict(self.counts)
+            elapsed = max(time.monotonic() - self.started, 1e-9)
+        written = c.get("chunks_written", 0)
+        print(
+            f"[bulk] files {c.get('files', 0)} (+{c.get('files_skipped', 0)} unchanged), "
+            f"embedded {c.get('chunks_embedded', 0)}, written {written}, deleted {c.get('chunks_deleted', 0)} "
+            f"| {written / elapsed:.1f} chunks/s, {elapsed:.0f}s"
+        )
+        if c.get("write_retries") or c.get("chunks_failed"):
+            print(f"[write] {c.get('write_retries', 0)} retried, {c.get('chunks_failed', 0)} failed "
+                  f"(see {INGEST_DEAD_LETTER})")
+        dups = c.get("chunks_deduplicated", 0)
+        if dups or c.get("boilerplate_lines"):
+            # each skipped duplicate saves one embedding plus its stored vector and text
+            saved = dups * (EMBED_DIMENSIONS or 3072) * 4 + c.get("dedup_bytes", 0)
+            print(
+                f"[dedup] {dups} near-duplicate chunks not embedded (~{saved / 2**20:.1f} MiB not stored), "
+                f"{c.get('boilerplate_lines', 0)} PDF header/footer lines stripped"
+            )
+
+def ingest_bulk(path: str) -> int:
+    """
+    Ingest a file or whole directory over one connection and one parse -> embed -> insert pipeline,
+    batching chunks across files. Progress is checkpointed to the manifest as files
+    complete, so re-running after a crash picks up where it stopped.
+    """
+    progress = BulkProgress()
+    n = ingest_paths([path], progress)
+    progress.report()
+    return n
+
 def ingest_path(path: str) -> int:
+    """Ingest a file or directory (a deleted path drops its chunks) through ingest_bulk."""
     p = pathlib.Path(path)
-    if not p.exists():
+    if p.is_file() and p.suffix.lower() not in (".md", ".pdf"):
+        raise ValueError("Only .md and .pdf are supported")
+    if not p.exists() and not load_manifest().chunk_ids(str(p)):
         raise FileNotFoundError(path)
-
-    if p.is_dir():
-        total = 0
-        for sub in p.rglob("*"):
-            if sub.suffix.lower() == ".md":
-                total += ingest_text(read_md(str(sub)), source_path=str(sub))
-            elif sub.suffix.lower() == ".pdf":
-                for pg in read_pdf_pages(str(sub)):
-                    total += ingest_text(pg["text"], source_path=str(sub), page=pg["page"])
-        return total
-
-    if p.suffix.lower() == ".md":
-        return ingest_text(read_md(str(p)), source_path=str(p))
-    if p.suffix.lower() == ".pdf":
-        total = 0
-        for pg in read_pdf_pages(str(p)):
-            total += ingest_text(pg["text"], source_path=str(p), page=pg["page"])
-        return total
-
-    raise ValueError("Only .md and .pdf are supported")
+    return ingest_bulk(str(p))
 
 # === CLI ===
 if __name__ == "__main__":
@@ -151,6 +164,16 @@ if __name__ == "__main__":
         print(f"Ingested {n} chunks from folder: {target}")
         sys.exit(0)
 
+    if sys.argv[1] == "--reindex":
+        # rebuild the collection with the current schema (source_path field tokenization, anchors)
+        target = pathlib.Path(sys.argv[2]) if len(sys.argv) > 2 else UPLOADS_DIR
+        if not target.exists():
+            print(f"Path not found: {target.resolve()}")
+            sys.exit(1)
+        n = reindex([str(target)], BulkProgress())
+        print(f"Rebuilt {COLLECTION}: {n} chunks from {target}")
+        sys.exit(0)
+
     if sys.argv[1] == "--text":
         text = " ".join(sys.argv[2:]) or "Hello from manual ingest."
         n = ingest_text(text, source_path="manual://cli")
@@ -164,11 +187,3 @@ if __name__ == "__main__":
     n = ingest_path(str(target))
     msg = "folder" if target.is_dir() else "file"
     print(f"Ingested {n} chunks from {msg}: {target}")
-
-import os, weaviate
-from weaviate.classes.config import Property, DataType, Configure
-
-url=os.getenv("WEAVIATE_URL"); key=os.getenv("WEAVIATE_API_KEY")
-client = weaviate.connect_to_wcs(cluster_url=url, auth_credentials=weaviate.auth.AuthApiKey(key))
-print([c.name for c in client.collections.list_all()])  # should list your collections
-client.close()
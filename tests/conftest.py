@@ -0,0 +1,52 @@
+import os
+import sys
+import tempfile
+import zlib
+
+import numpy as np
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "backend", "python-services", "rag-service"))
+sys.path.append(os.path.join(ROOT, "backend", "python-services", "gateway"))
+
+# every on-disk index and cache the code under test opens by default lives in one scratch dir
+_STATE = tempfile.mkdtemp(prefix="jarvis-tests-")
+os.environ.update({
+    "EMBED_CACHE_PATH": os.path.join(_STATE, "embed_cache.sqlite3"),
+    "INGEST_MANIFEST": os.path.join(_STATE, "ingest_manifest.json"),
+    "INGEST_DEAD_LETTER": os.path.join(_STATE, "dead_letter.jsonl"),
+    "INDEX_GENERATION_DIR": os.path.join(_STATE, "index_generations"),
+    "RAG_BM25_PATH": os.path.join(_STATE, "bm25.jsonl"),
+    "RAG_VECTOR_INDEX_PATH": os.path.join(_STATE, "vectors"),
+})
+
+
+def bag_of_words(texts, dims=64):
+    """Deterministic stand-in for query / chunk embeddings: hashed word counts."""
+    out = []
+    for t in texts:
+        v = np.zeros(dims, np.float32)
+        for w in t.lower().split():
+            v[zlib.crc32(w.encode()) % dims] += 1
+        out.append(v.tolist())
+    return out
+
+
+@pytest.fixture(scope="session")
+def rag():
+    """The rag-service app on the local vector backend (no Weaviate), embedding with bag_of_words."""
+    from benchmarks.fakes import install_v3_module
+
+    real = {k: m for k, m in sys.modules.items() if k == "weaviate" or k.startswith("weaviate.")}
+    os.environ["RAG_VECTOR_BACKEND"] = "local"
+    install_v3_module(0.0)
+    try:
+        import main
+    finally:
+        for k in [k for k in sys.modules if k == "weaviate" or k.startswith("weaviate.")]:
+            del sys.modules[k]
+        sys.modules.update(real)
+    main._embed_queries = bag_of_words
+    return main
@@ -0,0 +1,108 @@
+import json
+import threading
+from types import SimpleNamespace
+
+from weaviate.classes.data import DataObject
+
+from db.batch_writer import BatchWriter, is_transient, payload_bytes
+
+
+class FlakyCollection:
+    """insert_many that fails chosen objects (by text) a set number of times with a given message."""
+
+    def __init__(self, failures=None, raise_times=0):
+        self.failures = dict(failures or {})   # text -> [remaining failures, message]
+        self.raise_times = raise_times
+        self.written = {}
+        self.batch_sizes = []
+        self.lock = threading.Lock()
+        self.data = self
+
+    def insert_many(self, objs):
+        with self.lock:
+            self.batch_sizes.append(len(objs))
+            if self.raise_times:
+                self.raise_times -= 1
+                raise ConnectionError("connection reset by peer")
+            errors = {}
+            for i, o in enumerate(objs):
+                f = self.failures.get(o.properties["text"])
+                if f and f[0] > 0:
+                    f[0] -= 1
+                    errors[i] = SimpleNamespace(message=f[1])
+                else:
+                    self.written[o.properties["text"]] = o
+        return SimpleNamespace(errors=errors)
+
+
+def obj(text, source="a.md"):
+    return DataObject(properties={"text": text, "source_path": source}, vector=[0.0] * 4)
+
+
+def writer(col, tmp_path, **kw):
+    kw.setdefault("backoff", 0.001)
+    return BatchWriter(col, dead_letter=str(tmp_path / "dead.jsonl"), **kw)
+
+
+def test_transient_classification():
+    assert is_transient("503 Service Unavailable") and is_transient("read timed out")
+    assert not is_transient("invalid property 'foo'")
+
+
+def test_batches_split_by_objects_and_bytes(tmp_path):
+    col = FlakyCollection()
+    with writer(col, tmp_path, max_objects=3) as w:
+        for i in range(10):
+            w.add(obj(f"t{i}"))
+    assert sorted(col.batch_sizes) == [1, 3, 3, 3]
+
+    col = FlakyCollection()
+    size = payload_bytes(obj("t0"))
+    with writer(col, tmp_path, max_bytes=size * 2) as w:
+        for i in range(6):
+            w.add(obj(f"t{i}"))
+    assert col.batch_sizes == [2, 2, 2]
+
+
+def test_only_failed_objects_are_retried(tmp_path):
+    col = FlakyCollection({"t3": [2, "429 Too Many Requests"]})
+    with writer(col, tmp_path) as w:
+        for i in range(5):
+            w.add(obj(f"t{i}"))
+    assert set(col.written) == {f"t{i}" for i in range(5)}
+    assert col.batch_sizes == [5, 1, 1]
+    assert w.throughput()["retries"] == 2 and not w.failed_tags
+
+
+def test_failed_request_is_retried_whole(tmp_path):
+    col = FlakyCollection(raise_times=1)
+    with writer(col, tmp_path) as w:
+        w.add(obj("t0"))
+        w.add(obj("t1"))
+    assert set(col.written) == {"t0", "t1"}
+
+
+def test_permanent_and_exhausted_failures_are_dead_lettered(tmp_path):
+    col = FlakyCollection({"bad": [1, "invalid property"], "slow": [99, "503 unavailable"]})
+    with writer(col, tmp_path, max_retries=2) as w:
+        w.add(obj("ok", "a.md"))
+        w.add(obj("bad", "b.md"), tag="b.md")
+        w.add(obj("slow", "c.md"), tag="c.md")
+    assert set(col.written) == {"ok"}
+    assert w.failed_tags == {"b.md", "c.md"}
+    rows = {r["text"]: r for r in map(json.loads, (tmp_path / "dead.jsonl").read_text().splitlines())}
+    assert rows["bad"]["attempts"] == 1 and rows["bad"]["source_path"] == "b.md"
+    assert rows["slow"]["attempts"] == 3 and "503" in rows["slow"]["error"]
+
+
+def test_after_fires_once_earlier_objects_settle(tmp_path):
+    col = FlakyCollection({"t1": [1, "timeout"]})
+    fired = []
+    with writer(col, tmp_path, max_objects=1) as w:
+        w.add(obj("t0"))
+        w.add(obj("t1"))
+        w.after(lambda: fired.append(("first", set(col.written))))
+        w.add(obj("t2"))
+        w.after(lambda: fired.append(("second", set(col.written))))
+    assert [name for name, _ in fired] == ["first", "second"]
+    assert {"t0", "t1"} <= fired[0][1]
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+from weaviate.classes.data import DataObject
+from weaviate.classes.query import Filter
+
+import db.weaviate_utils as wu
+from benchmarks.fakes import InMemoryClient, fake_embed_matrix
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_fake_embeddings_are_deterministic_unit_vectors():
+    a = fake_embed_matrix(["hello", "world"], dims=16)
+    np.testing.assert_array_equal(a, fake_embed_matrix(["hello", "world"], dims=16))
+    np.testing.assert_allclose(np.linalg.norm(a, axis=1), 1.0, rtol=1e-5)
+    assert not np.allclose(a[0], a[1])
+
+
+def test_in_memory_collection_applies_filters():
+    client = InMemoryClient()
+    col = client.collection("Docs")
+    ids = ["00000000-0000-0000-0000-000000000001", "00000000-0000-0000-0000-000000000002"]
+    col.data.insert_many([
+        DataObject(properties={"text": "a", "source_path": "x/a.md", "page": 1}, vector=[1.0, 0.0], uuid=ids[0]),
+        DataObject(properties={"text": "b", "source_path": "y/b.pdf", "page": 2}, vector=[0.0, 1.0], uuid=ids[1]),
+    ])
+
+    def texts(flt):
+        return [o.properties["text"] for o in col.query.fetch_objects(filters=flt).objects]
+
+    assert texts(Filter.by_property("source_path").equal("x/a.md")) == ["a"]
+    assert texts(Filter.by_property("source_path").like("*.pdf")) == ["b"]
+    assert texts(Filter.by_property("page").greater_than(1)) == ["b"]
+    assert sorted(texts(Filter.by_property("page").equal(1) | Filter.by_property("page").equal(2))) == ["a", "b"]
+    assert texts(Filter.by_property("page").equal(1) & Filter.by_property("text").equal("b")) == []
+    assert texts(Filter.by_id().contains_any([ids[1]])) == ["b"]
+
+    hit = col.query.near_vector([0.9, 0.1], limit=1).objects[0]
+    assert hit.properties["text"] == "a" and hit.metadata.distance < 0.1
+
+    col.data.delete_many(where=Filter.by_property("source_path").equal("x/a.md"))
+    assert len(col) == 1
+
+
+def test_ensure_collection_reuses_an_existing_collection():
+    client = InMemoryClient()
+    created = []
+    client.collections.create = lambda name, **kw: created.append(name) or client.collection(name)
+    first = wu.ensure_collection(client)
+    second = wu.ensure_collection(client)
+    assert created == [wu.COLLECTION] and first is second
+
+
+def test_bench_ingest_runs_end_to_end(tmp_path):
+    out = tmp_path / "result.json"
+    subprocess.run(
+        [sys.executable, os.path.join(ROOT, "benchmarks", "bench_ingest.py"), "--markdown", "5", "--pdf", "1",
+         "--pdf-pages", "3", "--dims", "16", "--rerun", "--json", str(out)],
+        check=True, capture_output=True, text=True, timeout=120,
+    )
+    result = json.loads(out.read_text())
+    assert result["chunks"] > 0 and result["insert_requests"] > 0
+    assert set(result["stages_s"]) == {"parse", "chunk", "dedup", "embed", "insert"}
+    assert "rerun_s" in result
@@ -0,0 +1,81 @@
+import base64
+import re
+
+import pytest
+
+from db import chunking
+from db.chunking import iter_chunks
+from db.embed_client import count_tokens
+
+
+def sentences(n, word="alpha"):
+    return " ".join(f"{word} sentence number {i} ends here." for i in range(n))
+
+
+def test_anchor_follows_the_heading_path():
+    text = "# Trip\n\nIntro line.\n\n## Flights\n\nLeave at nine.\n\n## Hotels\n\nCheck in at three.\n\n# Other\n\nMisc."
+    chunks = list(iter_chunks(text, max_tokens=200))
+    assert [c["anchor"] for c in chunks] == ["Trip", "Trip > Flights", "Trip > Hotels", "Other"]
+    assert chunks[1]["text"] == "## Flights\n\nLeave at nine."
+
+
+def test_caller_anchor_is_used_without_headings():
+    assert [c["anchor"] for c in iter_chunks("Just text.", anchor="page 3")] == ["page 3"]
+
+
+def test_chunks_respect_the_token_budget():
+    chunks = list(iter_chunks(sentences(200), max_tokens=60, overlap_tokens=15))
+    assert len(chunks) > 5
+    assert all(c["tokens"] <= 60 for c in chunks)
+    assert all(count_tokens(c["text"]) <= 60 for c in chunks)
+
+
+def test_overlap_carries_trailing_sentences():
+    chunks = list(iter_chunks(sentences(40), max_tokens=60, overlap_tokens=15))
+    for prev, nxt in zip(chunks, chunks[1:]):
+        last = prev["text"].rsplit(". ", 1)[-1]
+        assert nxt["text"].startswith(last.rstrip("."))
+
+
+def test_no_overlap_covers_every_sentence_once():
+    text = sentences(40)
+    chunks = list(iter_chunks(text, max_tokens=60, overlap_tokens=0))
+    assert " ".join(c["text"] for c in chunks) == text
+
+
+def test_paragraph_that_fits_is_not_split():
+    first, second = sentences(6, "first"), sentences(6, "second")
+    chunks = list(iter_chunks(f"{first}\n\n{second}", max_tokens=count_tokens(second) + 5, overlap_tokens=0))
+    assert second in [c["text"] for c in chunks]
+
+
+def test_over_long_sentence_and_word_are_cut():
+    long_sentence = " ".join(["word"] * 500)
+    blob = "x" * 2000
+    chunks = list(iter_chunks(f"{long_sentence}\n\n{blob}", max_tokens=50, overlap_tokens=0))
+    assert all(c["tokens"] <= 50 for c in chunks)
+    assert "".join(c["text"] for c in chunks if c["text"].startswith("x")) == blob
+
+
+def test_fenced_code_keeps_its_lines():
+    text = "Intro.\n\n```\ndef f():\n    return 1\n```\n\nOutro."
+    body = "\n".join(c["text"] for c in iter_chunks(text, max_tokens=200))
+    assert "```\ndef f():\n    return 1\n```" in body
+
+
+def dense_tokens(text):
+    """A tokenizer far denser than 4 chars/token: one token per non-space character."""
+    return len(re.findall(r"\S", text))
+
+
+@pytest.mark.parametrize("run", [
+    "https://example.com/" + "/".join(f"segment{i}?q={i}" for i in range(60)),
+    base64.b64encode(bytes(range(256)) * 3).decode(),
+    "東京都の天気予報によると明日は晴れのち曇りで最高気温は二十五度の見込みです。" * 12,
+], ids=["url", "base64", "cjk"])
+def test_runs_without_whitespace_stay_within_budget_for_dense_tokenizers(monkeypatch, run):
+    monkeypatch.setattr(chunking, "count_tokens", dense_tokens)
+    text = f"Intro sentence here. {run} Outro sentence."
+    chunks = list(iter_chunks(text, max_tokens=50, overlap_tokens=0))
+    assert all(dense_tokens(c["text"]) <= 50 for c in chunks)
+    assert "".join("".join(c["text"].split()) for c in chunks) == "".join(text.split())
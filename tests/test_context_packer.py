@@ -0,0 +1,41 @@
+import context_packer
+from context_packer import ContextPacker, short_source, truncate_to_tokens
+from db import embed_client
+
+
+def test_uses_the_ingest_tokenizer():
+    assert context_packer.count_tokens is embed_client.count_tokens
+
+
+def test_truncate_keeps_whole_sentences():
+    text = "First sentence here. Second one follows! Third is the longest sentence of them all."
+    two = embed_client.count_tokens("First sentence here.") + 1 + embed_client.count_tokens("Second one follows!")
+    cut = truncate_to_tokens(text, two)
+    assert cut == "First sentence here. Second one follows!"
+    assert truncate_to_tokens(text, 1000) == text
+
+
+def test_truncate_cuts_a_long_sentence_at_a_word():
+    cut = truncate_to_tokens("word " * 200, 20)
+    assert cut.endswith(" …") and embed_client.count_tokens(cut) <= 20
+
+
+def test_pack_fits_budget_and_groups_by_source():
+    chunks = [
+        {"path": "/home/u/notes/trip.md", "anchor": "Flights", "text": "Outbound on the 14th. " * 30, "score": 0.9},
+        {"path": "/home/u/inbox/receipt.pdf", "anchor": "page 2", "text": "Total 412.50 EUR. " * 30, "score": 0.8},
+        {"path": "/home/u/notes/trip.md", "anchor": "Hotels", "text": "Check-in after 3pm. " * 30, "score": 0.7},
+    ]
+    packer = ContextPacker(budget_tokens=200, chunk_tokens=60)
+    out = packer.pack(chunks)
+    assert out["tokens"] <= 200
+    assert out["sources"] == ["/home/u/notes/trip.md", "/home/u/inbox/receipt.pdf"]
+    assert out["text"].startswith("[1] notes/trip.md\n- (Flights) Outbound")
+    assert "[2] inbox/receipt.pdf" in out["text"]
+    assert out["chunks_truncated"] == out["chunks_used"]
+    assert packer.stats()["tokens_saved"] == out["tokens_saved"] > 0
+
+
+def test_short_source():
+    assert short_source("C:\\Users\\me\\notes\\a.md") == "notes/a.md"
+    assert short_source("") == "unknown source"
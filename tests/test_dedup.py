@@ -0,0 +1,57 @@
+from db.dedup import SimHashIndex, simhash, strip_boilerplate
+
+TEXT = ("The quarterly report shows revenue grew in every region while operating costs "
+        "stayed flat, driven mostly by the new subscription tier launched in spring.")
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def test_simhash_is_stable_and_ignores_case_and_punctuation():
+    assert simhash(TEXT) == simhash(TEXT.upper().replace(",", ""))
+    assert simhash("") == 0
+
+
+def test_small_edit_is_near_unrelated_text_is_far():
+    edited = TEXT.replace("spring", "the spring")
+    other = "Bicycles need regular chain maintenance, fresh brake pads and correctly inflated tyres."
+    assert distance(simhash(TEXT), simhash(edited)) < distance(simhash(TEXT), simhash(other))
+    assert distance(simhash(TEXT), simhash(other)) > 3
+
+
+def test_index_finds_within_distance_only():
+    index = SimHashIndex(max_distance=3)
+    index.add(0b1011 << 40, "a")
+    assert index.find((0b1011 << 40) ^ 0b111) == "a"            # 3 bits apart
+    assert index.find((0b1011 << 40) ^ 0b1111) is None          # 4 bits apart
+    assert index.find(0b1011 << 40 ^ (1 << 63) ^ 1) == "a"      # flips in different blocks
+
+
+def test_index_remove_and_re_add():
+    index = SimHashIndex(max_distance=2)
+    index.add(123, "a")
+    index.add(123, "b")
+    index.remove("a")
+    assert index.find(123) == "b" and len(index) == 1
+    index.add(1 << 60, "b")       # re-adding a key moves it
+    assert index.find(123) is None and index.find(1 << 60) == "b"
+    index.remove("missing")
+
+
+def page(n, body):
+    return {"page": n, "text": f"ACME Corp confidential\n{body}\nmore body text on page {n}\nPage {n} of 5"}
+
+
+def test_strip_boilerplate_drops_repeated_headers_and_footers():
+    pages = [page(n, f"Unique content {n}") for n in range(1, 6)]
+    out, removed = strip_boilerplate(pages)
+    assert removed == 10
+    assert [p["page"] for p in out] == [1, 2, 3, 4, 5]
+    assert all("ACME" not in p["text"] and "of 5" not in p["text"] for p in out)
+    assert "Unique content 3" in out[2]["text"]
+
+
+def test_strip_boilerplate_leaves_short_files_alone():
+    pages = [page(n, "x") for n in range(1, 3)]
+    assert strip_boilerplate(pages) == (pages, 0)
@@ -0,0 +1,60 @@
+import numpy as np
+
+from db.diversify import diversify, merge_overlapping, merge_texts, mmr_select, text_overlap
+
+A = "The quick brown fox jumps over the lazy dog near the river bank at dawn."
+B = "over the lazy dog near the river bank at dawn. Then it ran into the woods."
+
+
+def test_text_overlap_finds_the_shared_tail():
+    n = text_overlap(A, B, min_overlap=10)
+    assert A[-n:] == B[:n] == "over the lazy dog near the river bank at dawn."
+    assert text_overlap(A, "completely different text here", min_overlap=10) == 0
+    assert text_overlap("short", "short", min_overlap=10) == 0
+
+
+def test_merge_texts_either_order_and_containment():
+    merged = "The quick brown fox jumps over the lazy dog near the river bank at dawn. Then it ran into the woods."
+    assert merge_texts(A, B, 10) == merged
+    assert merge_texts(B, A, 10) == merged
+    assert merge_texts(A, "lazy dog", 10) == A
+    assert merge_texts(A, "Something unrelated entirely.", 10) is None
+
+
+def test_merge_overlapping_keeps_best_score_and_groups_by_key():
+    hits = [
+        {"text": B, "score": 0.9, "vector": [1, 0], "path": "a.md"},
+        {"text": "Unrelated passage about tea leaves.", "score": 0.8, "vector": [0, 1], "path": "a.md"},
+        {"text": A, "score": 0.7, "vector": [1, 1], "path": "a.md"},
+        {"text": A, "score": 0.6, "vector": [1, 1], "path": "b.md"},   # other file: not merged
+    ]
+    out = merge_overlapping(hits, key=lambda h: h["path"], min_overlap=10)
+    assert [(p["path"], p["merged"], p["score"]) for p in out] == [("a.md", 2, 0.9), ("a.md", 1, 0.8), ("b.md", 1, 0.6)]
+    assert out[0]["text"].startswith("The quick") and out[0]["text"].endswith("woods.")
+    assert np.isclose(np.linalg.norm(out[0]["vector"]), 1.0)
+
+
+def test_merge_respects_max_chars():
+    hits = [{"text": A, "score": 1.0}, {"text": B, "score": 0.5}]
+    assert len(merge_overlapping(hits, key=lambda h: 0, min_overlap=10, max_chars=len(A))) == 2
+
+
+def test_mmr_skips_near_duplicates():
+    v = [np.array([1.0, 0.0]), np.array([0.99, 0.141]), np.array([0.0, 1.0])]
+    assert mmr_select([0.9, 0.89, 0.5], v, 2, lambda_=1.0) == [0, 1]
+    assert mmr_select([0.9, 0.89, 0.5], v, 2, lambda_=0.5) == [0, 2]
+
+
+def test_mmr_edge_cases():
+    assert mmr_select([], [], 3) == []
+    assert mmr_select([0.3], [None], 3) == [0]
+    assert mmr_select([0.2, 0.9], [None, None], 2) == [1, 0]
+
+
+def test_diversify_returns_k_passages_without_vectors():
+    hits = [{"text": f"passage number {i} " * 3, "score": 1 - i / 10, "vector": [1, i], "path": "a.md"}
+            for i in range(6)]
+    out = diversify(hits, 3, key=lambda h: h["path"], min_overlap=10)
+    assert len(out) == 3
+    assert all("vector" not in p and p["merged"] == 1 for p in out)
+    assert out[0]["score"] == 1.0
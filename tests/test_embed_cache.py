@@ -0,0 +1,57 @@
+import numpy as np
+
+from db.embed_cache import EmbeddingCache, text_key
+
+
+def vec(value, dims=4):
+    return np.full(dims, value, dtype=np.float32)
+
+
+def stored_bytes(cache):
+    return cache._db.execute("SELECT COALESCE(SUM(LENGTH(vec)), 0) FROM embeddings").fetchone()[0]
+
+
+def test_replacing_a_key_does_not_inflate_byte_count(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"))
+    cache.put_many("m", 4, {"a": vec(1), "b": vec(2)})
+    cache.put_many("m", 4, {"a": vec(3)})
+    assert cache.stats()["bytes"] == stored_bytes(cache) == 2 * 4 * 4
+
+
+def test_reputting_keys_never_evicts(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"), max_bytes=3 * 16)
+    for _ in range(10):
+        cache.put_many("m", 4, {"a": vec(1), "b": vec(2)})
+    assert set(cache.get_many("m", 4, ["a", "b"])) == {"a", "b"}
+
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"), max_bytes=3 * 16, memory_items=0)
+    cache.put_many("m", 4, {"a": vec(1)})
+    cache.put_many("m", 4, {"b": vec(2)})
+    cache.get_many("m", 4, ["a"])
+    cache.put_many("m", 4, {"c": vec(3), "d": vec(4)})
+    assert cache.stats()["bytes"] == stored_bytes(cache) <= 3 * 16
+    assert "b" not in cache.get_many("m", 4, ["b"])
+
+
+def test_get_or_embed_calls_embedder_once_per_new_text(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "c.sqlite3"), dtype="float16")
+    calls = []
+
+    def embed(texts):
+        calls.append(list(texts))
+        return [vec(len(t)) for t in texts]
+
+    out = cache.get_or_embed(["ab", "abc", "ab"], embed, "m", 4)
+    again = cache.get_or_embed(["abc", "abcd"], embed, "m", 4)
+    assert calls == [["ab", "abc"], ["abcd"]]
+    assert out.shape == (3, 4) and out[0][0] == 2 and out[1][0] == 3
+    assert again[1][0] == 4
+    assert cache.get_many("m", 4, [text_key("ab")])
+
+
+def test_byte_count_reloads_from_disk(tmp_path):
+    path = str(tmp_path / "c.sqlite3")
+    EmbeddingCache(path).put_many("m", 4, {"a": vec(1), "b": vec(2)})
+    assert EmbeddingCache(path).stats()["bytes"] == 32
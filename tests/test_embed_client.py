@@ -0,0 +1,78 @@
+import base64
+import threading
+import time
+from types import SimpleNamespace
+
+import httpx
+import numpy as np
+import openai
+
+from db.embed_client import EmbeddingClient, TokenBucket
+
+
+class FakeEmbeddings:
+    """embeddings.create that encodes len(text) into every vector; fails the first `fail` calls with a 429."""
+
+    def __init__(self, dims=3, fail=0):
+        self.dims, self.fail, self.calls = dims, fail, []
+        self._lock = threading.Lock()
+
+    def create(self, model, input, encoding_format, **extra):
+        with self._lock:
+            self.calls.append(list(input))
+            if self.fail:
+                self.fail -= 1
+                response = httpx.Response(429, headers={"retry-after": "0"},
+                                          request=httpx.Request("POST", "http://fake/v1/embeddings"))
+                raise openai.RateLimitError("rate limited", response=response, body=None)
+        data = [
+            SimpleNamespace(index=i, embedding=base64.b64encode(np.full(self.dims, len(t), "<f4").tobytes()).decode())
+            for i, t in reversed(list(enumerate(input)))
+        ]
+        return SimpleNamespace(data=data)
+
+
+def client_with(fake, **kw):
+    return EmbeddingClient(client=SimpleNamespace(embeddings=fake), dtype="float32", **kw)
+
+
+def test_zero_rate_means_unlimited():
+    bucket = TokenBucket(0)
+    t0 = time.monotonic()
+    for _ in range(1000):
+        bucket.acquire(50)
+    bucket.drain()
+    bucket.acquire(1)
+    assert time.monotonic() - t0 < 0.5
+
+
+def test_bucket_refuses_more_than_capacity_then_refills():
+    bucket = TokenBucket(600)   # 10 per second
+    bucket.acquire(600)
+    t0 = time.monotonic()
+    bucket.acquire(2)
+    assert 0.1 < time.monotonic() - t0 < 1.0
+
+
+def test_embed_keeps_input_order_across_batches():
+    fake = FakeEmbeddings()
+    client = client_with(fake, batch_items=2, rpm=0, tpm=0)
+    texts = ["a", "bb", "ccc", "dddd", "eeeee"]
+    out = client.embed(texts)
+    assert out.shape == (5, 3)
+    assert out[:, 0].tolist() == [1, 2, 3, 4, 5]
+    assert sorted(len(c) for c in fake.calls) == [1, 2, 2]
+
+
+def test_batches_respect_token_budget():
+    client = client_with(FakeEmbeddings(), batch_tokens=10)
+    texts = ["one two three four five six"] * 3   # 6 tokens each (7 by the chars/4 estimate)
+    assert [len(b) for b in client.batches(texts)] == [1, 1, 1]
+
+
+def test_rate_limited_request_is_retried():
+    fake = FakeEmbeddings(fail=2)
+    client = client_with(fake)
+    out = client.embed(["hello"])
+    assert out[0, 0] == 5
+    assert client.stats["rate_limited"] == 2 and client.stats["retries"] == 2
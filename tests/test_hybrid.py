@@ -0,0 +1,122 @@
+import pytest
+
+from db.hybrid import BM25Index, fuse, rrf_fuse, relative_score_fuse, tokenize
+from db.path_filters import filter_keys, path_keys
+
+
+def doc(i, text, path=None):
+    return {"id": f"d{i}", "text": text, "path": path or f"/notes/{i}.md"}
+
+
+def test_tokenize_matches_word_tokenization():
+    assert tokenize("Q3 Planning: deadline-moved!") == ["q3", "planning", "deadline", "moved"]
+
+
+def test_tokenize_keeps_non_ascii_letters():
+    assert tokenize("Överföring av filer, snake_case och 東京") == ["överföring", "av", "filer", "snake", "case", "och", "東京"]
+
+
+def test_non_ascii_query_finds_its_document():
+    index = BM25Index(path=None)
+    index.add({"id": "sv", "text": "Överföringen till banken är klar"})
+    index.add({"id": "en", "text": "The transfer to the bank is done"})
+    assert [i for i, _ in index.search("överföringen", 5)] == ["sv"]
+    assert [i for i, _ in index.search("BANKEN", 5)] == ["sv"]
+
+
+def test_bm25_ranks_rarer_terms_higher(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.jsonl"))
+    index.add_many([doc(0, "planning meeting notes"), doc(1, "planning deadline"), doc(2, "lunch menu")])
+    hits = index.search("deadline planning", 3)
+    assert [h[0] for h in hits] == ["d1", "d0"]
+    assert index.search("nothing matches", 3) == []
+
+
+def test_bm25_where_filters_stored_documents(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.jsonl"))
+    index.add_many([doc(0, "deadline", "/work/a.md"), doc(1, "deadline", "/home/b.md")])
+    hits = index.search("deadline", 5, where=lambda d: d["path"].startswith("/home/"))
+    assert [h[0] for h in hits] == ["d1"]
+
+
+def test_bm25_replays_adds_replacements_and_deletes(tmp_path):
+    path = str(tmp_path / "bm25.jsonl")
+    index = BM25Index(path)
+    index.add_many([doc(0, "alpha beta"), doc(1, "gamma")])
+    index.add(doc(0, "delta"))
+    index.remove("d1")
+    with open(path, "a") as f:
+        f.write('{"op": "add", "id": "torn')   # a crash mid-append
+
+    again = BM25Index(path)
+    assert len(again) == 1
+    assert again.get("d0")["text"] == "delta"
+    assert again.search("alpha", 5) == [] and again.search("gamma", 5) == []
+    assert [h[0] for h in again.search("delta", 5)] == ["d0"]
+
+
+def test_bm25_compacts_a_log_of_mostly_tombstones(tmp_path):
+    path = tmp_path / "bm25.jsonl"
+    index = BM25Index(str(path))
+    index.add_many(doc(i, f"word{i}") for i in range(2100))
+    for i in range(2000):
+        index.remove(f"d{i}")
+    assert sum(1 for _ in open(path)) == 4100
+
+    again = BM25Index(str(path))
+    assert len(again) == 100
+    assert sum(1 for _ in open(path)) == 100
+    assert [h[0] for h in again.search("word2050", 5)] == ["d2050"]
+
+
+def test_rrf_scores_top_of_both_lists_as_one():
+    fused = rrf_fuse([("a", 0.9), ("b", 0.8)], [("a", 7.0), ("c", 3.0)], alpha=0.5)
+    assert fused[0] == ("a", pytest.approx(1.0))
+    assert {d for d, _ in fused} == {"a", "b", "c"}
+
+
+def test_relative_fusion_weighs_sides_by_alpha():
+    vector, keyword = [("v", 0.9), ("k", 0.1)], [("k", 9.0), ("v", 1.0)]
+    assert relative_score_fuse(vector, keyword, alpha=1.0)[0][0] == "v"
+    assert relative_score_fuse(vector, keyword, alpha=0.0)[0][0] == "k"
+    assert fuse(vector, keyword, 0.5, "relative")[0][1] == pytest.approx(0.5)
+
+
+def test_fuse_rejects_unknown_fusion():
+    with pytest.raises(ValueError):
+        fuse([], [], 0.5, "sum")
+
+
+def test_bm25_any_of_looks_up_path_keys(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.jsonl"), keys=lambda d: path_keys(d["path"]))
+    index.add_many(doc(i, "deadline notes", f"/notes/{'work' if i % 10 == 0 else 'home'}/{i}.md")
+                   for i in range(100))
+    index.add(doc(100, "deadline report", "/notes/work/report.pdf"))
+
+    hits = index.search("deadline", 50, any_of=filter_keys(["notes/work"]))
+    assert {h[0] for h in hits} == {f"d{i}" for i in range(0, 100, 10)} | {"d100"}
+    assert [h[0] for h in index.search("deadline", 5, any_of=filter_keys([".pdf"]))] == ["d100"]
+    assert index.search("deadline", 5, any_of=filter_keys(["nowhere"])) == []
+
+
+def test_bm25_filter_keeps_corpus_wide_scores(tmp_path):
+    index = BM25Index(None, keys=lambda d: path_keys(d["path"]))
+    index.add_many(doc(i, f"deadline {'x ' * (i % 3)}", f"/f{i % 2}/{i}.md") for i in range(40))
+    everything = dict(index.search("deadline", 40))
+    for doc_id, score in index.search("deadline", 40, any_of=filter_keys(["f1"])):
+        assert score == pytest.approx(everything[doc_id])
+
+
+def test_bm25_key_index_follows_replace_and_remove(tmp_path):
+    path = str(tmp_path / "bm25.jsonl")
+    keys = lambda d: path_keys(d["path"])   # noqa: E731
+    index = BM25Index(path, keys=keys)
+    index.add(doc(0, "deadline", "/work/a.md"))
+    index.add(doc(0, "deadline", "/home/a.md"))
+    index.add(doc(1, "deadline", "/work/b.md"))
+    index.remove("d1")
+    assert index.search("deadline", 5, any_of=filter_keys(["work"])) == []
+
+    again = BM25Index(path, keys=keys)
+    assert [h[0] for h in again.search("deadline", 5, any_of=filter_keys(["home"]))] == ["d0"]
+    assert again.search("deadline", 5, any_of=filter_keys(["work"])) == []
@@ -0,0 +1,55 @@
+import asyncio
+import threading
+
+from db import ingest_jobs
+from db.ingest_jobs import IngestJob, IngestQueue
+
+
+def test_bump_from_many_threads_loses_no_counts():
+    job = IngestJob(paths=["a.md"])
+
+    def work():
+        for _ in range(2000):
+            job.bump("chunks_written", 1)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert job.to_dict()["progress"]["chunks_written"] == 16000
+
+
+def test_queue_runs_job_and_records_progress(monkeypatch):
+    def fake_ingest(paths, progress):
+        progress("files", len(paths))
+        return 3
+
+    monkeypatch.setattr(ingest_jobs, "ingest_paths", fake_ingest)
+
+    async def run():
+        queue = IngestQueue(workers=1, maxsize=2)
+        job = queue.submit(["a.md", "b.md"])
+        await queue._queue.join()
+        return queue, job
+
+    queue, job = asyncio.run(run())
+    assert queue.get(job.id) is job
+    assert job.status == "done" and job.ingested_chunks == 3
+    assert job.to_dict()["progress"]["files"] == 2
+
+
+def test_failed_job_records_error(monkeypatch):
+    def boom(paths, progress):
+        raise ValueError("bad file")
+
+    monkeypatch.setattr(ingest_jobs, "ingest_paths", boom)
+
+    async def run():
+        queue = IngestQueue(workers=1)
+        job = queue.submit(["a.md"])
+        await queue._queue.join()
+        return job
+
+    job = asyncio.run(run())
+    assert job.status == "failed" and job.error == "ValueError: bad file"
@@ -0,0 +1,80 @@
+import pytest
+
+import manual_ingest
+from db.ingest_manifest import Manifest, chunk_uuid, iter_chunk_ids
+
+
+def chunks_for(src, texts):
+    chunks = list(iter_chunk_ids({"text": t, "source_path": src} for t in texts))
+    return [{"uuid": c["uuid"], "text_hash": c["text_hash"]} for c in chunks]
+
+
+def test_chunk_ids_are_deterministic_and_count_repeats():
+    a = list(iter_chunk_ids([{"text": "x", "source_path": "a.md"}, {"text": "x", "source_path": "a.md"}]))
+    assert a[0]["uuid"] == chunk_uuid("a.md", None, a[0]["text_hash"], 0)
+    assert a[1]["uuid"] == chunk_uuid("a.md", None, a[0]["text_hash"], 1)
+    assert a[0]["uuid"] != a[1]["uuid"]
+
+
+def test_check_file_skips_unchanged_and_detects_edits(tmp_path):
+    src = tmp_path / "a.md"
+    src.write_text("one")
+    manifest = Manifest(str(tmp_path / "m.json"))
+    unchanged, sha = manifest.check_file(str(src))
+    assert not unchanged
+    manifest.record(str(src), sha, chunks_for(str(src), ["one"]))
+    assert manifest.check_file(str(src)) == (True, sha)
+    src.write_text("two")
+    assert manifest.check_file(str(src))[0] is False
+
+
+def test_saves_from_two_instances_merge(tmp_path):
+    path = str(tmp_path / "m.json")
+    api, watcher = Manifest(path), Manifest(path)
+    api.record("a.md", "sha-a", chunks_for("a.md", ["alpha"]))
+    api.save()
+    watcher.record("b.md", "sha-b", chunks_for("b.md", ["beta"]))
+    watcher.save()
+
+    assert set(Manifest(path).files) == {"a.md", "b.md"}
+    assert set(watcher.files) == {"a.md", "b.md"}
+
+
+def test_forget_survives_merge_and_others_updates_win(tmp_path):
+    path = str(tmp_path / "m.json")
+    first = Manifest(path)
+    first.record("a.md", "sha-a", chunks_for("a.md", ["alpha"]))
+    first.record("b.md", "sha-b", chunks_for("b.md", ["beta"]))
+    first.save()
+
+    second = Manifest(path)
+    second.forget("a.md")
+    first.record("b.md", "sha-b2", chunks_for("b.md", ["beta 2"]))
+    first.save()
+    second.save()
+
+    files = Manifest(path).files
+    assert set(files) == {"b.md"}
+    assert files["b.md"]["sha256"] == "sha-b2"
+
+
+def test_refresh_keeps_unsaved_local_changes(tmp_path):
+    path = str(tmp_path / "m.json")
+    first, second = Manifest(path), Manifest(path)
+    second.record("b.md", "sha-b", chunks_for("b.md", ["beta"]))
+    first.record("a.md", "sha-a", chunks_for("a.md", ["alpha"]))
+    first.save()
+    second.refresh()
+    assert set(second.files) == {"a.md", "b.md"}
+
+
+def test_ingest_path_rejects_unsupported_file(tmp_path):
+    src = tmp_path / "notes.txt"
+    src.write_text("plain text")
+    with pytest.raises(ValueError):
+        manual_ingest.ingest_path(str(src))
+
+
+def test_ingest_path_missing_file(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        manual_ingest.ingest_path(str(tmp_path / "gone.md"))
@@ -0,0 +1,193 @@
+import logging
+from types import SimpleNamespace
+
+import pytest
+from weaviate.classes.config import Tokenization
+
+import db.weaviate_utils as wu
+from benchmarks.fakes import InMemoryClient, fake_embed_matrix
+from db.embed_cache import EmbeddingCache
+from db.ingest_manifest import Manifest
+from db.ingest_pipeline import staged
+
+
+def test_staged_keeps_order_through_every_stage():
+    double = lambda items: (i * 2 for i in items)
+    plus_one = lambda items: (i + 1 for i in items)
+    assert list(staged(range(1000), [double, plus_one], maxsize=4)) == [i * 2 + 1 for i in range(1000)]
+
+
+def test_staged_reraises_stage_errors():
+    def boom(items):
+        for i in items:
+            if i == 3:
+                raise RuntimeError("stage failed")
+            yield i
+
+    out = []
+    with pytest.raises(RuntimeError, match="stage failed"):
+        for i in staged(range(10), [boom], maxsize=2):
+            out.append(i)
+    assert out == [0, 1, 2]
+
+
+def test_staged_stops_the_source_when_the_consumer_leaves():
+    pulled = []
+
+    def source():
+        for i in range(10_000):
+            pulled.append(i)
+            yield i
+
+    it = staged(source(), [lambda items: items], maxsize=2)
+    assert next(it) == 0
+    it.close()
+    assert len(pulled) < 100
+
+
+@pytest.fixture
+def ingest(tmp_path, monkeypatch):
+    """ingest_paths against an in-memory Weaviate, a fake embedder and a fresh manifest."""
+    client = InMemoryClient()
+    embedded = []
+
+    def fake_embed(texts):
+        embedded.extend(texts)
+        return fake_embed_matrix(texts, dims=8)
+
+    manifest = Manifest(str(tmp_path / "manifest.json"))
+    cache = EmbeddingCache(str(tmp_path / "embed_cache.sqlite3"))
+    monkeypatch.setattr(wu, "connect_weaviate", client.connect)
+    monkeypatch.setattr(wu, "_embed_uncached", fake_embed)
+    monkeypatch.setattr(wu, "get_embed_cache", lambda: cache)
+    monkeypatch.setattr(wu, "load_manifest", lambda: manifest)
+    return SimpleNamespace(client=client, embedded=embedded)
+
+
+def write_doc(path, *sections):
+    path.write_text("\n\n".join(f"# {title}\n\n{body}" for title, body in sections), encoding="utf-8")
+
+
+def texts(col):
+    return sorted(o["properties"]["text"] for o in col.objects.values())
+
+
+def test_ingest_writes_every_chunk_with_its_vector(ingest, tmp_path):
+    col = ingest.client.collection(wu.COLLECTION)
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write_doc(docs / "a.md", ("Alpha", "Apples grow on trees in the orchard."),
+              ("Beta", "Bicycles need regular chain maintenance."))
+    write_doc(docs / "b.md", ("Gamma", "Granite is an igneous rock with large crystals."))
+
+    counts = {}
+    written = wu.ingest_paths([str(docs)], lambda k, n: counts.__setitem__(k, counts.get(k, 0) + n))
+
+    assert written == len(col) > 0
+    assert counts["files"] == 2
+    assert all(o["vector"] is not None and o["vector"].shape == (8,) for o in col.objects.values())
+    assert {o["properties"]["source_path"] for o in col.objects.values()} == \
+        {str(docs / "a.md"), str(docs / "b.md")}
+
+
+def test_rerun_skips_unchanged_files(ingest, tmp_path):
+    embedded = ingest.embedded
+    col = ingest.client.collection(wu.COLLECTION)
+    doc = tmp_path / "a.md"
+    write_doc(doc, ("Alpha", "Apples grow on trees in the orchard."))
+    wu.ingest_paths([str(doc)])
+    embedded.clear()
+
+    counts = {}
+    assert wu.ingest_paths([str(doc)], lambda k, n: counts.__setitem__(k, counts.get(k, 0) + n)) == 0
+    assert counts.get("files_skipped") == 1
+    assert embedded == []
+
+
+def test_changed_file_embeds_only_new_chunks_and_drops_stale_ones(ingest, tmp_path):
+    embedded = ingest.embedded
+    col = ingest.client.collection(wu.COLLECTION)
+    doc = tmp_path / "a.md"
+    write_doc(doc, ("Alpha", "Apples grow on trees in the orchard."),
+              ("Beta", "Bicycles need regular chain maintenance."))
+    wu.ingest_paths([str(doc)])
+    before = texts(col)
+    embedded.clear()
+
+    write_doc(doc, ("Alpha", "Apples grow on trees in the orchard."),
+              ("Delta", "Dolphins communicate with clicks and whistles."))
+    wu.ingest_paths([str(doc)])
+
+    assert len(embedded) == 1 and "Dolphins" in embedded[0]
+    after = texts(col)
+    assert len(after) == len(before)
+    assert not any("Bicycles" in t for t in after)
+    assert any("Dolphins" in t for t in after)
+
+
+def test_deleted_file_loses_its_chunks(ingest, tmp_path):
+    col = ingest.client.collection(wu.COLLECTION)
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write_doc(docs / "a.md", ("Alpha", "Apples grow on trees in the orchard."))
+    write_doc(docs / "b.md", ("Gamma", "Granite is an igneous rock with large crystals."))
+    wu.ingest_paths([str(docs)])
+
+    (docs / "b.md").unlink()
+    wu.ingest_paths([str(docs)])
+
+    assert {o["properties"]["source_path"] for o in col.objects.values()} == {str(docs / "a.md")}
+
+
+class OldSchemaCollection:
+    """A collection as created before anchors and field-tokenized source_path."""
+
+    name = "JarvisDocs"
+
+    def __init__(self):
+        self.added = []
+        self.config = self
+        self.properties = [SimpleNamespace(name="text", tokenization=Tokenization.WORD),
+                           SimpleNamespace(name="source_path", tokenization=Tokenization.WORD)]
+
+    def get(self):
+        return self
+
+    def add_property(self, prop):
+        self.added.append(prop.name)
+
+
+def test_old_schema_gets_anchor_and_a_tokenization_warning(caplog):
+    col = OldSchemaCollection()
+    with caplog.at_level(logging.WARNING, logger=wu.__name__):
+        wu.check_collection_schema(col)
+    assert col.added == ["anchor"]
+    assert any("word tokenization" in r.getMessage() and "--reindex" in r.getMessage() for r in caplog.records)
+
+
+def test_current_schema_is_left_alone(caplog):
+    col = OldSchemaCollection()
+    col.properties = [SimpleNamespace(name="source_path", tokenization=Tokenization.FIELD),
+                      SimpleNamespace(name="anchor", tokenization=Tokenization.WORD)]
+    with caplog.at_level(logging.WARNING, logger=wu.__name__):
+        wu.check_collection_schema(col)
+    assert col.added == [] and not caplog.records
+
+
+def test_reindex_rebuilds_only_the_given_paths(ingest, tmp_path):
+    client, embedded = ingest.client, ingest.embedded
+    old = client.collection(wu.COLLECTION)
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    write_doc(docs / "a.md", ("Alpha", "Apples grow on trees in the orchard."))
+    other = tmp_path / "other.md"
+    write_doc(other, ("Gamma", "Granite is an igneous rock with large crystals."))
+    wu.ingest_paths([str(docs), str(other)])
+    embedded.clear()
+
+    assert wu.reindex([str(docs)]) == 1
+    rebuilt = client.collection(wu.COLLECTION)
+    assert rebuilt is not old
+    assert {o["properties"]["source_path"] for o in rebuilt.objects.values()} == {str(docs / "a.md")}
+    assert len(embedded) == 0   # vectors still come from the embedding cache
+    assert wu.load_manifest().chunk_ids(str(other)) == []
@@ -0,0 +1,16 @@
+import manual_ingest
+from benchmarks.fakes import InMemoryClient, fake_embed_matrix
+
+
+def test_insert_chunks_writes_without_a_verification_query(monkeypatch):
+    store = InMemoryClient()
+    monkeypatch.setattr(manual_ingest, "connect", store.connect)
+    monkeypatch.setattr(manual_ingest, "embed_texts", lambda texts: fake_embed_matrix(texts, dims=8))
+    queries = []
+    col = store.collection(manual_ingest.COLLECTION)
+    monkeypatch.setattr(col.query, "near_text", lambda **kw: queries.append(kw), raising=False)
+
+    chunks = [{"text": f"chunk {i}", "source_path": "a.md", "page": 1} for i in range(3)]
+    assert manual_ingest.insert_chunks(chunks) == 3
+    assert len(col) == 3
+    assert queries == []
@@ -0,0 +1,27 @@
+from db.path_filters import filter_keys, path_keys, path_parts, path_properties, path_where, split_filters
+
+
+def test_path_parts_are_whole_component_runs():
+    parts = path_parts("/Notes/Work/Plan.md")
+    assert {"notes", "work", "plan.md", "notes/work", "work/plan.md", "notes/work/plan.md"} == set(parts)
+    assert "wor" not in parts
+
+
+def test_properties_and_keys_agree():
+    props = path_properties("C:\\docs\\api\\auth.MD")
+    assert props["extension"] == "md"
+    assert set(path_keys("C:\\docs\\api\\auth.MD")) == {f"part:{p}" for p in props["path_parts"]} | {"ext:md"}
+
+
+def test_filters_split_into_parts_and_extensions():
+    assert split_filters(["docs/api/", "*.pdf", ".md", "", "./"]) == (["docs/api"], ["md", "pdf"])
+    assert filter_keys(["docs/api", ".pdf"]) == ["part:docs/api", "ext:pdf"]
+    assert filter_keys(["", "/"]) is None
+
+
+def test_where_filter_shapes():
+    assert path_where(["docs"]) == {"path": ["path_parts"], "operator": "Equal", "valueText": "docs"}
+    where = path_where(["a", "b", ".md"])
+    assert where["operator"] == "Or"
+    assert where["operands"][0] == {"path": ["path_parts"], "operator": "ContainsAny", "valueText": ["a", "b"]}
+    assert path_where([]) is None
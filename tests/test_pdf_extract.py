@@ -0,0 +1,38 @@
+import pytest
+
+from benchmarks.corpus import pdf_bytes
+from db.pdf_extract import extract_range, iter_pdf_files, iter_pdf_pages, page_count
+
+
+def write_pdf(path, n_pages, blank=()):
+    pages = [[] if i + 1 in blank else [f"{path.stem} page {i + 1} text"] for i in range(n_pages)]
+    path.write_bytes(pdf_bytes(pages))
+    return str(path)
+
+
+def test_extract_range_numbers_pages_from_one_and_skips_blank(tmp_path):
+    pdf = write_pdf(tmp_path / "a.pdf", 4, blank={2})
+    assert page_count(pdf) == 4
+    pages = extract_range(pdf, 0, 10)
+    assert [p["page"] for p in pages] == [1, 3, 4]
+    assert "a page 3 text" in pages[1]["text"]
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_files_and_pages_come_back_in_order(tmp_path, workers):
+    pdfs = [write_pdf(tmp_path / "a.pdf", 5), write_pdf(tmp_path / "b.pdf", 1), write_pdf(tmp_path / "c.pdf", 3)]
+    got = [(path, [p["page"] for p in pages]) for path, pages in iter_pdf_files(pdfs, workers, pages_per_task=2)]
+    assert got == [(pdfs[0], [1, 2, 3, 4, 5]), (pdfs[1], [1]), (pdfs[2], [1, 2, 3])]
+
+
+def test_unread_pages_are_drained_before_the_next_file(tmp_path):
+    pdfs = [write_pdf(tmp_path / "a.pdf", 4), write_pdf(tmp_path / "b.pdf", 2)]
+    seen = []
+    for path, pages in iter_pdf_files(pdfs, workers=2, pages_per_task=1):
+        seen.append((path, next(pages)["page"]))
+    assert seen == [(pdfs[0], 1), (pdfs[1], 1)]
+
+
+def test_iter_pdf_pages_matches_single_process(tmp_path):
+    pdf = write_pdf(tmp_path / "a.pdf", 6)
+    assert list(iter_pdf_pages(pdf, workers=2, pages_per_task=2)) == extract_range(pdf, 0, 6)
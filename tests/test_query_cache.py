@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+
+from db import query_cache
+from db.query_cache import QueryCache, bump_index_generation, index_generation, normalize_query
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_normalize_query():
+    assert normalize_query("  Planning   Deadline?? ") == "planning deadline"
+
+
+def test_exact_hits_are_per_filters_and_copied():
+    cache = QueryCache(generation=lambda: 0)
+    cache.put("Deadline", {"top_k": 5}, [{"path": "a.md"}])
+    hit = cache.get_exact("deadline ", {"top_k": 5})
+    assert hit == [{"path": "a.md"}]
+    hit[0]["path"] = "mutated"
+    assert cache.get_exact("deadline", {"top_k": 5}) == [{"path": "a.md"}]
+    assert cache.get_exact("deadline", {"top_k": 3}) is None
+
+
+def test_semantic_hit_needs_similarity_and_same_terms():
+    cache = QueryCache(generation=lambda: 0, similarity=0.95)
+    cache.put("when is the deadline", None, ["r"], vector=[1.0, 0.0], terms=frozenset({"deadline"}))
+    assert cache.get_similar([0.99, 0.05], None, frozenset({"deadline"})) == ["r"]
+    assert cache.get_similar([0.99, 0.05], None, frozenset({"err4822"})) is None
+    assert cache.get_similar([0.5, 0.5], None, frozenset({"deadline"})) is None
+
+
+def test_generation_change_empties_cache_and_stale_puts_are_dropped():
+    gen = [1]
+    cache = QueryCache(generation=lambda: gen[0])
+    cache.put("q", None, ["old"])
+    before = cache.generation()
+    gen[0] = 2
+    assert cache.get_exact("q") is None
+    cache.put("q", None, ["raced an ingest"], generation=before)
+    assert cache.get_exact("q") is None and len(cache) == 0
+
+
+def test_markers_are_per_index():
+    docs, chunks = index_generation("JarvisDocs"), index_generation("RagChunk")
+    bump_index_generation("JarvisDocs")
+    assert index_generation("JarvisDocs") > docs
+    assert index_generation("RagChunk") == chunks
+
+
+def test_default_marker_dir_does_not_depend_on_cwd(tmp_path):
+    env = {k: v for k, v in os.environ.items() if k != "INDEX_GENERATION_DIR"}
+    code = "from db.query_cache import INDEX_GENERATION_DIR; print(INDEX_GENERATION_DIR)"
+    dirs = {
+        subprocess.run([sys.executable, "-c", code], cwd=cwd, env={**env, "PYTHONPATH": ROOT},
+                       capture_output=True, text=True, check=True).stdout.strip()
+        for cwd in (ROOT, tmp_path)
+    }
+    assert dirs == {os.path.join(os.path.realpath(ROOT), ".index_generations")}
+    assert os.path.isabs(query_cache.INDEX_GENERATION_DIR)
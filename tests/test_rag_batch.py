@@ -0,0 +1,55 @@
+import pytest
+
+from conftest import bag_of_words
+from test_rag_service import call, search
+
+DOCS = [("/batch/cats.md", "cats purr and sleep in warm sunny windows"),
+        ("/batch/dogs.md", "dogs bark at the mail carrier every morning"),
+        ("/batch/tea.md", "green tea should steep for two minutes only")]
+
+
+@pytest.fixture(scope="module")
+def indexed(rag):
+    for path, text in DOCS:
+        assert call(rag, "POST", "/index/document", json={"path": path, "text": text}).status_code == 200
+    return rag
+
+
+@pytest.mark.parametrize("params", [{}, {"queries": []}, {"queries": ["", "  "]}, {"queries": "cats"},
+                                    {"queries": ["x"] * 33}, {"queries": ["x"], "mode": "semantic"}])
+def test_bad_batches_are_rejected(rag, params):
+    r = search(rag, "/tools/rag_search_batch", **params)
+    assert r.status_code == 400, r.text
+
+
+def test_batch_answers_each_query_in_order(indexed):
+    queries = ["why do batch cats purr", "batch dogs bark mail", "batch green tea steep"]
+    r = search(indexed, "/tools/rag_search_batch", queries=queries, top_k=1, mode="hybrid")
+    assert r.status_code == 200, r.text
+    body = r.json()
+    assert body["total_queries"] == 3
+    assert [res["query"] for res in body["results"]] == queries
+    assert [res["chunks"][0]["path"] for res in body["results"]] == [p for p, _ in DOCS]
+
+    for query, res in zip(queries, body["results"]):
+        single = search(indexed, query=query, top_k=1, mode="hybrid").json()
+        assert single["chunks"] == res["chunks"]
+
+
+def test_batch_embeds_all_misses_in_one_request(indexed, monkeypatch):
+    requests = []
+
+    def counting(texts):
+        requests.append(list(texts))
+        return bag_of_words(texts)
+
+    monkeypatch.setattr(indexed, "_embed_queries", counting)
+    queries = ["purring cats one request", "barking dogs one request", "steeping tea one request"]
+    first = search(indexed, "/tools/rag_search_batch", queries=queries, top_k=2, mode="vector").json()
+    assert requests == [queries]
+    assert all(res["cached"] is None for res in first["results"])
+
+    again = search(indexed, "/tools/rag_search_batch", queries=queries, top_k=2, mode="vector").json()
+    assert len(requests) == 1
+    assert all(res["cached"] == "exact" for res in again["results"])
+    assert [res["chunks"] for res in again["results"]] == [res["chunks"] for res in first["results"]]
@@ -0,0 +1,43 @@
+import asyncio
+
+import httpx
+import pytest
+
+
+def call(rag, method, url, **kw):
+    async def go():
+        transport = httpx.ASGITransport(app=rag.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://rag") as client:
+            return await client.request(method, url, **kw)
+    return asyncio.run(go())
+
+
+def search(rag, endpoint="/tools/rag_search", **params):
+    return call(rag, "POST", endpoint, json={"name": "rag_search", "parameters": params})
+
+
+@pytest.mark.parametrize("endpoint", ["/tools/rag_search", "/tools/rag_search_stream"])
+@pytest.mark.parametrize("bad", [{"alpha": "high"}, {"alpha": [0.5]}, {"alpha": 1.5}, {"alpha": "nan"},
+                                 {"fusion": "sum"}, {"mode": "semantic"}])
+def test_invalid_search_options_are_rejected(rag, endpoint, bad):
+    r = search(rag, endpoint, query="anything", **bad)
+    assert r.status_code == 400, r.text
+
+
+def test_numeric_string_alpha_is_accepted(rag):
+    r = search(rag, query="anything", mode="hybrid", alpha="0.3", fusion="relative")
+    assert r.status_code == 200, r.text
+
+
+def test_filter_paths_restrict_keyword_and_vector_hits(rag):
+    for path, text in [("/filters/work/plan.md", "quarterly planning deadline"),
+                       ("/filters/home/list.md", "planning deadline for the garden"),
+                       ("/filters/work/scan.pdf", "scanned planning deadline memo")]:
+        assert call(rag, "POST", "/index/document", json={"path": path, "text": text}).status_code == 200
+    for mode in ("keyword", "vector", "hybrid"):
+        r = search(rag, query="planning deadline", mode=mode, top_k=5, filter_paths=["filters/work"])
+        assert {c["path"] for c in r.json()["chunks"]} == {"/filters/work/plan.md", "/filters/work/scan.pdf"}, mode
+        r = search(rag, query="planning deadline", mode=mode, top_k=5, filter_paths=["filters", ".pdf"])
+        assert {c["path"] for c in r.json()["chunks"]} >= {"/filters/home/list.md"}, mode
+        r = search(rag, query="planning deadline", mode=mode, top_k=5, filter_paths=["*.pdf"])
+        assert [c["path"] for c in r.json()["chunks"]] == ["/filters/work/scan.pdf"], mode
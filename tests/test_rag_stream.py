@@ -0,0 +1,106 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from rag_stream import RagStreamError, search_with_deadline, stream_rag_search
+from test_rag_service import call, search
+
+
+def events_of(response):
+    return [json.loads(line) for line in response.text.splitlines() if line.strip()]
+
+
+def test_service_streams_preliminary_hits_then_passages(rag):
+    for path, text in [("/stream/owls.md", "owls hunt silently at night in the forest"),
+                       ("/stream/bats.md", "bats hunt insects at night using echolocation")]:
+        assert call(rag, "POST", "/index/document", json={"path": path, "text": text}).status_code == 200
+
+    r = search(rag, "/tools/rag_search_stream", query="streamed night hunters", mode="hybrid", top_k=2)
+    assert r.status_code == 200 and r.headers["content-type"].startswith("application/x-ndjson")
+    events = events_of(r)
+    kinds = [e["event"] for e in events]
+    assert kinds[-1] == "done" and "passage" in kinds
+    assert kinds[0] == "chunk" and events[0]["stage"] == "keyword"   # local BM25 answers first
+    assert kinds.index("passage") > max(i for i, k in enumerate(kinds) if k == "chunk")
+    assert [e["rank"] for e in events if e["event"] == "passage"] == [0, 1]
+
+    passages = [e["chunk"] for e in events if e["event"] == "passage"]
+    assert events[-1]["total_found"] == len(passages)
+    plain = search(rag, query="streamed night hunters", mode="hybrid", top_k=2).json()
+    assert [c["path"] for c in plain["chunks"]] == [c["path"] for c in passages]
+
+
+def test_service_reports_errors_in_the_stream(rag, monkeypatch):
+    from weaviate_pool import WeaviateBusy
+
+    async def busy(fn, *args, **kwargs):
+        raise WeaviateBusy("all slots busy")
+
+    monkeypatch.setattr(rag.weaviate_pool, "run", busy)
+    r = search(rag, "/tools/rag_search_stream", query="a streamed query nobody cached")
+    assert r.status_code == 200
+    assert events_of(r) == [{"event": "error", "status": 503, "detail": "all slots busy"}]
+
+
+def fake_service(lines, pause_after=None, pause=0.0, status=200):
+    """An httpx client whose rag-service sends `lines` as NDJSON, pausing after line `pause_after`."""
+
+    async def body():
+        for i, line in enumerate(lines):
+            yield (json.dumps(line) + "\n").encode()
+            if i == pause_after:
+                await asyncio.sleep(pause)
+
+    def handler(request):
+        return httpx.Response(status, content=body())
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+CHUNK = {"event": "chunk", "stage": "keyword", "rank": 0, "chunk": {"text": "early"}}
+PASSAGE = {"event": "passage", "rank": 0, "chunk": {"text": "final"}}
+DONE = {"event": "done", "total_found": 1}
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_client_waits_for_final_passages_within_the_soft_timeout():
+    async def go():
+        async with fake_service([CHUNK, PASSAGE, DONE], pause_after=0, pause=0.05) as client:
+            return await search_with_deadline(client, "q", soft_timeout=1.0, base_url="http://rag")
+
+    out = run(go())
+    assert out["final"] and out["chunks"] == [{"text": "final"}] and out["done"] == DONE
+
+
+def test_client_falls_back_to_preliminary_hits_after_the_soft_timeout():
+    async def go():
+        async with fake_service([CHUNK, PASSAGE, DONE], pause_after=0, pause=2.0) as client:
+            return await search_with_deadline(client, "q", soft_timeout=0.05, base_url="http://rag")
+
+    out = run(go())
+    assert not out["final"] and out["stage"] == "keyword" and out["chunks"] == [{"text": "early"}]
+
+
+def test_client_raises_on_error_events_and_bad_status():
+    async def events(client):
+        return [e async for e in stream_rag_search(client, "q", base_url="http://rag")]
+
+    async def error_event():
+        async with fake_service([{"event": "error", "status": 503, "detail": "busy"}]) as client:
+            return await events(client)
+
+    with pytest.raises(RagStreamError) as exc:
+        run(error_event())
+    assert exc.value.status == 503
+
+    async def rejected():
+        async with fake_service([{"detail": "bad alpha"}], status=400) as client:
+            return await events(client)
+
+    with pytest.raises(httpx.HTTPStatusError):
+        run(rejected())
@@ -0,0 +1,68 @@
+import json
+import logging
+
+from search_metrics import SlowQueryLog, StageHistograms, StageTimer
+
+
+def test_stage_timer_adds_repeated_stages():
+    timer = StageTimer()
+    timer.add("cache", 1.0)
+    with timer.stage("cache"):
+        pass
+    timer.add("ann", 2.12345)
+    assert timer.stages["cache"] >= 1.0
+    assert timer.rounded()["ann"] == 2.123
+
+
+def test_histogram_buckets_are_cumulative():
+    h = StageHistograms(name="t", buckets=(1, 10))
+    h.observe({"ann": 0.5})
+    h.observe({"ann": 5})
+    h.observe({"ann": 50, "cache": 1})
+    lines = h.render().splitlines()
+    assert lines[:2] == ["# HELP t RAG search time per stage in milliseconds", "# TYPE t histogram"]
+    assert 't_bucket{stage="ann",le="1"} 1' in lines
+    assert 't_bucket{stage="ann",le="10"} 2' in lines
+    assert 't_bucket{stage="ann",le="+Inf"} 3' in lines
+    assert 't_sum{stage="ann"} 55.500' in lines
+    assert 't_count{stage="ann"} 3' in lines
+    assert 't_bucket{stage="cache",le="1"} 1' in lines
+
+
+def test_slow_query_log_keeps_and_logs_only_slow_queries(caplog):
+    log = SlowQueryLog(threshold_ms=100, keep=2)
+    with caplog.at_level(logging.WARNING, logger="rag.slow_query"):
+        assert not log.check(99, {"query": "fast"}, {})
+        for q in ("a", "b", "c"):
+            assert log.check(150, {"query": q}, {"ann": 140})
+    assert [e["params"]["query"] for e in log.recent()] == ["b", "c"]
+    assert [e["params"]["query"] for e in log.recent(1)] == ["c"]
+    assert json.loads(caplog.records[-1].getMessage())["stages"] == {"ann": 140}
+
+
+def test_zero_threshold_disables_the_log():
+    assert not SlowQueryLog(threshold_ms=0).check(10_000, {}, {})
+
+
+def test_search_reports_stage_timings(rag, monkeypatch):
+    from test_rag_service import call, search
+
+    monkeypatch.setattr(rag.slow_queries, "threshold_ms", 0.001)
+    r = search(rag, query="stage timing probe", mode="hybrid")
+    assert r.status_code == 200, r.text
+    stages = r.json()["timings"]
+    assert {"cache", "embed", "ann", "keyword", "rerank"} <= set(stages)
+    assert all(f"{s};dur=" in r.headers["Server-Timing"] for s in stages)
+
+    metrics = call(rag, "GET", "/metrics").text
+    assert 'rag_search_stage_ms_count{stage="total"}' in metrics
+    slow = call(rag, "GET", "/metrics/slow_queries", params={"limit": 1}).json()["queries"]
+    assert slow[-1]["params"]["query"] == "stage timing probe"
+
+
+def test_search_defaults_to_vector_only(rag):
+    from test_rag_service import search
+
+    r = search(rag, query="default mode probe")
+    assert r.status_code == 200, r.text
+    assert r.json()["mode"] == "vector"
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def test_key_ignores_argument_order():
+    assert SingleFlight.key("daily", {"a": 1, "b": 2}) == SingleFlight.key("daily", {"b": 2, "a": 1})
+    assert SingleFlight.key("daily", {"a": 1}) != SingleFlight.key("weekly", {"a": 1})
+
+
+def test_concurrent_callers_share_one_upstream_call():
+    sf = SingleFlight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"ok": calls}
+
+    async def run():
+        return await asyncio.gather(*(sf.do("k", upstream) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert calls == 1
+    assert results == [{"ok": 1}] * 5
+    assert sf.stats() == {"upstream_requests": 1, "collapsed_requests": 4, "in_flight": 0}
+
+
+def test_sequential_calls_are_not_coalesced():
+    sf = SingleFlight()
+
+    async def upstream():
+        return "x"
+
+    async def run():
+        await sf.do("k", upstream)
+        await sf.do("k", upstream)
+
+    asyncio.run(run())
+    assert sf.stats()["upstream_requests"] == 2
+
+
+def test_exception_reaches_every_waiter():
+    sf = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("webhook down")
+
+    async def run():
+        return await asyncio.gather(*(sf.do("k", upstream) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert sf.stats()["in_flight"] == 0
+
+
+def test_cancelling_one_waiter_keeps_the_shared_call():
+    sf = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(sf.do("k", upstream))
+        second = asyncio.ensure_future(sf.do("k", upstream))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_cancelling_last_waiter_cancels_upstream():
+    sf = SingleFlight()
+    finished = False
+
+    async def upstream():
+        nonlocal finished
+        await asyncio.sleep(0.05)
+        finished = True
+
+    async def run():
+        caller = asyncio.ensure_future(sf.do("k", upstream))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0.06)
+
+    asyncio.run(run())
+    assert not finished
+    assert sf.stats()["in_flight"] == 0
@@ -0,0 +1,94 @@
+import asyncio
+import hashlib
+import threading
+
+import pytest
+
+from db.upload_store import UploadTooLarge, find_blob, safe_filename, store_stream
+
+
+async def _chunks(*parts):
+    for p in parts:
+        yield p
+
+
+def store(*parts, **kw):
+    return asyncio.run(store_stream(_chunks(*parts), **kw))
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("notes.md", "notes.md"),
+    ("../../etc/passwd", "passwd"),
+    ("C:\\Users\\me\\doc.pdf", "doc.pdf"),
+    ("..", "upload"),
+    (None, "upload"),
+])
+def test_safe_filename(name, expected):
+    assert safe_filename(name) == expected
+
+
+def test_stores_at_content_address(tmp_path):
+    out = store(b"hello ", b"world", filename="a.md", root=tmp_path)
+    sha = hashlib.sha256(b"hello world").hexdigest()
+    assert out["sha256"] == sha and out["size"] == 11 and not out["duplicate"]
+    assert (tmp_path / sha / "a.md").read_bytes() == b"hello world"
+    assert find_blob(tmp_path, sha.upper()) == tmp_path / sha / "a.md"
+
+
+def test_same_content_is_stored_once(tmp_path):
+    first = store(b"same", filename="a.md", root=tmp_path)
+    second = store(b"same", filename="b.md", root=tmp_path)
+    assert second["duplicate"] and second["path"] == first["path"]
+    assert second["filename"] == "b.md"
+    assert [p.name for p in tmp_path.rglob("*") if p.is_file()] == ["a.md"]
+
+
+def test_concurrent_identical_uploads_store_one_blob(tmp_path):
+    n = 8
+    barrier = threading.Barrier(n)
+    results = [None] * n
+
+    async def body():
+        yield b"same bytes from every client"
+        barrier.wait()   # everyone has streamed the body before anyone places it
+
+    def upload(i):
+        results[i] = asyncio.run(store_stream(body(), f"copy{i}.md", tmp_path))
+
+    threads = [threading.Thread(target=upload, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sorted(r["duplicate"] for r in results) == [False] + [True] * (n - 1)
+    assert len({r["path"] for r in results}) == 1
+    assert len([p for p in tmp_path.rglob("*") if p.is_file()]) == 1
+    assert [p.name for p in tmp_path.iterdir()] == [results[0]["sha256"]]
+
+
+def test_known_hash_skips_the_body(tmp_path):
+    first = store(b"payload", filename="a.md", root=tmp_path)
+
+    async def never():
+        raise AssertionError("body should not be read")
+        yield b""
+
+    out = asyncio.run(store_stream(never(), "a.md", tmp_path, expected_sha256=first["sha256"]))
+    assert out["duplicate"] and out["path"] == first["path"]
+
+
+def test_too_large_leaves_nothing_behind(tmp_path):
+    with pytest.raises(UploadTooLarge):
+        store(b"12345", b"67890", filename="big.md", root=tmp_path, max_bytes=8)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_hash_mismatch_is_rejected(tmp_path):
+    with pytest.raises(ValueError, match="does not match"):
+        store(b"abc", filename="a.md", root=tmp_path, expected_sha256="0" * 64)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_find_blob_rejects_non_hashes(tmp_path):
+    assert find_blob(tmp_path, "../etc") is None
+    assert find_blob(tmp_path, "f" * 64) is None
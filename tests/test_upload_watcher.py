@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+
+from db import upload_watcher
+from db.ingest_manifest import Manifest
+from db.upload_watcher import UploadWatcher, scan, wanted
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("uploads/notes.md", True),
+    ("uploads/sub/Report.PDF", True),
+    ("uploads/image.png", False),
+    ("uploads/.notes.md.swp", False),
+    ("uploads/.hidden.md", False),
+    ("uploads/" + "a" * 64 + "/notes.md", False),
+])
+def test_wanted(path, expected):
+    assert wanted(path) is expected
+
+
+def test_scan_walks_subdirectories(tmp_path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.md").write_text("a")
+    (tmp_path / "sub" / "b.pdf").write_bytes(b"b")
+    (tmp_path / "sub" / "c.txt").write_text("c")
+    assert set(scan(str(tmp_path))) == {str(tmp_path / "a.md"), str(tmp_path / "sub" / "b.pdf")}
+
+
+def watcher(root, **kw):
+    kw.setdefault("files_per_min", 0)
+    kw.setdefault("chunks_per_min", 0)
+    return UploadWatcher(str(root), **kw)
+
+
+def test_debounce_and_batching(tmp_path):
+    w = watcher(tmp_path, debounce=10, batch_files=2)
+    now = time.monotonic()
+    w.touch(["a.md", "b.md", "c.md"], at=now - 20)
+    w.touch(["d.md"], at=now)
+    w.touch(["skip.png"], at=now - 20)
+    assert len(w._take_ready()) == 2
+    assert len(w._take_ready()) == 1
+    assert w._take_ready() == []
+    assert list(w.pending) == ["d.md"]
+
+
+def test_polling_raises_the_debounce_to_cover_a_poll():
+    assert watcher(".", debounce=1, poll=4, force_polling=True).debounce == 6
+
+
+def test_poll_sees_new_changed_and_deleted_files(tmp_path):
+    a, b = tmp_path / "a.md", tmp_path / "b.md"
+    a.write_text("one")
+    b.write_text("two")
+    w = watcher(tmp_path)
+    w._snapshot = scan(str(tmp_path))
+
+    a.write_text("one, edited")
+    b.unlink()
+    (tmp_path / "c.md").write_text("three")
+    w._poll_once()
+    assert set(w.pending) == {str(a), str(b), str(tmp_path / "c.md")}
+
+
+def test_failed_ingest_is_retried_later(tmp_path, monkeypatch):
+    def fail(paths, progress):
+        raise RuntimeError("weaviate down")
+
+    monkeypatch.setattr(upload_watcher, "ingest_paths", fail)
+    monkeypatch.setattr(upload_watcher, "load_manifest", lambda: Manifest(str(tmp_path / "m.json")))
+    w = watcher(tmp_path, debounce=0.1)
+    w._ingest(["a.md"])
+    assert w.stats["errors"] == 1
+    assert "a.md" in w.pending and w._take_ready() == []
+
+
+def test_run_ingests_existing_and_new_files(tmp_path, monkeypatch):
+    root = tmp_path / "uploads"
+    root.mkdir()
+    (root / "old.md").write_text("already here")
+    batches = []
+
+    def fake_ingest(paths, progress):
+        batches.append(sorted(paths))
+        progress("chunks_written", len(paths))
+
+    monkeypatch.setattr(upload_watcher, "ingest_paths", fake_ingest)
+    monkeypatch.setattr(upload_watcher, "load_manifest", lambda: Manifest(str(tmp_path / "m.json")))
+    w = watcher(root, debounce=0.05, poll=0.05, force_polling=True)
+    t = threading.Thread(target=w.run, daemon=True)
+    t.start()
+    try:
+        deadline = time.monotonic() + 5
+        while not batches and time.monotonic() < deadline:
+            time.sleep(0.02)
+        (root / "new.md").write_text("just dropped in")
+        while len(batches) < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+    finally:
+        w.stop()
+        t.join(timeout=5)
+    assert batches == [[str(root / "old.md")], [str(root / "new.md")]]
+    assert w.stats["files"] == 2 and w.stats["chunks_written"] == 2
@@ -0,0 +1,242 @@
+import threading
+
+import numpy as np
+import pytest
+
+from db.path_filters import filter_keys, path_keys
+from db.vector_index import VectorIndex
+
+DIMS = 16
+
+
+def vectors(n, seed=0):
+    return np.random.default_rng(seed).standard_normal((n, DIMS)).astype(np.float32)
+
+
+def docs(n, dirs=("work", "home")):
+    return [{"id": f"d{i}", "path": f"/{dirs[i % len(dirs)]}/f{i}.md"} for i in range(n)]
+
+
+def index(path=None, **kw):
+    return VectorIndex(str(path) if path else None, keys=lambda d: path_keys(d["path"]), **kw)
+
+
+def brute_force(vecs, q, k, live=None):
+    m = vecs / np.linalg.norm(vecs, axis=1, keepdims=True)
+    order = np.argsort(-(m @ (q / np.linalg.norm(q))))
+    return [f"d{i}" for i in order if live is None or i in live][:k]
+
+
+def test_exact_search_matches_brute_force():
+    vecs = vectors(300)
+    idx = index()
+    idx.add_many(zip(docs(300), vecs))
+    q = vectors(1, seed=1)[0]
+    hits = idx.search(q, 5)
+    assert idx.mode == "exact"
+    assert [i for i, _ in hits] == brute_force(vecs, q, 5)
+    assert -1.0 <= hits[-1][1] <= hits[0][1] <= 1.0
+
+
+def test_replace_remove_and_dimension_checks():
+    idx = index()
+    idx.add({"id": "a", "path": "/x/a.md"}, [1, 0, 0])
+    idx.add({"id": "b", "path": "/x/b.md"}, [0, 1, 0])
+    idx.add({"id": "a", "path": "/y/a.md"}, [0, 0, 1])
+    assert len(idx) == 2 and idx.get("a")["path"] == "/y/a.md"
+    assert idx.search([0, 0, 1], 1)[0][0] == "a"
+    assert idx.search([1, 0, 0], 1, any_of=filter_keys(["x"])) == [("b", pytest.approx(0.0, abs=1e-3))]
+    assert idx.remove("b") and not idx.remove("b")
+    assert idx.search([1, 0, 0], 5, any_of=filter_keys(["x"])) == []
+    with pytest.raises(ValueError):
+        idx.add({"id": "c", "path": "/x/c.md"}, [1, 0])
+    with pytest.raises(ValueError):
+        idx.search([1, 0], 1)
+
+
+@pytest.mark.parametrize("exact_max", [10_000, 100])
+def test_any_of_and_where_filters(exact_max):
+    vecs = vectors(600)
+    idx = index(exact_max=exact_max)
+    idx.add_many(zip(docs(600), vecs))
+    q = vectors(1, seed=2)[0]
+    work = {i for i in range(600) if i % 2 == 0}
+
+    hits = idx.search(q, 10, any_of=filter_keys(["work"]))
+    assert all(idx.get(i)["path"].startswith("/work/") for i, _ in hits) and len(hits) == 10
+    if exact_max > 600:
+        assert [i for i, _ in hits] == brute_force(vecs, q, 10, work)
+
+    hits = idx.search(q, 3, any_of=filter_keys(["f7.md", "f8.md"]))
+    assert sorted(i for i, _ in hits) == ["d7", "d8"]
+
+    hits = idx.search(q, 5, where=lambda d: d["id"].endswith("3"))
+    assert len(hits) == 5 and all(i.endswith("3") for i, _ in hits)
+    assert idx.search(q, 5, any_of=filter_keys(["nowhere"])) == []
+
+
+def test_hnsw_recall_against_exact():
+    vecs = vectors(3000)
+    idx = index(exact_max=500)
+    idx.add_many(zip(docs(3000), vecs))
+    assert idx.mode == "hnsw" and idx.stats()["graph_nodes"] == 3000
+    queries = vectors(30, seed=3)
+    recall = np.mean([len({i for i, _ in idx.search(q, 10)} & set(brute_force(vecs, q, 10))) / 10
+                      for q in queries])
+    assert recall >= 0.9
+
+
+@pytest.mark.parametrize("exact_max", [10_000, 200])
+def test_reload_replays_adds_and_tombstones(tmp_path, exact_max):
+    vecs = vectors(500)
+    idx = index(tmp_path, exact_max=exact_max)
+    idx.add_many(zip(docs(400), vecs[:400]))
+    idx.save()
+    # after the save: more adds, a replace and deletes that only exist in the log
+    idx.add_many(zip(docs(500)[400:], vecs[400:]))
+    for i in range(0, 500, 5):
+        idx.remove(f"d{i}")
+    idx.add({"id": "d1", "path": "/moved/f1.md"}, vecs[1])
+    q = vectors(1, seed=4)[0]
+    before = idx.search(q, 10, any_of=filter_keys(["work"]))
+
+    again = index(tmp_path, exact_max=exact_max)
+    assert len(again) == 400 and again.mode == idx.mode
+    assert "d0" not in again and again.get("d1")["path"] == "/moved/f1.md"
+    assert again.search(q, 10, any_of=filter_keys(["work"])) == before
+    assert again.search(vecs[1], 1, any_of=filter_keys(["moved"]))[0][0] == "d1"
+    assert not any(i.endswith(("0", "5")) for i, _ in again.search(q, 50))
+    np.testing.assert_allclose(again.vector("d7"), vecs[7] / np.linalg.norm(vecs[7]), atol=1e-3)
+
+
+def test_torn_log_line_is_skipped(tmp_path):
+    idx = index(tmp_path)
+    idx.add_many(zip(docs(3), vectors(3)))
+    with open(tmp_path / "docs.jsonl", "a") as f:
+        f.write('{"op": "add", "slot": 3, "id": "d3"')
+    assert sorted(d["id"] for d in index(tmp_path).documents()) == ["d0", "d1", "d2"]
+
+
+@pytest.mark.parametrize("exact_max", [10_000, 50])
+def test_save_compacts_tombstones(tmp_path, exact_max):
+    vecs = vectors(2500)
+    idx = index(tmp_path, exact_max=exact_max)
+    idx.add_many(zip(docs(2500), vecs))
+    idx.save()
+    for i in range(2400):
+        idx.remove(f"d{i}")
+    q = vectors(1, seed=5)[0]
+    before = idx.search(q, 5, any_of=filter_keys(["home"]))
+    idx.save()
+    assert idx.stats()["slots"] == 100 and len(idx) == 100 and idx.mode == ("exact" if exact_max > 100 else "hnsw")
+    assert idx.search(q, 5, any_of=filter_keys(["home"])) == before
+
+    again = index(tmp_path, exact_max=exact_max)
+    assert again.stats()["slots"] == 100 and again.mode == idx.mode
+    assert again.search(q, 5, any_of=filter_keys(["home"])) == before
+    (matrix,) = tmp_path.glob("vectors*.f16")   # the old files are gone
+    assert matrix.stat().st_size < 2500 * DIMS * 2
+    assert len(list(tmp_path.glob("graph*.npz"))) == (exact_max < 100)
+
+
+def test_failed_compaction_keeps_the_saved_index(tmp_path, monkeypatch):
+    vecs = vectors(2500)
+    idx = index(tmp_path, exact_max=500)
+    idx.add_many(zip(docs(2500), vecs))
+    idx.save()
+    for i in range(2400):
+        idx.remove(f"d{i}")
+    q = vectors(1, seed=6)[0]
+    before = idx.search(q, 5)
+
+    def disk_full(*args):
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(VectorIndex, "_write_log", disk_full)
+    with pytest.raises(OSError):
+        idx.save()
+    assert idx.search(q, 5) == before   # still serving the state it had
+
+    monkeypatch.undo()
+    again = index(tmp_path, exact_max=500)   # the log, matrix and graph from before the compaction
+    assert len(again) == 100 and again.stats()["slots"] == 2500
+    assert again.search(q, 5) == before
+    assert [f.name for f in tmp_path.glob("vectors*.f16")] == ["vectors.f16"]   # the half-written copy is gone
+    again.save()
+    assert len(index(tmp_path, exact_max=500)) == 100 and again.search(q, 5) == before
+
+
+def test_clear_removes_everything(tmp_path):
+    idx = index(tmp_path)
+    idx.add_many(zip(docs(5), vectors(5)))
+    generation = idx.generation
+    idx.clear()
+    assert len(idx) == 0 and idx.generation > generation
+    assert idx.search(vectors(1)[0], 3) == []
+    assert len(index(tmp_path)) == 0
+
+
+@pytest.mark.parametrize("exact_max", [10_000, 100])
+def test_searches_run_side_by_side(exact_max):
+    idx = index(exact_max=exact_max)
+    idx.add_many(zip(docs(300), vectors(300)))
+    both_inside = threading.Barrier(2, timeout=5)
+    results = []
+
+    def meet(doc):   # only passes once the other search is inside the index too
+        both_inside.wait()
+        return True
+
+    def run(seed):
+        results.append(idx.search(vectors(1, seed=seed)[0], 1, where=meet))
+
+    threads = [threading.Thread(target=run, args=(seed,)) for seed in (7, 8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 2 and all(len(hits) == 1 for hits in results)
+
+
+def test_adds_and_removes_wait_for_running_searches():
+    vecs = vectors(1200)
+    idx = index(exact_max=200)
+    idx.add_many(zip(docs(400), vecs[:400]))
+    errors = []
+
+    def write():
+        for i in range(400, 1200):
+            idx.add(docs(1200)[i], vecs[i])
+            if i % 3 == 0:
+                idx.remove(f"d{i - 400}")
+
+    def read(seed):
+        try:
+            for q in vectors(200, seed=seed):
+                hits = idx.search(q, 5, any_of=filter_keys(["work"]))
+                assert all(idx.get(i) is None or idx.get(i)["path"].startswith("/work/") for i, _ in hits)
+        except Exception as e:   # reported on the test thread
+            errors.append(e)
+
+    threads = [threading.Thread(target=write)] + [threading.Thread(target=read, args=(s,)) for s in (9, 10, 11)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert idx.stats()["graph_nodes"] == 1200 and len(idx) == 1200 - len(range(402, 1200, 3))
+
+
+def test_service_delete_drops_the_chunk_from_every_mode(rag):
+    from test_rag_service import call, search
+
+    r = call(rag, "POST", "/index/document", json={"path": "/local/delete/me.md", "text": "ephemeral zebra migration"})
+    doc_id = r.json()["document_id"]
+    for mode in ("keyword", "vector", "hybrid"):
+        hits = search(rag, query="zebra migration", mode=mode, filter_paths=["local/delete"]).json()["chunks"]
+        assert [c["path"] for c in hits] == ["/local/delete/me.md"], mode
+
+    assert call(rag, "DELETE", f"/index/document/{doc_id}").status_code == 200
+    assert call(rag, "DELETE", f"/index/document/{doc_id}").status_code == 404
+    for mode in ("keyword", "vector", "hybrid"):
+        assert search(rag, query="zebra migration", mode=mode, filter_paths=["local/delete"]).json()["chunks"] == []
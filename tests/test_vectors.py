@@ -0,0 +1,37 @@
+import base64
+
+import numpy as np
+
+from db.vectors import as_matrix, decode_embedding, to_client
+
+
+def test_decode_base64_and_list_agree():
+    v = np.array([0.5, -1.25, 3.0], dtype="<f4")
+    from_b64 = decode_embedding(base64.b64encode(v.tobytes()).decode(), dtype="float32")
+    from_list = decode_embedding([0.5, -1.25, 3.0], dtype="float32")
+    assert from_b64.dtype == np.float32
+    np.testing.assert_array_equal(from_b64, from_list)
+
+
+def test_decode_to_float16():
+    v = np.array([1.0, 2.0], dtype="<f4")
+    out = decode_embedding(base64.b64encode(v.tobytes()).decode(), dtype="float16")
+    assert out.dtype == np.float16 and out.tolist() == [1.0, 2.0]
+
+
+def test_as_matrix_stacks_rows_contiguously():
+    m = as_matrix([[1, 2], np.array([3, 4])], dtype="float32")
+    assert m.shape == (2, 2) and m.dtype == np.float32 and m.flags["C_CONTIGUOUS"]
+    strided = np.arange(12, dtype=np.float64).reshape(3, 4)[:, ::2]
+    out = as_matrix(strided, dtype="float32")
+    assert out.flags["C_CONTIGUOUS"] and out.tolist() == strided.tolist()
+
+
+def test_as_matrix_empty():
+    assert as_matrix([], dtype="float32").shape == (0, 0)
+
+
+def test_to_client_gives_plain_floats():
+    out = to_client(np.array([0.5, 1.5], dtype=np.float16))
+    assert out == [0.5, 1.5] and all(type(x) is float for x in out)
+    assert to_client((1.0, 2.0)) == [1.0, 2.0]
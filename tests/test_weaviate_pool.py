@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from weaviate_pool import WeaviateBusy, WeaviatePool
+
+
+def test_blocking_calls_run_concurrently_off_the_loop():
+    pool = WeaviatePool(concurrency=4)
+    loop_thread = threading.get_ident()
+    threads = set()
+
+    def blocking(x):
+        threads.add(threading.get_ident())
+        time.sleep(0.1)
+        return x * 2
+
+    async def run():
+        t0 = time.perf_counter()
+        out = await asyncio.gather(*(pool.run(blocking, i) for i in range(4)))
+        return out, time.perf_counter() - t0
+
+    out, elapsed = asyncio.run(run())
+    pool.close()
+    assert out == [0, 2, 4, 6]
+    assert elapsed < 0.3
+    assert loop_thread not in threads
+    assert pool.stats() == {"concurrency": 4, "in_flight": 0, "waiting": 0, "completed": 4, "rejected": 0}
+
+
+def test_callers_beyond_the_limit_are_rejected_after_the_queue_timeout():
+    pool = WeaviatePool(concurrency=1, queue_timeout=0.05)
+
+    async def run():
+        return await asyncio.gather(pool.run(time.sleep, 0.2), pool.run(time.sleep, 0.2), return_exceptions=True)
+
+    results = asyncio.run(run())
+    pool.close()
+    assert results[0] is None and isinstance(results[1], WeaviateBusy)
+    assert pool.stats()["rejected"] == 1 and pool.stats()["completed"] == 1
+
+
+def test_errors_propagate_and_free_the_slot():
+    pool = WeaviatePool(concurrency=1, queue_timeout=0.5)
+
+    def boom():
+        raise ValueError("bad query")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await pool.run(boom)
+        return await pool.run(lambda: "ok")
+
+    assert asyncio.run(run()) == "ok"
+    pool.close()
+
+
+def test_busy_pool_becomes_a_503(rag, monkeypatch):
+    from test_rag_service import search
+
+    async def busy(fn, *args, **kwargs):
+        raise WeaviateBusy("all 1 Weaviate slots busy for 0.05s")
+
+    monkeypatch.setattr(rag.weaviate_pool, "run", busy)
+    r = search(rag, query="a query no other test has cached")
+    assert r.status_code == 503 and "busy" in r.json()["detail"]
+
+
+def test_cancelled_caller_keeps_the_slot_until_its_call_returns():
+    pool = WeaviatePool(concurrency=1, queue_timeout=0.1)
+    started, finish = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        finish.wait(2)
+
+    async def run():
+        first = asyncio.ensure_future(pool.run(slow))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 1)
+        first.cancel()
+        await asyncio.sleep(0)
+        assert pool.stats()["in_flight"] == 1
+        with pytest.raises(WeaviateBusy):
+            await pool.run(lambda: "too early")
+        finish.set()
+        return await pool.run(lambda: "ok")
+
+    assert asyncio.run(run()) == "ok"
+    pool.close()
+    assert pool.stats()["in_flight"] == 0 and pool.stats()["rejected"] == 1